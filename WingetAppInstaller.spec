@@ -10,15 +10,31 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # rich only draws the CLI progress bar; leaving it out shrinks the onefile archive
+    excludes=['rich', 'pygments', 'markdown_it'],
     noarchive=False,
     optimize=0,
 )
 pyz = PYZ(a.pure)
 
+# Shown by the bootloader while the onefile archive unpacks; main_window closes it
+# once the window has painted.
+splash = Splash(
+    'splash.png',
+    binaries=a.binaries,
+    datas=a.datas,
+    text_pos=(20, 110),
+    text_size=10,
+    text_color='white',
+    minify_script=True,
+    always_on_top=True,
+)
+
 exe = EXE(
     pyz,
     a.scripts,
+    splash,
+    splash.binaries,
     a.binaries,
     a.datas,
     [],
@@ -26,7 +42,8 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    # UPX-compressed DLLs are decompressed on every launch, which slows startup
+    upx=False,
     upx_exclude=[],
     runtime_tmpdir=None,
     console=False,
@@ -1,6 +1,11 @@
-"""Run app_installer as a module: python -m app_installer"""
+"""Run app_installer as a module: python -m app_installer [opciones de la CLI]"""
+import sys
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Any argument selects the headless CLI; it never imports the GUI
+        from app_installer.cli import main as cli_main
+        sys.exit(cli_main())
     try:
         from app_installer.ui.main_window import main
         main()
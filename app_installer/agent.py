@@ -0,0 +1,223 @@
+"""
+Install agent: exposes the install pipeline of this machine over HTTP.
+
+Usage:
+    python -m app_installer.agent [--host 0.0.0.0 --token SECRETO] [--port 8765]
+
+Endpoints:
+    GET  /status    agent state (idle or the job it is running)
+    POST /install   body: a selection in the format of file_manager.export_selection;
+                    query: workers=N (1-16), force=1, upgrade=1. Answers with the same JSON
+                    report as the headless CLI once the batch has finished.
+
+Only one batch runs at a time (Windows Installer is machine-wide); a second
+POST /install gets 409 while the first one is running. When a token is set,
+every request must carry it in the X-Agent-Token header; the agent refuses to
+listen on anything but a loopback address without one. This module must not
+import tkinter or customtkinter.
+"""
+
+import argparse
+import hmac
+import ipaddress
+import json
+import platform
+import sys
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from app_installer import cli
+from app_installer.core import file_manager, installer, planner, scanner
+from app_installer.core.cache import PackageCache
+from app_installer.core.history import HistoryStore
+
+DEFAULT_PORT = 8765
+TOKEN_HEADER = 'X-Agent-Token'
+# Largest selection accepted in a request body
+MAX_BODY_BYTES = 4 * 1024 * 1024
+# Upper bound for the workers=N query value
+MAX_WORKERS = 16
+# Seconds a client may stay silent while sending a request
+REQUEST_TIMEOUT = 30
+
+
+def run_job(
+    apps: List[Dict[str, str]],
+    workers: int = installer.DEFAULT_MAX_WORKERS,
+    force: bool = False,
+    upgrade: bool = False,
+    history: Optional[HistoryStore] = None,
+    cache: Optional[PackageCache] = None,
+) -> Dict:
+    """Plan and install `apps` on this machine; returns the CLI report plus the host name."""
+    if upgrade:
+        plan = planner.build_upgrade_plan(apps)
+    elif force:
+        plan = planner.InstallPlan([planner.PlanItem(app, planner.INSTALL) for app in apps])
+    else:
+        # Always rescan: another job or a user may have changed the machine
+        plan = planner.build_plan(apps, scanner.list_installed_apps(refresh=True))
+    results = installer.install_apps(plan, max_workers=workers, history_store=history,
+                                     cache=cache, upgrade=upgrade, force=force)
+    return {
+        'host': platform.node(),
+        'ok': all(r.returncode == 0 for r in results),
+        'plan': cli.plan_to_dict(plan),
+        'results': [cli.result_to_dict(r) for r in results],
+    }
+
+
+class AgentServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        token: Optional[str] = None,
+        workers: int = installer.DEFAULT_MAX_WORKERS,
+        history: Optional[HistoryStore] = None,
+        cache: Optional[PackageCache] = None,
+    ):
+        super().__init__(address, AgentHandler)
+        self.token = token
+        self.workers = workers
+        self.history = history
+        self.cache = cache
+        self.job_lock = threading.Lock()
+        self.job: Optional[Dict] = None
+
+
+class AgentHandler(BaseHTTPRequestHandler):
+    server_version = 'app-installer-agent/1'
+    server: AgentServer
+    # Socket timeout, so a client that never sends its body cannot hold a thread
+    timeout = REQUEST_TIMEOUT
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if urlsplit(self.path).path != '/status':
+            self._send(404, {'ok': False, 'error': 'ruta desconocida'})
+            return
+        job = self.server.job
+        self._send(200, {'ok': True, 'host': platform.node(), 'busy': job is not None, 'job': job})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        url = urlsplit(self.path)
+        if url.path != '/install':
+            self._send(404, {'ok': False, 'error': 'ruta desconocida'})
+            return
+        header = self.headers.get('Content-Length')
+        if header is None:
+            self._send(411, {'ok': False, 'error': 'falta Content-Length'})
+            return
+        try:
+            length = int(header) if header.strip().isdigit() else -1
+            if length < 0:
+                raise ValueError(f'Content-Length no válido: {header}')
+            if length > MAX_BODY_BYTES:
+                self._send(413, {'ok': False, 'error': 'selección demasiado grande'})
+                return
+            body = self.rfile.read(length)
+            if len(body) != length:
+                raise ValueError('cuerpo incompleto')
+            apps = file_manager.selection_from_json(body.decode('utf-8'))
+            query = parse_qs(url.query)
+            workers = min(max(1, int(query.get('workers', [self.server.workers])[0])), MAX_WORKERS)
+        except ValueError as e:
+            self._send(400, {'ok': False, 'error': str(e)})
+            return
+        except OSError:
+            # The client stopped sending before REQUEST_TIMEOUT; nobody is left to answer
+            self.close_connection = True
+            return
+        force = query.get('force', ['0'])[0] == '1'
+        upgrade = query.get('upgrade', ['0'])[0] == '1'
+
+        if not self.server.job_lock.acquire(blocking=False):
+            self._send(409, {'ok': False, 'error': 'hay otra instalación en curso', 'job': self.server.job})
+            return
+        try:
+            self.server.job = {'packages': len(apps), 'started': datetime.now().isoformat(),
+                               'client': self.client_address[0]}
+            installer.log('trabajo recibido', phase='agent', packages=len(apps), client=self.client_address[0])
+            report = run_job(apps, workers=workers, force=force, upgrade=upgrade,
+                             history=self.server.history, cache=self.server.cache)
+        except Exception as e:
+            report = {'host': platform.node(), 'ok': False, 'error': str(e)}
+        finally:
+            self.server.job = None
+            self.server.job_lock.release()
+        self._send(200, report)
+
+    def _authorized(self) -> bool:
+        token = self.server.token
+        if token and not hmac.compare_digest(self.headers.get(TOKEN_HEADER, ''), token):
+            self._send(401, {'ok': False, 'error': 'token no válido'})
+            return False
+        return True
+
+    def _send(self, code: int, report: Dict):
+        body = json.dumps(report, ensure_ascii=False).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        installer.log(format % args, phase='agent', client=self.client_address[0])
+
+
+def is_loopback(host: str) -> bool:
+    """True for 'localhost' and loopback addresses (127.0.0.0/8, ::1)"""
+    if host.lower() == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='app_installer.agent', description=__doc__.splitlines()[1])
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='dirección en la que escuchar (por defecto solo local)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--token', help=f'secreto que deben enviar los clientes en {TOKEN_HEADER}')
+    parser.add_argument('--workers', type=int, default=installer.DEFAULT_MAX_WORKERS,
+                        help='descargas simultáneas si la petición no indica otra cifra')
+    parser.add_argument('--cache', type=Path, help='caché de instaladores compartida')
+    parser.add_argument('--cache-size', type=int, metavar='MB')
+    parser.add_argument('--no-history', action='store_true')
+    args = parser.parse_args(argv)
+
+    if not args.token and not is_loopback(args.host):
+        print(f'--host {args.host} expone el agente a la red: hace falta --token', file=sys.stderr)
+        return cli.EXIT_USAGE
+    if not installer.is_winget_available():
+        print('winget no está disponible', file=sys.stderr)
+        return cli.EXIT_USAGE
+    history = None if args.no_history else HistoryStore()
+    server = AgentServer((args.host, args.port), token=args.token, workers=args.workers,
+                         history=history, cache=cli.open_cache(args))
+    print(f'Agente escuchando en http://{args.host}:{server.server_address[1]}', file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if history is not None:
+            history.close()
+    return cli.EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
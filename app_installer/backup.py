@@ -0,0 +1,110 @@
+"""
+Versioned backups of the installed packages and restore to any of them.
+
+Usage:
+    python -m app_installer.backup take [--label antes-de-la-migracion]
+    python -m app_installer.backup list
+    python -m app_installer.backup diff 3 [7]
+    python -m app_installer.backup restore 3 [--dry-run] [--workers 6]
+
+Each snapshot stores only what changed since the previous one (see
+core.snapshots). Snapshots are referenced by number, by 'latest' or by a
+negative index (-1 is the latest, -2 the one before it). `diff A` compares A
+with the latest snapshot. `restore` installs what is missing and upgrades what
+is older than in the snapshot; it never uninstalls. Output is JSON on stdout,
+with the exit codes of the headless CLI.
+"""
+
+import argparse
+import contextlib
+import sys
+from dataclasses import asdict
+from pathlib import Path
+from typing import List, Optional
+
+from app_installer import cli
+from app_installer.core import installer, planner, scanner
+from app_installer.core.history import HistoryStore
+from app_installer.core.snapshots import SNAPSHOT_DIR, SnapshotStore
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='app_installer.backup', description=__doc__.splitlines()[1])
+    parser.add_argument('--store', type=Path, default=SNAPSHOT_DIR,
+                        help='carpeta de las instantáneas (por defecto %(default)s)')
+    parser.add_argument('--output', type=Path)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    take = commands.add_parser('take', help='guardar el estado actual del equipo')
+    take.add_argument('--label', default='', help='descripción de la instantánea')
+
+    commands.add_parser('list', help='listar las instantáneas')
+
+    diff = commands.add_parser('diff', help='diferencias entre dos instantáneas')
+    diff.add_argument('old')
+    diff.add_argument('new', nargs='?', default='latest')
+
+    restore = commands.add_parser('restore', help='instalar lo necesario para volver a una instantánea')
+    restore.add_argument('snapshot', nargs='?', default='latest')
+    restore.add_argument('--dry-run', action='store_true', help='mostrar el plan sin instalar nada')
+    restore.add_argument('--workers', type=int, default=installer.DEFAULT_MAX_WORKERS)
+    restore.add_argument('--progress', action='store_true', help='mostrar el progreso en stderr')
+    restore.add_argument('--cache', type=Path, help='caché de instaladores')
+    restore.add_argument('--cache-size', type=int, metavar='MB')
+    restore.add_argument('--no-history', action='store_true')
+    return parser
+
+
+def restore(store: SnapshotStore, args: argparse.Namespace) -> int:
+    number = store.resolve(args.snapshot)
+    # Snapshots written before truncated ids were resolved may still hold some
+    target = sorted((p for p in store.state(number).values() if not p['id'].endswith('…')),
+                    key=lambda p: p['id'].lower())
+    plan = planner.build_restore_plan(target)
+    report = {'snapshot': number, 'plan': cli.plan_to_dict(plan)}
+    if args.dry_run or not plan.pending:
+        report['ok'] = True
+        cli._emit(report, args.output)
+        return cli.EXIT_OK
+
+    history = None if args.no_history else HistoryStore()
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            results = installer.install_apps(plan, show_progress=args.progress, max_workers=args.workers,
+                                             history_store=history, cache=cli.open_cache(args))
+    finally:
+        if history is not None:
+            history.close()
+    report['results'] = [cli.result_to_dict(r) for r in results]
+    report['ok'] = all(r.returncode == 0 for r in results)
+    cli._emit(report, args.output)
+    return cli.EXIT_OK if report['ok'] else cli.EXIT_FAILED
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    store = SnapshotStore(args.store)
+    try:
+        if args.command == 'list':
+            cli._emit({'ok': True, 'snapshots': [asdict(info) for info in store.list()]}, args.output)
+            return cli.EXIT_OK
+        if args.command == 'diff':
+            old, new = store.resolve(args.old), store.resolve(args.new)
+            cli._emit({'ok': True, 'old': old, 'new': new, **store.diff(old, new).to_dict()}, args.output)
+            return cli.EXIT_OK
+        if not installer.is_winget_available():
+            cli._emit({'ok': False, 'error': 'winget no está disponible'}, args.output)
+            return cli.EXIT_USAGE
+        if args.command == 'take':
+            apps = scanner.resolve_truncated(scanner.list_installed_apps(refresh=True, check=True))
+            info, diff = store.take(apps, label=args.label)
+            cli._emit({'ok': True, 'snapshot': asdict(info) if info else None, **diff.to_dict()}, args.output)
+            return cli.EXIT_OK
+        return restore(store, args)
+    except (OSError, ValueError) as e:
+        cli._emit({'ok': False, 'error': str(e)}, args.output)
+        return cli.EXIT_USAGE
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+Benchmarks of the install, scan, search and catalog paths on the fake winget.
+
+Usage:
+    python -m app_installer.bench [--quick] [--record PATH] [--fail-on-regression]
+
+Each run is appended to PATH (JSON lines) and compared with the previous one,
+so a slowdown between versions shows up as a regression.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from app_installer.core import file_manager, installer, logger, scanner
+from app_installer.core.backend import use_backend
+from app_installer.core.fakewinget import FakePackage, FakeWinget, default_packages, render_list
+from app_installer.core.paths import DATA_DIR
+from app_installer.core.search import SearchIndex
+
+RECORD_PATH = DATA_DIR / 'logs' / 'bench.jsonl'
+# A metric this much slower than the previous run is reported as a regression.
+REGRESSION_THRESHOLD = 0.20
+
+_QUERIES = ['chrome', 'visual code', 'firefx', 'app 12', 'tool', 'vendor7', 'dcoker', 'zz']
+
+
+def _median_time(func: Callable[[], object], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def synthetic_catalog(apps: int, categories: int = 20) -> Dict[str, List[Dict[str, str]]]:
+    catalog: Dict[str, List[Dict[str, str]]] = {}
+    for idx in range(apps):
+        category = f'Categoría {idx % categories}'
+        catalog.setdefault(category, []).append({
+            'name': f'App {idx} Tool {idx % 97}',
+            'id': f'Vendor{idx % 53}.App{idx}',
+        })
+    return catalog
+
+
+def bench_install(levels: List[int], packages: int, time_scale: float) -> Dict[str, float]:
+    """Wall time of a batch install at several download concurrency levels."""
+    results = {}
+    catalog = default_packages()[:packages]
+    apps = [{'name': p.name, 'id': p.id} for p in catalog]
+    for workers in levels:
+        fake = FakeWinget(packages=catalog, time_scale=time_scale)
+        with use_backend(fake):
+            start = time.perf_counter()
+            installer.install_apps(apps, max_workers=workers)
+            results[f'install.batch{packages}.workers{workers}'] = time.perf_counter() - start
+    return results
+
+
+def bench_scanner(rows: int, repeat: int) -> Dict[str, float]:
+    packages = [
+        FakePackage(f'Vendor{i % 71}.Package{i}', f'Package Name {i} Edition', f'{i % 9}.{i % 5}.0',
+                    f'{i % 9}.{i % 5}.1' if i % 4 == 0 else '')
+        for i in range(rows)
+    ]
+    output = render_list(packages)
+    return {f'scanner.parse{rows}': _median_time(lambda: scanner.parse_table(output), repeat)}
+
+
+def bench_search(apps: int, repeat: int) -> Dict[str, float]:
+    catalog = synthetic_catalog(apps)
+    index = SearchIndex()
+    build = _median_time(lambda: SearchIndex().update(catalog), repeat)
+    index.update(catalog)
+
+    samples = []
+    for _ in range(repeat):
+        for query in _QUERIES:
+            start = time.perf_counter()
+            index.rank(query)
+            samples.append(time.perf_counter() - start)
+    samples.sort()
+
+    changed = json.loads(json.dumps(catalog))
+    first = next(iter(changed.values()))
+    for app in first[:max(1, len(first) // 10)]:
+        app['name'] += ' Pro'
+    update = _median_time(lambda: (index.update(changed), index.update(catalog)), repeat) / 2
+
+    return {
+        f'search.build{apps}': build,
+        f'search.query{apps}.p50': samples[len(samples) // 2],
+        f'search.query{apps}.p95': samples[int(len(samples) * 0.95) - 1],
+        f'search.update{apps}': update,
+    }
+
+
+def bench_catalog(apps: int, repeat: int, workdir: Path) -> Dict[str, float]:
+    """JSON parse + validation, and a load served from the precompiled cache."""
+    path = workdir / f'catalog{apps}.json'
+    path.write_text(json.dumps(synthetic_catalog(apps), indent=2), encoding='utf-8')
+    cache_dir = workdir / 'cache'
+    file_manager.load_catalog(path, cache_dir=cache_dir)
+    return {
+        f'catalog.load{apps}': _median_time(lambda: file_manager.load_catalog(path, cache_dir=None), repeat),
+        f'catalog.cached{apps}': _median_time(lambda: file_manager.load_catalog(path, cache_dir=cache_dir), repeat),
+    }
+
+
+def _commit() -> str:
+    try:
+        proc = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=str(Path(__file__).resolve().parent))
+        return proc.stdout.strip() or 'unknown'
+    except OSError:
+        return 'unknown'
+
+
+def run(quick: bool = False) -> Dict[str, float]:
+    repeat = 3 if quick else 7
+    results: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory(prefix='app-installer-bench-') as tmp:
+        workdir = Path(tmp)
+        # Keep the benchmark out of the real log and installed-apps snapshot.
+        logger.set_logger(logger.InstallLogger(path=workdir / 'install.jsonl'))
+        snapshot_path, scanner.SNAPSHOT_PATH = scanner.SNAPSHOT_PATH, workdir / 'installed.json'
+        try:
+            results.update(bench_install([1, 2, 4, 8], 12 if quick else 24, 0.01 if quick else 0.02))
+            results.update(bench_scanner(5000, repeat))
+            results.update(bench_search(2000, repeat))
+            results.update(bench_catalog(2000, repeat, workdir))
+            results.update(bench_catalog(20000, repeat, workdir))
+        finally:
+            logger.set_logger(None)
+            scanner.SNAPSHOT_PATH = snapshot_path
+    return results
+
+
+def _previous(path: Path, quick: bool) -> Optional[Dict]:
+    """Last recorded run made with the same --quick setting."""
+    try:
+        lines = path.read_text(encoding='utf-8').splitlines()
+    except OSError:
+        return None
+    for line in reversed(lines):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue  # corrupt or partially written record
+        if isinstance(record, dict) and record.get('quick') == quick:
+            return record
+    return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='app_installer.bench', description=__doc__.splitlines()[1])
+    parser.add_argument('--quick', action='store_true', help='fewer repetitions and shorter latencies')
+    parser.add_argument('--record', type=Path, default=RECORD_PATH, help='JSON lines history file')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args(argv)
+
+    previous = _previous(args.record, args.quick)
+    results = run(quick=args.quick)
+    regressions = []
+    for name, value in results.items():
+        line = f'{name:<40} {value * 1000:10.3f} ms'
+        before = (previous or {}).get('results', {}).get(name)
+        if before:
+            change = (value - before) / before
+            line += f'  {change:+7.1%}'
+            if change > REGRESSION_THRESHOLD:
+                line += '  REGRESSION'
+                regressions.append(name)
+        print(line)
+
+    record = {
+        'timestamp': datetime.now().isoformat(),
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'quick': args.quick,
+        'results': results,
+    }
+    args.record.parent.mkdir(parents=True, exist_ok=True)
+    with args.record.open('a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + '\n')
+
+    if regressions and args.fail_on_regression:
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""
+Headless command line entry point for unattended installs.
+
+Usage:
+    python -m app_installer --selection seleccion.apps
+    python -m app_installer --profile laboratorio --dry-run
+    python -m app_installer --category Navegadores --category Desarrollo --workers 6
+    python -m app_installer --selection seleccion.apps --cache /mnt/winget-cache --prefetch
+    python -m app_installer --upgrade
+
+Prints the results as JSON on stdout and exits non-zero if any package fails.
+This module must not import tkinter or customtkinter.
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app_installer.core import file_manager, installer, planner
+from app_installer.core.cache import CACHE_ENV, PackageCache
+from app_installer.core.history import HistoryStore
+
+CATALOG_PATH = Path(__file__).resolve().parent / 'data' / 'apps_catalog.json'
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='app_installer',
+        description='Instala aplicaciones con winget sin interfaz gráfica.',
+    )
+    parser.add_argument('--selection', type=Path, action='append', default=[],
+                        help='selección exportada desde la interfaz (manifiesto .apps o JSON); se puede repetir')
+    parser.add_argument('--profile', action='append', default=[],
+                        help='perfil de selección guardado desde la interfaz; se puede repetir')
+    parser.add_argument('--category', action='append', default=[],
+                        help='instalar todas las apps de una categoría del catálogo; se puede repetir')
+    parser.add_argument('--catalog', type=Path, default=CATALOG_PATH,
+                        help='catálogo a usar con --category, --selection y --profile')
+    parser.add_argument('--workers', type=int, default=installer.DEFAULT_MAX_WORKERS,
+                        help='descargas simultáneas (por defecto %(default)s)')
+    parser.add_argument('--upgrade', action='store_true',
+                        help='actualizar las apps con versión nueva (todo el catálogo si no se indica selección)')
+    parser.add_argument('--force', action='store_true',
+                        help='reinstalar también las apps que ya están instaladas (winget --force)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='mostrar el plan sin instalar nada')
+    parser.add_argument('--progress', action='store_true',
+                        help='mostrar el progreso en stderr')
+    parser.add_argument('--cache', type=Path,
+                        help=f'caché de instaladores (ruta local o recurso compartido); por defecto {CACHE_ENV}')
+    parser.add_argument('--cache-size', type=int, metavar='MB',
+                        help='tamaño máximo de la caché en MB')
+    parser.add_argument('--prefetch', action='store_true',
+                        help='solo descargar los instaladores a la caché, sin instalar')
+    parser.add_argument('--no-history', action='store_true',
+                        help='no guardar los resultados en el historial de instalaciones')
+    parser.add_argument('--output', type=Path,
+                        help='escribir el JSON de resultados en un fichero en lugar de stdout')
+    return parser
+
+
+def collect_apps(args: argparse.Namespace) -> List[Dict[str, str]]:
+    """Une las selecciones y categorías pedidas, sin ids repetidos."""
+    from app_installer.core.profiles import ProfileStore
+
+    apps: List[Dict[str, str]] = []
+    catalog = file_manager.load_catalog(args.catalog)
+    if args.upgrade and not args.selection and not args.profile and not args.category:
+        for category_apps in catalog.values():
+            apps.extend(category_apps)
+    for path in args.selection:
+        apps.extend(file_manager.import_selection(path, catalog))
+    if args.profile:
+        store = ProfileStore()
+        for name in args.profile:
+            report = store.load(name, catalog)
+            if report.invalid:
+                raise ValueError(f'perfil {name}: ' + '; '.join(report.problems()))
+            apps.extend(report.apps(catalog))
+    if args.category:
+        for category in args.category:
+            if category not in catalog:
+                raise ValueError(f'categoría desconocida: {category}')
+            apps.extend(catalog[category])
+
+    seen = set()
+    unique = []
+    for app in apps:
+        key = app['id'].lower()
+        if key not in seen:
+            seen.add(key)
+            unique.append(app)
+    return unique
+
+
+def result_to_dict(result: installer.InstallResult) -> Dict:
+    return {
+        'name': result.name,
+        'id': result.id,
+        'returncode': result.returncode,
+        'ok': result.returncode == 0,
+        'reboot_required': result.reboot_required,
+        'start': result.start.isoformat(),
+        'end': result.end.isoformat(),
+        'duration': round(result.duration, 3),
+        'download_duration': round(result.download_duration, 3),
+        'install_duration': round(result.install_duration, 3),
+        'action': result.action,
+        'stderr': result.stderr if result.returncode != 0 else '',
+        'attempts': [
+            {
+                'number': a.number,
+                'returncode': a.returncode,
+                'class': a.error_class,
+                'reason': a.reason,
+                'delay': round(a.delay, 1),
+            }
+            for a in result.attempts
+        ],
+    }
+
+
+def plan_to_dict(plan: planner.InstallPlan) -> List[Dict]:
+    return [
+        {
+            'id': item.app['id'],
+            'name': item.app.get('name', ''),
+            'action': item.action,
+            'installed_version': item.installed_version,
+            'available_version': item.available_version,
+            'note': item.note,
+        }
+        for item in plan.items
+    ]
+
+
+def open_cache(args: argparse.Namespace) -> Optional[PackageCache]:
+    if args.cache is None:
+        cache = PackageCache.from_env()
+        if cache is not None and args.cache_size:
+            cache.max_bytes = args.cache_size * 1024 ** 2
+        return cache
+    if args.cache_size:
+        return PackageCache(args.cache, args.cache_size * 1024 ** 2)
+    return PackageCache(args.cache)
+
+
+def _emit(report: Dict, output: Optional[Path]):
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if output:
+        output.write_text(text + '\n', encoding='utf-8')
+    else:
+        print(text)
+
+
+def prefetch(apps: List[Dict[str, str]], cache: PackageCache, args: argparse.Namespace) -> int:
+    def on_result(app, entry):
+        if args.progress:
+            print(f"{'[OK]' if entry else '[ERROR]'} {app['id']}", file=sys.stderr)
+
+    with contextlib.redirect_stdout(sys.stderr):
+        entries = cache.prefetch(apps, max_workers=args.workers, on_result=on_result)
+    report = {
+        'cache': [
+            {
+                'id': app['id'],
+                'ok': entries.get(app['id']) is not None,
+                'version': entries[app['id']].version if entries.get(app['id']) else None,
+                'sha256': entries[app['id']].sha256 if entries.get(app['id']) else None,
+            }
+            for app in apps
+        ],
+        'size': cache.size(),
+    }
+    report['ok'] = all(item['ok'] for item in report['cache'])
+    _emit(report, args.output)
+    return EXIT_OK if report['ok'] else EXIT_FAILED
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        apps = collect_apps(args)
+    except (OSError, ValueError, KeyError) as e:
+        _emit({'ok': False, 'error': str(e)}, args.output)
+        return EXIT_USAGE
+    if not apps:
+        _emit({'ok': False, 'error': 'no hay aplicaciones que instalar'}, args.output)
+        return EXIT_USAGE
+    if not installer.is_winget_available():
+        _emit({'ok': False, 'error': 'winget no está disponible'}, args.output)
+        return EXIT_USAGE
+
+    try:
+        cache = open_cache(args)
+    except OSError as e:
+        _emit({'ok': False, 'error': f'caché no disponible: {e}'}, args.output)
+        return EXIT_USAGE
+    if args.prefetch:
+        if cache is None:
+            _emit({'ok': False, 'error': '--prefetch necesita --cache'}, args.output)
+            return EXIT_USAGE
+        return prefetch(apps, cache, args)
+
+    if args.upgrade:
+        plan = planner.build_upgrade_plan(apps)
+    elif args.force:
+        plan = planner.InstallPlan([planner.PlanItem(app, planner.INSTALL) for app in apps])
+    else:
+        plan = planner.build_plan(apps)
+    report: Dict = {'plan': plan_to_dict(plan)}
+    if args.dry_run:
+        report['ok'] = True
+        _emit(report, args.output)
+        return EXIT_OK
+
+    # El progreso va a stderr para que stdout sea solo JSON.
+    history = None if args.no_history else HistoryStore()
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            results = installer.install_apps(plan, show_progress=args.progress, max_workers=args.workers,
+                                             history_store=history, cache=cache, upgrade=args.upgrade,
+                                             force=args.force)
+    finally:
+        if history is not None:
+            history.close()
+
+    report['results'] = [result_to_dict(r) for r in results]
+    report['ok'] = all(r.returncode == 0 for r in results)
+    _emit(report, args.output)
+    return EXIT_OK if report['ok'] else EXIT_FAILED
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Controller: runs one exported selection on several install agents.
+
+Usage:
+    python -m app_installer.controller --selection seleccion.json \\
+        --agent http://lab-01:8765 --agent http://lab-02:8765 --parallel 10
+    python -m app_installer.controller --selection seleccion.json --agents-file agentes.txt
+
+Each agent (see app_installer.agent) installs the selection on its own machine.
+--parallel limits how many hosts are provisioned at the same time. Each host
+runs a single batch at a time, with --workers parallel downloads. The
+per-host reports are merged into one JSON report on stdout. The exit code is
+0 when every host succeeds, 1 when any package or host fails and 2 on usage
+errors.
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from app_installer import cli
+from app_installer.agent import TOKEN_HEADER
+from app_installer.core import file_manager, installer
+
+DEFAULT_PARALLEL = 8
+# Seconds between two attempts while an agent answers 409 (busy)
+BUSY_RETRY_SECONDS = 5.0
+# Seconds allowed per host. The agent only answers when its batch ends, so this
+# bounds both the install and a connection that stops responding.
+DEFAULT_TIMEOUT = 2 * 3600.0
+
+
+def _request(url: str, token: Optional[str], data: Optional[bytes] = None,
+             timeout: float = DEFAULT_TIMEOUT) -> Dict:
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers[TOKEN_HEADER] = token
+    request = Request(url, data=data, headers=headers, method='POST' if data is not None else 'GET')
+    with urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+def run_host(
+    agent: str,
+    payload: str,
+    options: Dict[str, str],
+    token: Optional[str] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> Dict:
+    """
+    Sends the selection to one agent and waits for its report.
+
+    While the agent is busy with another batch the request is repeated every
+    BUSY_RETRY_SECONDS until `timeout` runs out. Connection and protocol errors
+    are returned as a failed report, never raised.
+    """
+    url = f"{agent.rstrip('/')}/install?{urlencode(options)}"
+    start = time.monotonic()
+    while True:
+        try:
+            remaining = max(1.0, timeout - (time.monotonic() - start))
+            report = _request(url, token, payload.encode('utf-8'), timeout=remaining)
+            break
+        except HTTPError as e:
+            try:
+                report = json.loads(e.read().decode('utf-8'))
+            except ValueError:
+                report = {'ok': False, 'error': f'HTTP {e.code}'}
+            waited = time.monotonic() - start
+            if e.code == 409 and waited + BUSY_RETRY_SECONDS < timeout:
+                time.sleep(BUSY_RETRY_SECONDS)
+                continue
+            break
+        except (URLError, OSError, ValueError) as e:
+            report = {'ok': False, 'error': str(getattr(e, 'reason', e))}
+            break
+    report['agent'] = agent
+    report['elapsed'] = round(time.monotonic() - start, 3)
+    return report
+
+
+def fan_out(
+    agents: List[str],
+    apps: List[Dict[str, str]],
+    parallel: int = DEFAULT_PARALLEL,
+    workers: int = installer.DEFAULT_MAX_WORKERS,
+    force: bool = False,
+    upgrade: bool = False,
+    token: Optional[str] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    on_host: Optional[Callable[[Dict], None]] = None,
+) -> Dict:
+    """Runs `apps` on every agent, at most `parallel` hosts at a time, and aggregates the reports."""
+    payload = file_manager.selection_to_json(apps)
+    options = {'workers': str(workers)}
+    if force:
+        options['force'] = '1'
+    if upgrade:
+        options['upgrade'] = '1'
+
+    def run(agent: str) -> Dict:
+        report = run_host(agent, payload, options, token=token, timeout=timeout)
+        if on_host:
+            on_host(report)
+        return report
+
+    # Each agent appears once, so a host never gets two batches at the same time
+    unique = list(dict.fromkeys(agents))
+    with ThreadPoolExecutor(max_workers=max(1, parallel), thread_name_prefix='controller') as pool:
+        reports = list(pool.map(run, unique))
+    return aggregate(reports)
+
+
+def aggregate(reports: List[Dict]) -> Dict:
+    """Merges per-host reports: totals, failed hosts and, per package id, the hosts where it failed."""
+    failures: Dict[str, List[str]] = {}
+    installed = failed = 0
+    for report in reports:
+        for result in report.get('results', []):
+            if result['ok']:
+                installed += 1
+            else:
+                failed += 1
+                failures.setdefault(result['id'], []).append(report['agent'])
+    return {
+        'ok': all(r.get('ok') for r in reports),
+        'summary': {
+            'hosts': len(reports),
+            'hosts_failed': sum(1 for r in reports if not r.get('ok')),
+            'packages_ok': installed,
+            'packages_failed': failed,
+        },
+        'failures': failures,
+        'hosts': reports,
+    }
+
+
+def _read_agents(args: argparse.Namespace) -> List[str]:
+    agents = list(args.agent)
+    if args.agents_file:
+        for line in args.agents_file.read_text(encoding='utf-8').splitlines():
+            line = line.split('#', 1)[0].strip()
+            if line:
+                agents.append(line)
+    return agents
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='app_installer.controller', description=__doc__.splitlines()[1])
+    parser.add_argument('--selection', type=Path, required=True,
+                        help='selección exportada desde la interfaz (JSON)')
+    parser.add_argument('--agent', action='append', default=[],
+                        help='URL de un agente (http://host:puerto); se puede repetir')
+    parser.add_argument('--agents-file', type=Path, help='fichero con una URL de agente por línea')
+    parser.add_argument('--parallel', type=int, default=DEFAULT_PARALLEL,
+                        help='equipos que se instalan a la vez (por defecto %(default)s)')
+    parser.add_argument('--workers', type=int, default=installer.DEFAULT_MAX_WORKERS,
+                        help='descargas simultáneas en cada equipo')
+    parser.add_argument('--force', action='store_true')
+    parser.add_argument('--upgrade', action='store_true')
+    parser.add_argument('--token', help='secreto compartido con los agentes')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help='segundos máximos por equipo (por defecto %(default)s)')
+    parser.add_argument('--progress', action='store_true', help='mostrar cada equipo terminado en stderr')
+    parser.add_argument('--output', type=Path)
+    args = parser.parse_args(argv)
+
+    try:
+        apps = file_manager.import_selection(args.selection)
+        agents = _read_agents(args)
+    except (OSError, ValueError) as e:
+        cli._emit({'ok': False, 'error': str(e)}, args.output)
+        return cli.EXIT_USAGE
+    if not apps or not agents:
+        cli._emit({'ok': False, 'error': 'hacen falta una selección y al menos un agente'}, args.output)
+        return cli.EXIT_USAGE
+
+    def on_host(report):
+        if args.progress:
+            status = 'OK' if report.get('ok') else f"ERROR {report.get('error', '')}".strip()
+            print(f"[{status}] {report['agent']} ({report['elapsed']:.1f}s)", file=sys.stderr)
+
+    report = fan_out(agents, apps, parallel=args.parallel, workers=args.workers, force=args.force,
+                     upgrade=args.upgrade, token=args.token, timeout=args.timeout, on_host=on_host)
+    cli._emit(report, args.output)
+    return cli.EXIT_OK if report['ok'] else cli.EXIT_FAILED
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import threading
+from contextlib import contextmanager
+from typing import List, Optional
+
+# Con APP_INSTALLER_BACKEND=fake todos los comandos van a la simulación de
+# winget de `fakewinget`, sin necesidad de Windows.
+BACKEND_ENV = 'APP_INSTALLER_BACKEND'
+
+
+class CommandBackend:
+    """
+    Punto único por el que se ejecutan winget y los instaladores.
+
+    `spawn` devuelve un objeto con la interfaz de `subprocess.Popen` que usa
+    `process.run_streaming` (stdout/stderr binarios y `wait()`); `run` ejecuta
+    un comando hasta el final y devuelve un `CompletedProcess` con texto.
+    """
+
+    def spawn(self, cmd: List[str]):
+        raise NotImplementedError
+
+    def run(self, cmd: List[str], capture: bool = True) -> subprocess.CompletedProcess:
+        raise NotImplementedError
+
+
+class SubprocessBackend(CommandBackend):
+    def spawn(self, cmd: List[str]):
+        return subprocess.Popen(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+
+    def run(self, cmd: List[str], capture: bool = True) -> subprocess.CompletedProcess:
+        if not capture:
+            return subprocess.run(cmd, text=True)
+        return subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='replace')
+
+
+_backend: Optional[CommandBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> CommandBackend:
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if os.environ.get(BACKEND_ENV, '').lower() == 'fake':
+                from .fakewinget import FakeWinget
+                _backend = FakeWinget.from_env()
+            else:
+                _backend = SubprocessBackend()
+        return _backend
+
+
+def set_backend(backend: Optional[CommandBackend]):
+    """Sustituye el backend global; None vuelve a elegirlo según el entorno."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+@contextmanager
+def use_backend(backend: CommandBackend):
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+    try:
+        yield backend
+    finally:
+        with _backend_lock:
+            _backend = previous
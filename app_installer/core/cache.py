@@ -0,0 +1,402 @@
+import hashlib
+import json
+import os
+import platform
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from . import installer, metadata
+from .file_manager import write_atomic
+from .installer import DownloadResult
+
+# Directorio de la caché compartida (ruta local o recurso SMB) y su tamaño máximo en MB.
+CACHE_ENV = 'APP_INSTALLER_CACHE'
+CACHE_SIZE_ENV = 'APP_INSTALLER_CACHE_MB'
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+# Si no se sabe cuándo se actualizó la fuente, una entrada sin versión
+# pedida solo vale durante este tiempo (segundos).
+UNVERSIONED_MAX_AGE = 24 * 3600
+ENTRY_FILE = 'entry.json'
+# Cada equipo que usa una entrada deja un fichero en este subdirectorio; la
+# limpieza no borra entradas con préstamos de menos de LEASE_MAX_AGE segundos
+# (más viejos son de un proceso que murió sin liberarlos).
+LEASE_DIR = 'leases'
+LEASE_MAX_AGE = 12 * 3600
+_CHUNK = 1024 * 1024
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open('rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    id: str
+    version: str
+    sha256: str
+    size: int
+    added: str
+    directory: Path
+    installer: Path
+    manifest: Path
+    # Tamaño y fecha de modificación (segundos) del instalador cuando se
+    # comprobó su hash; si no cambian no se vuelve a leer.
+    verified: Optional[List[int]] = None
+
+    @property
+    def last_used(self) -> float:
+        """Marca de uso para el LRU: la fecha de modificación de `entry.json`."""
+        try:
+            return (self.directory / ENTRY_FILE).stat().st_mtime
+        except OSError:
+            return 0.0
+
+
+class PackageCache:
+    """
+    Caché de instaladores descargados con `winget download`.
+
+    Cada entrada vive en `root/<id>/<versión>-<hash>/` con el manifiesto, el
+    instalador y un `entry.json`; la clave es id + versión + SHA-256 del
+    instalador. No hay índice central, así que varias máquinas pueden compartir
+    el mismo directorio: las entradas se publican renombrando un directorio
+    temporal y el uso se marca tocando `entry.json`. Mientras un equipo usa
+    una entrada (de `lookup` a `release`) deja un préstamo en `leases/` y
+    ningún equipo la elimina.
+
+    La versión buscada sale de `target_version`. Cuando no se conoce, solo
+    vale una entrada guardada después de la última actualización de la fuente
+    de winget, para no repetir indefinidamente una versión antigua.
+
+    El hash se comprueba al guardar (contra `InstallerSha256` del manifiesto) y
+    en los aciertos cuyo instalador cambió de tamaño o de fecha desde la
+    última comprobación; una entrada corrupta se borra. Al superar
+    `max_bytes` se eliminan las entradas sin préstamo usadas hace más tiempo.
+    """
+
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._metadata: Optional[metadata.MetadataCache] = None
+        self._source_updated: Optional[datetime] = None
+        self._source_checked = False
+        # directorio de entrada -> préstamos de este proceso
+        self._leases: Dict[Path, List[Path]] = {}
+
+    @classmethod
+    def from_env(cls) -> Optional['PackageCache']:
+        """Caché configurada con APP_INSTALLER_CACHE, o None si no hay ninguna."""
+        root = os.environ.get(CACHE_ENV)
+        if not root:
+            return None
+        size_mb = os.environ.get(CACHE_SIZE_ENV)
+        return cls(Path(root), int(size_mb) * 1024 ** 2 if size_mb else DEFAULT_MAX_BYTES)
+
+    def entries(self, package_id: Optional[str] = None) -> List[CacheEntry]:
+        """Entradas de la caché, de todos los paquetes o solo de `package_id`."""
+        pattern = f'{package_id.lower()}/*/{ENTRY_FILE}' if package_id else f'*/*/{ENTRY_FILE}'
+        entries = []
+        for path in self.root.glob(pattern):
+            if path.parent.name.startswith('.'):
+                continue  # entrada a medio copiar
+            try:
+                data = json.loads(path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                continue
+            directory = path.parent
+            entries.append(CacheEntry(
+                id=data['id'],
+                version=data['version'],
+                sha256=data['sha256'],
+                size=data['size'],
+                added=data['added'],
+                directory=directory,
+                installer=directory / data['installer'],
+                manifest=directory / data['manifest'],
+                verified=data.get('verified'),
+            ))
+        return entries
+
+    def size(self) -> int:
+        return sum(entry.size for entry in self.entries())
+
+    def target_version(self, app: Dict[str, str]) -> Optional[str]:
+        """
+        Versión de `app` que se va a instalar: `version` (fijada por el usuario
+        o la disponible según el plan) o la última que conoce la caché de
+        `winget show` si está vigente. None si no se sabe.
+        """
+        if app.get('version'):
+            return app['version']
+        with self._lock:
+            if self._metadata is None:
+                self._metadata = metadata.MetadataCache()
+        info = self._metadata.get(app['id'])
+        if info is not None and info.ok and info.version and self._metadata.is_fresh(info):
+            return info.version
+        return None
+
+    def source_updated(self) -> Optional[datetime]:
+        """Última actualización de la fuente de winget; se consulta una vez por caché."""
+        with self._lock:
+            if not self._source_checked:
+                self._source_updated = metadata.source_updated()
+                self._source_checked = True
+        return self._source_updated
+
+    def _current(self, entry: CacheEntry) -> bool:
+        """Si una entrada sirve cuando no se sabe qué versión se quiere."""
+        try:
+            added = datetime.fromisoformat(entry.added)
+        except ValueError:
+            return False
+        updated = self.source_updated()
+        if updated is not None:
+            return added >= updated
+        return (datetime.now() - added).total_seconds() <= UNVERSIONED_MAX_AGE
+
+    @staticmethod
+    def _stamp(path: Path) -> List[int]:
+        stat = path.stat()
+        return [stat.st_size, int(stat.st_mtime)]
+
+    def _verify(self, entry: CacheEntry) -> bool:
+        """
+        Comprueba el hash del instalador, salvo que su tamaño y fecha coincidan
+        con los de la última comprobación. Lanza OSError si no se puede leer.
+        """
+        stamp = self._stamp(entry.installer)
+        if entry.verified == stamp:
+            return True
+        if sha256_file(entry.installer) != entry.sha256:
+            return False
+        path = entry.directory / ENTRY_FILE
+        try:
+            data = json.loads(path.read_text(encoding='utf-8'))
+            data['verified'] = stamp
+            write_atomic(path, json.dumps(data, indent=2))
+        except (OSError, ValueError):
+            pass
+        entry.verified = stamp
+        return True
+
+    def _acquire(self, entry: CacheEntry) -> bool:
+        """Deja un préstamo en la entrada; False si ya no existe."""
+        lease = entry.directory / LEASE_DIR / f'{platform.node()}-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        try:
+            lease.parent.mkdir(exist_ok=True)
+            lease.touch()
+        except OSError:
+            return False
+        with self._lock:
+            self._leases.setdefault(entry.directory, []).append(lease)
+        return True
+
+    def release(self, download) -> None:
+        """Libera el préstamo de una entrada (o de su `DownloadResult`) obtenida con `lookup`."""
+        with self._lock:
+            leases = self._leases.get(download.directory)
+            lease = leases.pop() if leases else None
+            if not leases:
+                self._leases.pop(download.directory, None)
+        if lease is not None:
+            try:
+                lease.unlink()
+            except OSError:
+                pass
+
+    @staticmethod
+    def leased(directory: Path) -> bool:
+        """Si algún equipo tiene prestada la entrada de `directory`."""
+        now = time.time()
+        for lease in (directory / LEASE_DIR).glob('*'):
+            try:
+                if now - lease.stat().st_mtime <= LEASE_MAX_AGE:
+                    return True
+            except OSError:
+                continue
+        return False
+
+    def find(self, package_id: str, version: Optional[str] = None, lease: bool = False) -> Optional[CacheEntry]:
+        """
+        Entrada válida más reciente de `package_id` (de `version` si se indica).
+
+        Sin `version` solo cuentan las entradas posteriores a la última
+        actualización de la fuente. Comprueba el hash del instalador (ver
+        `_verify`), borra las entradas corruptas y marca la elegida como usada.
+        Con `lease` la elegida queda prestada hasta `release`.
+        """
+        candidates = [e for e in self.entries(package_id)
+                      if e.version == version or (version is None and self._current(e))]
+        candidates.sort(key=lambda e: e.added, reverse=True)
+        for entry in candidates:
+            # El préstamo va antes de comprobar el hash para que otro equipo
+            # no elimine la entrada entre la comprobación y el uso.
+            if lease and not self._acquire(entry):
+                continue
+            try:
+                valid = self._verify(entry)
+            except OSError:
+                # Ilegible o eliminada mientras tanto: no se toma por corrupta.
+                if lease:
+                    self.release(entry)
+                continue
+            if valid:
+                os.utime(entry.directory / ENTRY_FILE)
+                return entry
+            if lease:
+                self.release(entry)
+            installer.log('entrada de caché corrupta', id=entry.id, phase='cache', version=entry.version)
+            shutil.rmtree(entry.directory, ignore_errors=True)
+        return None
+
+    def lookup(self, package_id: str, version: Optional[str] = None) -> Optional[DownloadResult]:
+        """
+        Devuelve la descarga cacheada de `package_id` como un `DownloadResult`.
+
+        Sin `version` se usa la última versión guardada después de la última
+        actualización de la fuente (ver `find`). Devuelve None si no hay
+        ninguna entrada válida. La entrada queda prestada: hay que llamar a
+        `release` con el resultado cuando ya no se use.
+        """
+        start = datetime.now()
+        entry = self.find(package_id, version, lease=True)
+        if entry is None:
+            return None
+        end = datetime.now()
+        installer.log(id=entry.id, phase='cache', hit=True, version=entry.version,
+                      duration=(end - start).total_seconds())
+        return DownloadResult(
+            id=entry.id,
+            returncode=0,
+            directory=entry.directory,
+            stdout='',
+            stderr='',
+            start=start,
+            end=end,
+            installer=entry.installer,
+            manifest=entry.manifest,
+        )
+
+    def store(self, download: DownloadResult) -> Optional[CacheEntry]:
+        """
+        Copia a la caché una descarga correcta y aplica el límite de tamaño.
+
+        Devuelve None si la descarga no tiene instalador o su hash no coincide
+        con el del manifiesto.
+        """
+        if download.returncode != 0 or download.installer is None or download.manifest is None:
+            return None
+        manifest = installer._read_manifest(download.manifest)
+        version = manifest.get('PackageVersion', 'unknown')
+        sha256 = sha256_file(download.installer)
+        stamp = self._stamp(download.installer)
+        expected = manifest.get('InstallerSha256', '').lower()
+        if expected and expected != sha256:
+            installer.log('el hash del instalador no coincide', id=download.id, phase='cache',
+                          expected=expected, actual=sha256)
+            return None
+
+        parent = self.root / download.id.lower()
+        target = parent / f'{version}-{sha256[:16]}'
+        if not target.exists():
+            parent.mkdir(parents=True, exist_ok=True)
+            tmp = Path(tempfile.mkdtemp(prefix='.tmp-', dir=str(parent)))
+            try:
+                shutil.copy2(download.installer, tmp / download.installer.name)
+                shutil.copy2(download.manifest, tmp / download.manifest.name)
+                (tmp / ENTRY_FILE).write_text(json.dumps({
+                    'id': download.id,
+                    'version': version,
+                    'sha256': sha256,
+                    'size': download.installer.stat().st_size + download.manifest.stat().st_size,
+                    'added': datetime.now().isoformat(),
+                    'installer': download.installer.name,
+                    'manifest': download.manifest.name,
+                    # copy2 conserva tamaño y fecha, así que vale para la copia
+                    'verified': stamp,
+                }, indent=2), encoding='utf-8')
+                os.replace(tmp, target)
+            except OSError:
+                # Otra máquina publicó la misma entrada mientras copiábamos.
+                shutil.rmtree(tmp, ignore_errors=True)
+        entry = next((e for e in self.entries(download.id) if e.directory == target), None)
+        self.evict()
+        return entry
+
+    def evict(self) -> List[CacheEntry]:
+        """
+        Borra las entradas menos usadas hasta quedar por debajo de `max_bytes`.
+
+        Las entradas prestadas se saltan. Las demás se retiran primero con un
+        renombrado (que `entries` ya no ve) y se vuelve a mirar si tienen
+        préstamo, por si otro equipo la tomó justo antes; en ese caso se
+        restauran.
+        """
+        with self._lock:
+            entries = sorted(self.entries(), key=lambda e: e.last_used)
+            total = sum(e.size for e in entries)
+            removed = []
+            for entry in entries:
+                if total <= self.max_bytes:
+                    break
+                if self.leased(entry.directory):
+                    continue
+                retired = entry.directory.with_name(f'.evict-{entry.directory.name}-{uuid.uuid4().hex[:8]}')
+                try:
+                    os.replace(entry.directory, retired)
+                except OSError:
+                    continue
+                if self.leased(retired):
+                    try:
+                        os.replace(retired, entry.directory)
+                    except OSError:
+                        pass
+                    continue
+                shutil.rmtree(retired, ignore_errors=True)
+                total -= entry.size
+                removed.append(entry)
+        for entry in removed:
+            installer.log('entrada eliminada de la caché', id=entry.id, phase='cache',
+                          version=entry.version, size=entry.size)
+        return removed
+
+    def prefetch(
+        self,
+        apps: List[Dict[str, str]],
+        max_workers: int = installer.DEFAULT_MAX_WORKERS,
+        on_result: Optional[Callable[[Dict[str, str], Optional[CacheEntry]], None]] = None,
+    ) -> Dict[str, Optional[CacheEntry]]:
+        """
+        Descarga a la caché los instaladores de `apps` que no estén ya en ella.
+
+        Devuelve id -> entrada de la caché (None si la descarga falló).
+        """
+        results: Dict[str, Optional[CacheEntry]] = {}
+
+        def fetch(app: Dict[str, str]):
+            entry = self.find(app['id'], self.target_version(app))
+            if entry is None:
+                with tempfile.TemporaryDirectory(prefix='winget-prefetch-') as tmp:
+                    entry = self.store(installer.download_app(app, Path(tmp)))
+            results[app['id']] = entry
+            if on_result:
+                on_result(app, entry)
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='cache-prefetch') as pool:
+            list(pool.map(fetch, apps))
+        return results
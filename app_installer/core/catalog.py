@@ -0,0 +1,273 @@
+import hashlib
+import json
+import marshal
+import os
+import sys
+import tempfile
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from . import graph, trace
+from .paths import DATA_DIR
+
+CACHE_DIR = DATA_DIR / 'cache'
+# Cambia cuando cambia la forma de los datos precompilados.
+_CACHE_FORMAT = 3
+# marshal no garantiza compatibilidad entre versiones de Python.
+_CACHE_TAG = (_CACHE_FORMAT, sys.hexversion >> 16)
+
+
+class CatalogApp(Mapping):
+    """
+    Entrada del catálogo con `__slots__`.
+
+    Se comporta como el dict {'id': ..., 'name': ...} del JSON (indexado,
+    `get`), así que el resto del código la usa igual que antes. Para
+    serializarla se usa `to_dict` (o `app_to_dict` si puede ser un dict).
+    Las claves que no son id ni name se guardan en `extra`.
+    """
+
+    __slots__ = ('id', 'name', 'category', 'extra')
+
+    def __init__(self, id: str, name: str, category: str, extra: Optional[Dict[str, str]] = None):
+        self.id = id
+        self.name = name
+        self.category = category
+        self.extra = extra
+
+    def __getitem__(self, key: str):
+        if key == 'id':
+            return self.id
+        if key == 'name':
+            return self.name
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        if key == 'id':
+            return self.id
+        if key == 'name':
+            return self.name
+        return self.extra.get(key, default) if self.extra is not None else default
+
+    def __iter__(self) -> Iterator[str]:
+        yield 'id'
+        yield 'name'
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return 2 + (len(self.extra) if self.extra is not None else 0)
+
+    def __repr__(self) -> str:
+        return f'CatalogApp({self.id!r}, {self.name!r}, {self.category!r})'
+
+    def to_dict(self) -> Dict[str, str]:
+        data = {'id': self.id, 'name': self.name}
+        if self.extra is not None:
+            data.update(self.extra)
+        return data
+
+
+def app_to_dict(app) -> Dict[str, str]:
+    """Copia de una app como dict, sea una `CatalogApp` o un dict leído de una selección."""
+    return app.to_dict() if isinstance(app, CatalogApp) else dict(app)
+
+
+class Catalog(Mapping):
+    """
+    Catálogo validado: categoría -> lista de `CatalogApp`, en el orden del JSON.
+
+    Mantiene un índice por id (sin distinguir mayúsculas). Las entradas sin
+    `id` o `name` se descartan y quedan en `problems`, que invalida el
+    catálogo. Un id repetido solo se conserva en la primera categoría en la que
+    aparece y queda en `warnings`, que no impide guardarlo.
+    """
+
+    __slots__ = ('_categories', '_by_id', 'duplicates', 'problems', 'warnings')
+
+    def __init__(self):
+        self._categories: Dict[str, List[CatalogApp]] = {}
+        self._by_id: Dict[str, CatalogApp] = {}
+        # id en minúsculas -> categorías donde se repite
+        self.duplicates: Dict[str, List[str]] = {}
+        self.problems: List[str] = []
+        self.warnings: List[str] = []
+
+    @classmethod
+    def from_data(cls, data) -> 'Catalog':
+        """Construye el catálogo a partir del JSON ya interpretado."""
+        catalog = cls()
+        if not isinstance(data, dict):
+            catalog.problems.append('el catálogo debe ser un objeto {categoría: [apps]}')
+            return catalog
+        for category, apps in data.items():
+            if not isinstance(apps, list):
+                catalog.problems.append(f'{category}: debe ser una lista')
+                continue
+            entries = catalog._categories.setdefault(category, [])
+            for pos, app in enumerate(apps, start=1):
+                if not isinstance(app, dict):
+                    catalog.problems.append(f'{category} #{pos}: debe ser un objeto')
+                    continue
+                missing = [key for key in ('id', 'name')
+                           if not isinstance(app.get(key), str) or not app[key].strip()]
+                if missing:
+                    catalog.problems.extend(f'{category} #{pos}: falta "{key}"' for key in missing)
+                    continue
+                extra = {k: v for k, v in app.items() if k not in ('id', 'name')} or None
+                catalog._add(entries, CatalogApp(app['id'], app['name'], category, extra))
+        catalog._check_order_fields()
+        return catalog
+
+    def _check_order_fields(self):
+        """Valida `requires`, `priority` y `exclusive` (ver `graph`)."""
+        for app in self._by_id.values():
+            where = f'{app.category}: "{app.id}"'
+            requires = app.get(graph.REQUIRES)
+            if requires is not None:
+                if isinstance(requires, str):
+                    requires = [requires]
+                if not isinstance(requires, list) or not all(isinstance(dep, str) for dep in requires):
+                    self.problems.append(f'{where}: "requires" debe ser una lista de ids')
+                else:
+                    self.problems.extend(f'{where}: requiere "{dep}", que no está en el catálogo'
+                                         for dep in requires if dep.lower() not in self._by_id)
+            priority = app.get(graph.PRIORITY)
+            if priority is not None and (not isinstance(priority, int) or isinstance(priority, bool)):
+                self.problems.append(f'{where}: "priority" debe ser un número entero')
+            exclusive = app.get(graph.EXCLUSIVE)
+            if exclusive is not None and not isinstance(exclusive, bool):
+                self.problems.append(f'{where}: "exclusive" debe ser true o false')
+        for cycle in graph.find_cycles(self.apps()):
+            self.problems.append('dependencias circulares entre ' + ', '.join(cycle))
+
+    @classmethod
+    def _from_rows(cls, rows: tuple, problems: tuple, warnings: tuple, duplicates: tuple) -> 'Catalog':
+        """Reconstruye un catálogo ya validado a partir de `_rows()`."""
+        catalog = cls()
+        by_id = catalog._by_id
+        for category, apps in rows:
+            entries = []
+            for app_id, name, extra in apps:
+                app = CatalogApp(app_id, name, category, dict(extra) if extra else None)
+                by_id[app_id.lower()] = app
+                entries.append(app)
+            catalog._categories[category] = entries
+        catalog.problems = list(problems)
+        catalog.warnings = list(warnings)
+        catalog.duplicates = {key: list(categories) for key, categories in duplicates}
+        return catalog
+
+    def _add(self, entries: List[CatalogApp], app: CatalogApp):
+        key = app.id.lower()
+        first = self._by_id.get(key)
+        if first is not None:
+            self.duplicates.setdefault(key, [first.category]).append(app.category)
+            self.warnings.append(f'{app.category}: "{app.id}" ya está en {first.category}')
+            return
+        self._by_id[key] = app
+        entries.append(app)
+
+    def _rows(self) -> tuple:
+        return tuple(
+            (category, tuple((a.id, a.name, tuple(a.extra.items()) if a.extra else None) for a in apps))
+            for category, apps in self._categories.items()
+        )
+
+    def __getitem__(self, category: str) -> List[CatalogApp]:
+        return self._categories[category]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._categories)
+
+    def __len__(self) -> int:
+        return len(self._categories)
+
+    def app(self, app_id: str) -> Optional[CatalogApp]:
+        return self._by_id.get(app_id.lower())
+
+    def category_of(self, app_id: str) -> Optional[str]:
+        app = self._by_id.get(app_id.lower())
+        return app.category if app is not None else None
+
+    def apps(self) -> List[CatalogApp]:
+        """Todas las entradas, en el orden del catálogo."""
+        return [app for apps in self._categories.values() for app in apps]
+
+    @property
+    def count(self) -> int:
+        return len(self._by_id)
+
+    def to_data(self) -> Dict[str, List[Dict[str, str]]]:
+        return {category: [app.to_dict() for app in apps] for category, apps in self._categories.items()}
+
+
+def _cache_path(path: Path, cache_dir: Path) -> Path:
+    digest = hashlib.sha1(str(path.resolve()).encode('utf-8')).hexdigest()[:16]
+    return cache_dir / f'catalog-{path.stem}-{digest}.bin'
+
+
+def _read_cache(cache_path: Path) -> Optional[tuple]:
+    try:
+        data = marshal.loads(cache_path.read_bytes())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(data, tuple) or len(data) != 8 or data[0] != _CACHE_TAG:
+        return None
+    return data
+
+
+def _write_cache(cache_path: Path, data: tuple):
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(cache_path.parent), prefix=f'.{cache_path.name}.')
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(marshal.dumps(data))
+        os.replace(tmp, str(cache_path))
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def load(path: Path, cache_dir: Optional[Path] = CACHE_DIR) -> Catalog:
+    """
+    Carga un catálogo JSON usando una copia precompilada con marshal.
+
+    La copia se reutiliza si coinciden la fecha de modificación y el tamaño del
+    fichero o, si no, su SHA-256; solo se interpreta el JSON cuando el
+    contenido cambió. Con `cache_dir=None` no se usa la copia. Lanza ValueError
+    si el JSON no es válido.
+    """
+    path = Path(path)
+    stat = path.stat()
+    cache_path = _cache_path(path, cache_dir) if cache_dir is not None else None
+    cached = _read_cache(cache_path) if cache_path is not None else None
+    if cached is not None and cached[1:3] == (stat.st_mtime_ns, stat.st_size):
+        trace.count('catalog.cache_hit')
+        return Catalog._from_rows(*cached[4:])
+
+    raw = path.read_bytes()
+    digest = hashlib.sha256(raw).hexdigest()
+    if cached is not None and cached[3] == digest:
+        catalog = Catalog._from_rows(*cached[4:])
+    else:
+        trace.count('catalog.parse')
+        try:
+            data = json.loads(raw.decode('utf-8-sig'))
+        except json.JSONDecodeError as e:
+            raise ValueError(f'{path.name}: línea {e.lineno}, columna {e.colno}: {e.msg}') from e
+        catalog = Catalog.from_data(data)
+    if cache_path is not None:
+        duplicates = tuple((key, tuple(categories)) for key, categories in catalog.duplicates.items())
+        _write_cache(cache_path, (_CACHE_TAG, stat.st_mtime_ns, stat.st_size, digest,
+                                  catalog._rows(), tuple(catalog.problems), tuple(catalog.warnings),
+                                  duplicates))
+    return catalog
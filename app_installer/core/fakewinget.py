@@ -0,0 +1,391 @@
+"""
+Simulación de winget para pruebas y benchmarks fuera de Windows.
+
+`FakeWinget` implementa `CommandBackend` y responde a los subcomandos que usa
+la aplicación (`--version`, `list`, `upgrade`, `install`, `download`, `show`,
+`source list`) y a los instaladores locales (`msiexec`, ejecutables descargados)
+con tablas, spinners y barras de progreso con el mismo formato que winget,
+latencias proporcionales al tamaño del paquete y códigos de salida configurables.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .backend import CommandBackend
+
+SCALE_ENV = 'APP_INSTALLER_FAKE_SCALE'
+STATE_ENV = 'APP_INSTALLER_FAKE_STATE'
+
+DEFAULT_CATALOG = Path(__file__).resolve().parent.parent / 'data' / 'apps_catalog_default.json'
+# Fuente simulada; su fecha de actualización es fija para que la caché de
+# instaladores se pueda probar entre ejecuciones.
+SOURCE_URL = 'https://cdn.winget.microsoft.com/cache'
+SOURCE_UPDATED = '2024-01-01 00:00:00'
+
+# Códigos de salida reales de winget (HRESULT sin signo, como los ve Python en Windows).
+NO_APPLICATIONS_FOUND = 0x8A150014
+UPDATE_NOT_APPLICABLE = 0x8A15002B
+
+_BAR_WIDTH = 30
+_SPINNER = '-\\|/'
+
+
+@dataclass
+class FakePackage:
+    id: str
+    name: str
+    version: str = '1.0.0'
+    available: str = ''
+    publisher: str = ''
+    size_mb: float = 50.0
+    install_seconds: float = 2.0
+    installer_type: str = 'msi'
+
+
+class FakeProcess:
+    """Proceso simulado: un hilo escribe la salida en tuberías reales del SO."""
+
+    def __init__(self, script: Callable[[Callable[[str], None], Callable[[str], None]], int]):
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        self.stdout = os.fdopen(out_r, 'rb')
+        self.stderr = os.fdopen(err_r, 'rb')
+        self.returncode: Optional[int] = None
+        self._thread = threading.Thread(
+            target=self._run, args=(script, out_w, err_w), daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, script, out_w: int, err_w: int):
+        def writer(fd):
+            def write(text: str):
+                try:
+                    os.write(fd, text.encode('utf-8'))
+                except OSError:
+                    pass
+            return write
+        try:
+            self.returncode = script(writer(out_w), writer(err_w))
+        except Exception as e:  # pragma: no cover - errores del propio simulador
+            writer(err_w)(f'fake winget: {e}\n')
+            self.returncode = 1
+        finally:
+            os.close(out_w)
+            os.close(err_w)
+
+    def poll(self) -> Optional[int]:
+        return self.returncode if not self._thread.is_alive() else None
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        self._thread.join(timeout)
+        return self.returncode
+
+
+def _arg(cmd: List[str], flag: str) -> str:
+    for idx, value in enumerate(cmd):
+        if value == flag and idx + 1 < len(cmd):
+            return cmd[idx + 1]
+        if value.startswith(flag + '='):
+            return value.split('=', 1)[1]
+    return ''
+
+
+def render_table(headers: List[str], rows: Iterable[List[str]]) -> str:
+    """Tabla de ancho fijo con cabecera y línea de guiones, como `winget list`."""
+    rows = list(rows)
+    widths = [len(h) for h in headers]
+    for row in rows:
+        for idx, value in enumerate(row):
+            widths[idx] = max(widths[idx], len(value))
+    line = lambda values: ' '.join(v.ljust(w) for v, w in zip(values, widths)).rstrip()
+    out = [line(headers), '-' * (sum(widths) + len(widths) - 1)]
+    out.extend(line(row) for row in rows)
+    return '\n'.join(out) + '\n'
+
+
+def render_list(packages: Iterable[FakePackage], source: str = 'winget') -> str:
+    packages = list(packages)
+    with_available = any(p.available for p in packages)
+    headers = ['Name', 'Id', 'Version'] + (['Available'] if with_available else []) + ['Source']
+    rows = []
+    for p in packages:
+        row = [p.name, p.id, p.version] + ([p.available] if with_available else []) + [source]
+        rows.append(row)
+    return render_table(headers, rows)
+
+
+def default_packages(catalog_path: Path = DEFAULT_CATALOG) -> List[FakePackage]:
+    """Paquetes derivados del catálogo incluido, con tamaños y tiempos deterministas."""
+    with catalog_path.open('r', encoding='utf-8') as f:
+        catalog = json.load(f)
+    packages = []
+    for apps in catalog.values():
+        for app in apps:
+            seed = zlib.crc32(app['id'].encode('utf-8'))
+            size = 5 + seed % 400
+            packages.append(FakePackage(
+                id=app['id'],
+                name=app['name'],
+                version=f'{seed % 9 + 1}.{seed % 13}.{seed % 7}',
+                publisher=app['id'].split('.')[0],
+                size_mb=float(size),
+                install_seconds=1.0 + size / 40.0,
+                installer_type=('msi', 'exe', 'inno', 'nullsoft')[seed % 4],
+            ))
+    return packages
+
+
+class FakeWinget(CommandBackend):
+    """
+    Backend que simula winget en memoria.
+
+    `time_scale` multiplica todas las latencias (0 las elimina). `installed`
+    es un mapa id -> versión instalada. `failures` asigna a un id la lista de
+    códigos de salida de sus sucesivos intentos de instalación; agotada la
+    lista, el paquete se instala bien.
+    """
+
+    def __init__(
+        self,
+        packages: Optional[Iterable[FakePackage]] = None,
+        installed: Optional[Dict[str, str]] = None,
+        time_scale: float = 1.0,
+        bandwidth_mb: float = 10.0,
+        startup_seconds: float = 0.3,
+        source_refresh_seconds: float = 1.0,
+        list_seconds: float = 2.0,
+        failures: Optional[Dict[str, List[int]]] = None,
+    ):
+        self.packages: Dict[str, FakePackage] = {
+            p.id.lower(): p for p in (packages if packages is not None else default_packages())
+        }
+        self.installed: Dict[str, str] = {k.lower(): v for k, v in (installed or {}).items()}
+        self.time_scale = time_scale
+        self.bandwidth_mb = bandwidth_mb
+        self.startup_seconds = startup_seconds
+        self.source_refresh_seconds = source_refresh_seconds
+        self.list_seconds = list_seconds
+        self.failures = {k.lower(): list(v) for k, v in (failures or {}).items()}
+        self.calls: List[List[str]] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'FakeWinget':
+        """Crea el simulador según APP_INSTALLER_FAKE_SCALE y APP_INSTALLER_FAKE_STATE."""
+        scale = float(os.environ.get(SCALE_ENV, '1.0'))
+        fake = cls(time_scale=scale)
+        state = os.environ.get(STATE_ENV)
+        if state and Path(state).exists():
+            data = json.loads(Path(state).read_text(encoding='utf-8'))
+            fake.installed = {k.lower(): v for k, v in data.get('installed', {}).items()}
+            fake.failures = {k.lower(): list(v) for k, v in data.get('failures', {}).items()}
+        return fake
+
+    # -- CommandBackend -------------------------------------------------
+
+    def spawn(self, cmd: List[str]) -> FakeProcess:
+        with self._lock:
+            self.calls.append(list(cmd))
+        return FakeProcess(lambda out, err: self._dispatch(list(cmd), out, err))
+
+    def run(self, cmd: List[str], capture: bool = True) -> subprocess.CompletedProcess:
+        proc = self.spawn(cmd)
+        chunks: Dict[str, bytes] = {}
+        reader = threading.Thread(target=lambda: chunks.update(err=proc.stderr.read()), daemon=True)
+        reader.start()
+        stdout = proc.stdout.read()
+        reader.join()
+        returncode = proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+        if not capture:
+            return subprocess.CompletedProcess(cmd, returncode, None, None)
+        return subprocess.CompletedProcess(
+            cmd,
+            returncode,
+            stdout.decode('utf-8', errors='replace'),
+            chunks.get('err', b'').decode('utf-8', errors='replace'),
+        )
+
+    # -- Simulación -----------------------------------------------------
+
+    def _sleep(self, seconds: float):
+        if self.time_scale > 0 and seconds > 0:
+            time.sleep(seconds * self.time_scale)
+
+    def _spin(self, out, seconds: float):
+        steps = max(1, int(seconds / 0.25))
+        for idx in range(steps):
+            out(f'   {_SPINNER[idx % 4]} \r')
+            self._sleep(seconds / steps)
+        out(' ' * 8 + '\r')
+
+    def _bar(self, out, seconds: float, size_mb: Optional[float] = None):
+        steps = 10
+        for idx in range(steps + 1):
+            filled = _BAR_WIDTH * idx // steps
+            bar = '█' * filled + '▒' * (_BAR_WIDTH - filled)
+            if size_mb is None:
+                out(f'  {bar}  {100 * idx // steps}%\r')
+            else:
+                out(f'  {bar}  {size_mb * idx / steps:.1f} MB / {size_mb:.1f} MB\r')
+            if idx < steps:
+                self._sleep(seconds / steps)
+        out('\n')
+
+    def _next_failure(self, key: str) -> int:
+        with self._lock:
+            codes = self.failures.get(key)
+            return codes.pop(0) if codes else 0
+
+    def _dispatch(self, cmd: List[str], out, err) -> int:
+        self._sleep(self.startup_seconds)
+        program = Path(cmd[0]).name.lower()
+        if program != 'winget':
+            return self._local_install(cmd, out)
+        verb = cmd[1] if len(cmd) > 1 else ''
+        if verb == '--version':
+            out('v1.8.1911\n')
+            return 0
+        if verb == 'list':
+            return self._list(out, upgrades_only=False)
+        if verb == 'source' and cmd[2:3] == ['list']:
+            if _arg(cmd, '--name'):
+                out(f'Name    : {_arg(cmd, "--name")}\nArgument: {SOURCE_URL}\nUpdated : {SOURCE_UPDATED}\n')
+            else:
+                out(render_table(['Name', 'Argument'], [['winget', SOURCE_URL]]))
+            return 0
+        if verb == 'install' and _arg(cmd, '--manifest'):
+            manifest = next(iter(sorted(Path(_arg(cmd, '--manifest')).glob('*.yaml'))), None)
+            fields = dict(line.split(': ', 1) for line in manifest.read_text().splitlines()
+                          if ': ' in line) if manifest else {}
+            package = self.packages.get(fields.get('PackageIdentifier', '').lower())
+            if package is None:
+                out('Manifest not found.\n')
+                return NO_APPLICATIONS_FOUND
+            return self._install(package, out, upgrade=False, force='--force' in cmd)
+        if verb == 'upgrade' and not _arg(cmd, '--id'):
+            return self._list(out, upgrades_only=True)
+        if verb in ('install', 'upgrade', 'download', 'show'):
+            package = self.packages.get(_arg(cmd, '--id').lower())
+            if package is None:
+                self._spin(out, self.source_refresh_seconds)
+                out('No package found matching input criteria.\n')
+                return NO_APPLICATIONS_FOUND
+            if verb == 'show':
+                return self._show(package, out)
+            if verb == 'download':
+                return self._download(package, Path(_arg(cmd, '--download-directory')), out)
+            return self._install(package, out, upgrade=verb == 'upgrade', force='--force' in cmd)
+        err(f'Unrecognized command: {verb}\n')
+        return 1
+
+    def _list(self, out, upgrades_only: bool) -> int:
+        self._spin(out, self.list_seconds)
+        with self._lock:
+            installed = dict(self.installed)
+        rows = []
+        for key, version in installed.items():
+            package = self.packages.get(key)
+            if package is None:
+                continue
+            target = package.available or package.version
+            available = target if target != version else ''
+            if upgrades_only and not available:
+                continue
+            rows.append(FakePackage(package.id, package.name, version, available))
+        if not rows:
+            out('No installed package found matching input criteria.\n')
+            return 0 if upgrades_only else NO_APPLICATIONS_FOUND
+        out(render_list(rows))
+        if upgrades_only:
+            out(f'{len(rows)} upgrades available.\n')
+        return 0
+
+    def _show(self, package: FakePackage, out) -> int:
+        self._spin(out, self.source_refresh_seconds)
+        out(f'Found {package.name} [{package.id}]\n')
+        out(f'Version: {package.available or package.version}\n')
+        out(f'Publisher: {package.publisher}\n')
+        out('Installer:\n')
+        out(f'  Installer Type: {package.installer_type}\n')
+        out(f'  Installer Size: {package.size_mb:.1f} MB\n')
+        return 0
+
+    def _transfer(self, package: FakePackage, out):
+        self._spin(out, self.source_refresh_seconds)
+        out(f'Found {package.name} [{package.id}] Version {package.available or package.version}\n')
+        out('This application is licensed to you by its owner.\n')
+        out(f'Downloading https://example.invalid/{package.id}.{package.installer_type}\n')
+        self._bar(out, package.size_mb / self.bandwidth_mb, package.size_mb)
+        out('Successfully verified installer hash\n')
+
+    def _download(self, package: FakePackage, directory: Path, out) -> int:
+        self._transfer(package, out)
+        directory.mkdir(parents=True, exist_ok=True)
+        version = package.available or package.version
+        stem = f'{package.id}_{version}'
+        payload = f'{package.id} {version}\n'.encode()
+        (directory / f'{stem}.yaml').write_text(
+            f'PackageIdentifier: {package.id}\n'
+            f'PackageVersion: {version}\n'
+            f'InstallerType: {package.installer_type}\n'
+            f'InstallerSha256: {hashlib.sha256(payload).hexdigest().upper()}\n'
+            'InstallerSwitches:\n'
+            '  Silent: /quiet\n',
+            encoding='utf-8',
+        )
+        (directory / f'{stem}.{package.installer_type}').write_bytes(payload)
+        out(f'Installer downloaded: {directory / stem}\n')
+        return 0
+
+    def _install(self, package: FakePackage, out, upgrade: bool, force: bool = False) -> int:
+        key = package.id.lower()
+        with self._lock:
+            current = self.installed.get(key)
+        target = package.available or package.version
+        if upgrade and current is None:
+            self._spin(out, self.source_refresh_seconds)
+            out('No installed package found matching input criteria.\n')
+            return NO_APPLICATIONS_FOUND
+        if current == target and not force:
+            self._spin(out, self.source_refresh_seconds)
+            out('Found an existing package already installed. Trying to upgrade the installed package...\n')
+            out('No available upgrade found.\n')
+            return UPDATE_NOT_APPLICABLE
+        code = self._next_failure(key)
+        self._transfer(package, out)
+        out('Starting package install...\n')
+        self._bar(out, package.install_seconds)
+        if code:
+            out(f'Installer failed with exit code: {code}\n')
+            return code
+        with self._lock:
+            self.installed[key] = target
+        out('Successfully installed\n')
+        return 0
+
+    def _local_install(self, cmd: List[str], out) -> int:
+        """Instalador descargado por `download`; el id se deduce del nombre del fichero."""
+        path = next((Path(a.strip("'")) for a in cmd if '_' in Path(a.strip("'")).name), None)
+        if 'Add-AppxPackage' in ' '.join(cmd):
+            path = Path(cmd[-1].split("'")[1])
+        package = self.packages.get(path.name.split('_')[0].lower()) if path else None
+        if package is None:
+            out('Installer not found.\n')
+            return 1602
+        code = self._next_failure(package.id.lower())
+        self._bar(out, package.install_seconds)
+        if code:
+            return code
+        with self._lock:
+            self.installed[package.id.lower()] = package.available or package.version
+        return 0
@@ -1,23 +1,110 @@
 import json
+import os
+import tempfile
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
+from . import catalog as catalog_model
+from . import trace
+from .catalog import Catalog, app_to_dict
+from .search import SearchIndex
 
-def load_catalog(path: Path) -> Dict[str, List[Dict[str, str]]]:
-    with path.open('r', encoding='utf-8') as f:
-        return json.load(f)
+
+@trace.traced('load_catalog')
+def load_catalog(
+    path: Path,
+    index: Optional[SearchIndex] = None,
+    cache_dir: Optional[Path] = catalog_model.CACHE_DIR,
+) -> Catalog:
+    """
+    Carga el catálogo validado (ver `catalog.load`); si se pasa `index`, lo
+    actualiza con las entradas que cambiaron.
+
+    Mientras el fichero no cambie se lee la copia precompilada de `cache_dir`
+    en lugar de interpretar el JSON.
+    """
+    catalog = catalog_model.load(path, cache_dir)
+    if index is not None:
+        index.update(catalog)
+    return catalog
+
+
+def validate_catalog(content: str) -> Tuple[Catalog, List[str]]:
+    """
+    Valida el texto de un catálogo.
+
+    Lanza ValueError con la línea y columna si el JSON no es válido. Devuelve el
+    catálogo y la lista de problemas de esquema (categorías que no son listas,
+    entradas sin `id` o `name`...). Los ids repetidos no son problemas: quedan
+    en `catalog.warnings`.
+    """
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError as e:
+        raise ValueError(f'línea {e.lineno}, columna {e.colno}: {e.msg}') from e
+    catalog = Catalog.from_data(data)
+    return catalog, catalog.problems
+
+
+def summarize_catalog(catalog: Dict[str, List[Dict[str, str]]]) -> str:
+    return ', '.join(f'{category}: {len(apps)}' for category, apps in catalog.items())
+
+
+def write_atomic(path: Path, content: str):
+    """Escribe en un temporal del mismo directorio y lo renombra sobre `path`."""
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, str(path))
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def selection_to_json(apps: List[Dict[str, str]]) -> str:
+    """Formato de las selecciones exportadas; también es el cuerpo que recibe el agente."""
+    return json.dumps([app_to_dict(app) for app in apps], indent=2)
+
+
+def selection_from_json(content: str) -> List[Dict[str, str]]:
+    """Lee una selección y comprueba que sea una lista de apps con `id`."""
+    apps = json.loads(content)
+    if not isinstance(apps, list) or not all(isinstance(a, dict) and a.get('id') for a in apps):
+        raise ValueError('la selección debe ser una lista de objetos con "id"')
+    return apps
 
 
 def export_selection(path: Path, apps: List[Dict[str, str]]):
-    with path.open('w', encoding='utf-8') as f:
-        json.dump(apps, f, indent=2)
+    """Guarda la selección como manifiesto compacto, o como JSON si `path` termina en .json."""
+    if path.suffix.lower() == '.json':
+        path.write_text(selection_to_json(apps), encoding='utf-8')
+    else:
+        from .profiles import write_file
+
+        write_file(path, apps)
+
+
+def import_selection(path: Path, catalog: Optional[Catalog] = None) -> List[Dict[str, str]]:
+    """
+    Lee una selección exportada (manifiesto o JSON).
 
+    Con `catalog` las apps conocidas se completan con su entrada del catálogo.
+    Lanza ValueError si alguna línea no se entiende.
+    """
+    from .profiles import read_file
 
-def import_selection(path: Path) -> List[Dict[str, str]]:
-    with path.open('r', encoding='utf-8') as f:
-        return json.load(f)
+    report = read_file(path, catalog)
+    if report.invalid:
+        raise ValueError(f'{path.name}: ' + '; '.join(report.problems()))
+    return report.apps(catalog)
 
 
 def save_backup(path: Path, apps: List[Dict[str, str]]):
     with path.open('w', encoding='utf-8') as f:
-        json.dump(apps, f, indent=2)
+        json.dump([app_to_dict(app) for app in apps], f, indent=2)
@@ -0,0 +1,176 @@
+from typing import Dict, List, Optional, Sequence, Set
+
+# Campos opcionales del catálogo que ordenan un lote:
+#   "requires": ["Id.Otro", ...]  se instala después de esos ids si están en el lote
+#   "priority": 10                 cuanto mayor, antes empieza (por defecto 0)
+#   "exclusive": true              se instala sin ninguna descarga en curso
+REQUIRES = 'requires'
+PRIORITY = 'priority'
+EXCLUSIVE = 'exclusive'
+
+
+def requires_of(app) -> List[str]:
+    value = app.get(REQUIRES) or []
+    if isinstance(value, str):
+        return [value]
+    return [dep for dep in value if isinstance(dep, str)] if isinstance(value, list) else []
+
+
+def priority_of(app) -> int:
+    value = app.get(PRIORITY, 0)
+    return value if isinstance(value, int) and not isinstance(value, bool) else 0
+
+
+def is_exclusive(app) -> bool:
+    return app.get(EXCLUSIVE) is True
+
+
+def find_cycles(apps) -> List[List[str]]:
+    """Ciclos de `requires` entre `apps`, como listas de ids (para validar el catálogo)."""
+    return InstallGraph(apps).cycles
+
+
+class InstallGraph:
+    """
+    Grafo de dependencias de un lote, indexado por la posición en `apps`.
+
+    Solo cuentan los `requires` que están en el propio lote: los demás se dan
+    por instalados (el planificador ya omitió los que lo estaban). Si hay un
+    ciclo, sus aristas se descartan y esos paquetes siguen el orden de la
+    selección; `cycles` recoge los ids de cada ciclo.
+
+    `weights` es la duración esperada de cada paquete (1 si no se pasa). La
+    ruta crítica de un paquete es su peso más el de la cadena más larga de
+    paquetes que dependen de él; empezar por las rutas críticas más largas
+    acorta el lote completo.
+    """
+
+    def __init__(self, apps: Sequence, weights: Optional[Sequence[float]] = None):
+        self.apps = apps
+        index = {}
+        for idx, app in enumerate(apps):
+            index.setdefault(app['id'].lower(), idx)
+        self.requires: List[Set[int]] = [
+            {index[dep.lower()] for dep in requires_of(app) if dep.lower() in index} - {idx}
+            for idx, app in enumerate(apps)
+        ]
+        self.cycles: List[List[str]] = []
+        self.order = self._topological_order()
+        self.dependents: List[Set[int]] = [set() for _ in apps]
+        for idx, deps in enumerate(self.requires):
+            for dep in deps:
+                self.dependents[dep].add(idx)
+
+        weights = list(weights) if weights is not None else [1.0] * len(apps)
+        self.critical_path: List[float] = [0.0] * len(apps)
+        for idx in reversed(self.order):
+            tail = max((self.critical_path[d] for d in self.dependents[idx]), default=0.0)
+            self.critical_path[idx] = weights[idx] + tail
+
+    def _strongly_connected(self) -> List[List[int]]:
+        """Componentes fuertemente conexas con más de un paquete (Tarjan, sin recursión)."""
+        counter = 0
+        number: Dict[int, int] = {}
+        low: Dict[int, int] = {}
+        stack: List[int] = []
+        on_stack: Set[int] = set()
+        components = []
+        for root in range(len(self.apps)):
+            if root in number:
+                continue
+            work = [(root, iter(sorted(self.requires[root])))]
+            number[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, edges = work[-1]
+                dep = next(edges, None)
+                if dep is not None:
+                    if dep not in number:
+                        number[dep] = low[dep] = counter
+                        counter += 1
+                        stack.append(dep)
+                        on_stack.add(dep)
+                        work.append((dep, iter(sorted(self.requires[dep]))))
+                    elif dep in on_stack:
+                        low[node] = min(low[node], number[dep])
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == number[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1:
+                        components.append(sorted(component))
+        return sorted(components)
+
+    def _topological_order(self) -> List[int]:
+        """
+        Orden topológico por niveles (Kahn).
+
+        Antes se rompen los ciclos: de cada componente fuertemente conexa solo
+        se descartan las aristas entre sus miembros, así que lo que depende de
+        un ciclo sigue esperando a sus dependencias.
+        """
+        for component in self._strongly_connected():
+            members = set(component)
+            self.cycles.append([self.apps[idx]['id'] for idx in component])
+            for idx in component:
+                self.requires[idx] -= members
+
+        missing = [len(deps) for deps in self.requires]
+        waiting: Dict[int, List[int]] = {}
+        for idx, deps in enumerate(self.requires):
+            for dep in deps:
+                waiting.setdefault(dep, []).append(idx)
+        level = [idx for idx, count in enumerate(missing) if not count]
+        levels = []
+        while level:
+            levels.append(level)
+            following = []
+            for current in level:
+                for idx in waiting.get(current, ()):
+                    missing[idx] -= 1
+                    if not missing[idx]:
+                        following.append(idx)
+            level = following
+        self._levels = levels
+        return [idx for level in levels for idx in level]
+
+    def sequential_order(self) -> List[int]:
+        """Orden topológico para instalar de uno en uno (modo interactivo)."""
+        return [idx for level in self._levels
+                for idx in sorted(level, key=lambda idx: (self.rank(idx), -idx), reverse=True)]
+
+    def rank(self, idx: int) -> tuple:
+        """Clave de prioridad: mayor `priority` y, a igualdad, ruta crítica más larga."""
+        return (priority_of(self.apps[idx]), self.critical_path[idx])
+
+    def exclusive(self, idx: int) -> bool:
+        return is_exclusive(self.apps[idx])
+
+    def ready(self, idx: int, done: Set[int]) -> bool:
+        return self.requires[idx] <= done
+
+    def blocked_by(self, idx: int, failed: Set[int]) -> Optional[int]:
+        """Primera dependencia de `idx` que falló, o None."""
+        return next((dep for dep in sorted(self.requires[idx]) if dep in failed), None)
+
+    def pick(self, candidates: Sequence[int], done: Set[int]) -> Optional[int]:
+        """El candidato con dependencias cumplidas y mayor `rank`, o None."""
+        ready = [idx for idx in candidates if self.ready(idx, done)]
+        if not ready:
+            return None
+        return max(ready, key=lambda idx: (self.rank(idx), -idx))
+
+    def download_order(self) -> List[int]:
+        """Todo el lote de mayor a menor `rank`: lo largo y lo que desbloquea más, primero."""
+        return sorted(range(len(self.apps)), key=lambda idx: (self.rank(idx), -idx), reverse=True)
@@ -0,0 +1,190 @@
+import platform
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .paths import DATA_DIR
+
+HISTORY_PATH = DATA_DIR / 'logs' / 'history.sqlite3'
+# Duraciones supuestas (descarga, instalación) cuando no hay historial.
+DEFAULT_DURATIONS = (30.0, 60.0)
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    machine TEXT NOT NULL,
+    started TEXT NOT NULL,
+    finished TEXT,
+    packages INTEGER NOT NULL,
+    failures INTEGER
+);
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    machine TEXT NOT NULL,
+    package_id TEXT NOT NULL,
+    name TEXT,
+    attempt INTEGER NOT NULL,
+    final INTEGER NOT NULL,
+    returncode INTEGER NOT NULL,
+    error_class TEXT,
+    started TEXT NOT NULL,
+    ended TEXT NOT NULL,
+    duration REAL NOT NULL,
+    download_duration REAL,
+    install_duration REAL
+);
+CREATE INDEX IF NOT EXISTS attempts_package ON attempts(package_id);
+'''
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por interpolación lineal de una lista ya ordenada."""
+    if not values:
+        return 0.0
+    pos = (len(values) - 1) * pct / 100.0
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+
+def batch_duration(expected: List[Tuple[float, float]], workers: int) -> float:
+    """
+    Duración estimada de un lote a partir de (descarga, instalación) de cada
+    paquete: la cola de instalación es secuencial y las descargas se reparten
+    entre `workers` hilos, como en `InstallScheduler.eta`.
+    """
+    install = sum(item[1] for item in expected)
+    download = sum(item[0] for item in expected)
+    return max(install, download / max(1, workers))
+
+
+class HistoryStore:
+    """
+    Historial persistente de instalaciones en SQLite.
+
+    Cada ejecución del planificador es un `run`; cada intento de cada paquete
+    es una fila de `attempts` (la última de un paquete lleva `final = 1` y los
+    tiempos de descarga e instalación). Las consultas devuelven percentiles
+    de duración, tasas de fallo y los paquetes más lentos.
+    """
+
+    def __init__(self, path: Path = HISTORY_PATH, machine: Optional[str] = None):
+        self.path = path
+        self.machine = machine or platform.node() or 'local'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def start_run(self, packages: int) -> int:
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                'INSERT INTO runs (machine, started, packages) VALUES (?, ?, ?)',
+                (self.machine, datetime.now().isoformat(), packages),
+            )
+            return cur.lastrowid
+
+    def finish_run(self, run_id: int, failures: int):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE runs SET finished = ?, failures = ? WHERE id = ?',
+                (datetime.now().isoformat(), failures, run_id),
+            )
+
+    def record(self, run_id: int, result) -> None:
+        """Guarda los intentos de un `InstallResult` terminado."""
+        attempts = result.attempts or []
+        rows = []
+        for attempt in attempts[:-1]:
+            rows.append((
+                run_id, self.machine, result.id, result.name, attempt.number, 0,
+                attempt.returncode, attempt.error_class, attempt.start.isoformat(),
+                attempt.end.isoformat(), (attempt.end - attempt.start).total_seconds(), None, None,
+            ))
+        final_class = attempts[-1].error_class if attempts else None
+        rows.append((
+            run_id, self.machine, result.id, result.name, len(attempts) or 1, 1,
+            result.returncode, final_class, result.start.isoformat(), result.end.isoformat(),
+            result.duration, result.download_duration, result.install_duration,
+        ))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT INTO attempts (run_id, machine, package_id, name, attempt, final, returncode, '
+                'error_class, started, ended, duration, download_duration, install_duration) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                rows,
+            )
+
+    def _column(self, column: str, package_id: Optional[str] = None) -> List[float]:
+        sql = f'SELECT {column} FROM attempts WHERE final = 1 AND returncode = 0 AND {column} IS NOT NULL'
+        params: Tuple = ()
+        if package_id is not None:
+            sql += ' AND package_id = ? COLLATE NOCASE'
+            params = (package_id,)
+        with self._lock:
+            values = [row[0] for row in self._conn.execute(sql + f' ORDER BY {column}', params)]
+        return values
+
+    def duration_stats(self, package_id: str) -> Dict[str, float]:
+        """Número de instalaciones correctas y percentiles p50/p95 de su duración."""
+        values = self._column('duration', package_id)
+        return {
+            'count': len(values),
+            'p50': percentile(values, 50),
+            'p95': percentile(values, 95),
+        }
+
+    def failure_rate(self, package_id: Optional[str] = None) -> float:
+        """Fracción de paquetes cuyo resultado final fue un error."""
+        sql = 'SELECT COUNT(*), SUM(returncode != 0) FROM attempts WHERE final = 1'
+        params: Tuple = ()
+        if package_id is not None:
+            sql += ' AND package_id = ? COLLATE NOCASE'
+            params = (package_id,)
+        with self._lock:
+            total, failed = self._conn.execute(sql, params).fetchone()
+        return (failed or 0) / total if total else 0.0
+
+    def slowest(self, limit: int = 10) -> List[Tuple[str, float, int]]:
+        """Los `limit` paquetes con mayor duración mediana: (id, p50, instalaciones)."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT package_id, duration FROM attempts '
+                'WHERE final = 1 AND returncode = 0 ORDER BY package_id, duration'
+            ).fetchall()
+        grouped: Dict[str, List[float]] = {}
+        for package_id, duration in rows:
+            grouped.setdefault(package_id, []).append(duration)
+        stats = [(pkg, percentile(values, 50), len(values)) for pkg, values in grouped.items()]
+        stats.sort(key=lambda item: item[1], reverse=True)
+        return stats[:limit]
+
+    def expected_durations(self, package_ids: List[str], fallback: bool = True) -> Dict[str, Tuple[float, float]]:
+        """
+        Duración esperada (descarga, instalación) de cada id según su mediana.
+
+        Los ids sin historial usan la mediana global o, si no hay datos,
+        `DEFAULT_DURATIONS`; con `fallback=False` se omiten.
+        """
+        default = None
+        expected = {}
+        for package_id in package_ids:
+            install = self._column('install_duration', package_id)
+            if install:
+                download = self._column('download_duration', package_id)
+                expected[package_id] = (percentile(download, 50), percentile(install, 50))
+            elif fallback:
+                if default is None:
+                    default = (
+                        percentile(self._column('download_duration'), 50) or DEFAULT_DURATIONS[0],
+                        percentile(self._column('install_duration'), 50) or DEFAULT_DURATIONS[1],
+                    )
+                expected[package_id] = default
+        return expected
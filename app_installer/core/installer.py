@@ -1,15 +1,40 @@
-import subprocess
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Union
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
-# Intentar importar rich.progress si está disponible
-try:
-    from rich.progress import Progress
-    _RICH_AVAILABLE = True
-except Exception:  # pragma: no cover - optional dependency
-    _RICH_AVAILABLE = False
+from . import scanner, trace
+from .backend import get_backend
+from .logger import LOG_PATH, get_logger
+from .process import ProgressCallback, run_streaming
+from .graph import InstallGraph
+from .retry import MISSING_DEPENDENCY, Attempt, RetryPolicy
+from .planner import INSTALL, UPGRADE, InstallPlan
+
+
+# Número de descargas simultáneas por defecto. La fase de instalación siempre
+# es secuencial porque Windows Installer mantiene un mutex global.
+DEFAULT_MAX_WORKERS = 4
+# Códigos de Windows Installer que indican éxito con reinicio pendiente
+# (ERROR_SUCCESS_REBOOT_REQUIRED y ERROR_SUCCESS_REBOOT_INITIATED).
+REBOOT_CODES = (3010, 1641)
+
+
+@dataclass
+class DownloadResult:
+    id: str
+    returncode: int
+    directory: Path
+    stdout: str
+    stderr: str
+    start: datetime
+    end: datetime
+    installer: Optional[Path] = None
+    manifest: Optional[Path] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end - self.start).total_seconds()
 
 
 @dataclass
@@ -21,103 +46,428 @@ class InstallResult:
     stderr: str
     start: datetime
     end: datetime
+    download_start: Optional[datetime] = None
+    download_end: Optional[datetime] = None
+    install_start: Optional[datetime] = None
+    # Historial de intentos cuando el planificador reintenta fallos transitorios.
+    attempts: List[Attempt] = field(default_factory=list)
+    action: str = INSTALL
+    # El instalador terminó bien pero pide reiniciar (3010, 1641).
+    reboot_required: bool = False
 
     @property
     def duration(self) -> float:
         return (self.end - self.start).total_seconds()
 
+    @property
+    def download_duration(self) -> float:
+        if self.download_start is None or self.download_end is None:
+            return 0.0
+        return (self.download_end - self.download_start).total_seconds()
 
-LOG_PATH = Path(__file__).resolve().parent.parent / 'logs' / 'install.log'
+    @property
+    def install_duration(self) -> float:
+        return (self.end - (self.install_start or self.start)).total_seconds()
 
 
-def is_winget_available() -> bool:
+def _rich_progress():
+    """
+    Devuelve `rich.progress.Progress` si rich está disponible, o None.
+
+    Se importa al mostrar la primera barra y no al cargar el módulo: la
+    interfaz gráfica nunca la usa y rich tarda en importarse.
+    """
     try:
-        subprocess.run(['winget', '--version'], capture_output=True, check=True)
+        from rich.progress import Progress
+    except Exception:  # pragma: no cover - optional dependency
+        return None
+    return Progress
+
+
+# Backend con el que winget ya respondió; la comprobación no se repite con él.
+_winget_checked = None
+
+
+def is_winget_available() -> bool:
+    """
+    Comprueba con `winget --version` que winget responde.
+
+    Un resultado positivo se recuerda mientras no cambie el backend, así que
+    solo la primera llamada lanza un proceso; uno negativo se vuelve a
+    comprobar (winget puede instalarse con la aplicación abierta).
+    """
+    global _winget_checked
+    backend = get_backend()
+    if backend is _winget_checked:
         return True
+    try:
+        available = backend.run(['winget', '--version']).returncode == 0
     except Exception:
         return False
+    if available:
+        _winget_checked = backend
+    return available
+
 
+@trace.traced('log')
+def log(message: Optional[str] = None, **fields):
+    """Añade un registro JSON a `LOG_PATH` (escritura diferida en segundo plano)."""
+    get_logger().event(message, **fields)
 
-def log(message: str):
-    LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with LOG_PATH.open('a', encoding='utf-8') as f:
-        f.write(f"{datetime.now().isoformat()} - {message}\n")
 
+# Argumentos silenciosos por tipo de instalador, equivalentes a los que usa
+# winget cuando el manifiesto no define `InstallerSwitches.Silent`.
+_SILENT_SWITCHES = {
+    'inno': ['/VERYSILENT', '/SUPPRESSMSGBOXES', '/NORESTART', '/SP-'],
+    'nullsoft': ['/S'],
+    'burn': ['/quiet', '/norestart'],
+}
 
-def install_app(app: Dict[str, str], interactive: bool = False) -> InstallResult:
+
+def _read_manifest(path: Path) -> Dict[str, str]:
+    """Lee las claves escalares del manifiesto que genera `winget download`."""
+    fields: Dict[str, str] = {}
+    for line in path.read_text(encoding='utf-8', errors='replace').splitlines():
+        key, sep, value = line.strip().lstrip('- ').partition(':')
+        if sep and value.strip() and key not in fields:
+            fields[key] = value.strip().strip('\'"')
+    return fields
+
+
+def _success_codes(path: Path) -> List[int]:
     """
-    Instala una aplicación usando winget.
+    Códigos de `InstallerSuccessCodes` del manifiesto, en forma de lista YAML
+    (`- 3010`) o en línea (`[3010, 1641]`).
+    """
+    codes: List[int] = []
+    lines = path.read_text(encoding='utf-8', errors='replace').splitlines()
+    for pos, line in enumerate(lines):
+        key, sep, value = line.strip().lstrip('- ').partition(':')
+        if not sep or key != 'InstallerSuccessCodes':
+            continue
+        items = value.strip().strip('[]').split(',') if value.strip() else []
+        if not items:
+            indent = len(line) - len(line.lstrip())
+            for follow in lines[pos + 1:]:
+                text = follow.strip()
+                if not text.startswith('-') or len(follow) - len(follow.lstrip()) < indent:
+                    break
+                items.append(text[1:])
+        for item in items:
+            try:
+                codes.append(int(item.strip().strip('\'"'), 0))
+            except ValueError:
+                continue
+    return codes
 
-    Si `interactive` es True, permite interacción en terminal y no captura salida.
-    De lo contrario, se usa instalación silenciosa y se capturan stdout/stderr.
+
+@trace.traced('download_app')
+def download_app(
+    app: Dict[str, str],
+    directory: Path,
+    on_progress: Optional[ProgressCallback] = None,
+) -> DownloadResult:
+    """
+    Descarga el instalador de una aplicación con `winget download` sin instalarla.
+
+    El instalador y su manifiesto quedan en `directory`; la fase de instalación
+    los usa para no volver a descargar el paquete. Si la app trae `version`
+    se descarga esa versión.
     """
     start = datetime.now()
+    directory.mkdir(parents=True, exist_ok=True)
     cmd = [
         'winget',
-        'install',
+        'download',
         '--id',
         app['id'],
+        '--download-directory',
+        str(directory),
+        '--accept-package-agreements',
+        '--accept-source-agreements',
     ]
+    if app.get('version'):
+        cmd.extend(['--version', app['version']])
+    proc = run_streaming(cmd, on_progress=on_progress)
+    end = datetime.now()
+
+    manifest = next(iter(sorted(directory.glob('*.yaml'))), None)
+    installer = None
+    if proc.returncode == 0 and manifest is not None:
+        installer = next(
+            (p for p in sorted(directory.iterdir()) if p.stem == manifest.stem and p != manifest),
+            None,
+        )
 
-    if not interactive:
-        cmd.append('--silent')
-    cmd.extend([
+    log(
+        id=app['id'],
+        phase='download',
+        returncode=proc.returncode,
+        duration=(end - start).total_seconds(),
+        stderr=proc.stderr if proc.returncode != 0 else None,
+    )
+    return DownloadResult(
+        id=app['id'],
+        returncode=proc.returncode,
+        directory=directory,
+        stdout=proc.stdout,
+        stderr=proc.stderr,
+        start=start,
+        end=end,
+        installer=installer,
+        manifest=manifest,
+    )
+
+
+def _local_install_cmd(download: DownloadResult) -> Optional[List[str]]:
+    """
+    Construye el comando para ejecutar un instalador ya descargado.
+
+    Devuelve None cuando el tipo de instalador no se puede lanzar en silencio
+    sin winget; en ese caso se usa `_manifest_install_cmd`.
+    """
+    if download.returncode != 0 or download.installer is None or download.manifest is None:
+        return None
+    manifest = _read_manifest(download.manifest)
+    installer_type = manifest.get('InstallerType', '').lower()
+    path = str(download.installer)
+    custom = manifest.get('Custom', '').split()
+
+    if installer_type in ('msi', 'wix'):
+        return ['msiexec', '/i', path, '/qn', '/norestart'] + custom
+    if installer_type in ('msix', 'appx'):
+        # Dentro de comillas simples de PowerShell, ' se escribe ''
+        quoted = path.replace("'", "''")
+        return ['powershell', '-NoProfile', '-Command', f"Add-AppxPackage -Path '{quoted}'"]
+    silent = manifest.get('Silent', '').split() or _SILENT_SWITCHES.get(installer_type)
+    if installer_type in ('exe', 'inno', 'nullsoft', 'burn') and silent:
+        return [path] + silent + custom
+    return None
+
+
+def _manifest_install_cmd(download: DownloadResult) -> Optional[List[str]]:
+    """
+    `winget install --manifest` sobre el manifiesto descargado, para los
+    instaladores que no se pueden lanzar en silencio directamente (exe sin
+    parámetros conocidos, portables, zip).
+    """
+    if download.returncode != 0 or download.manifest is None:
+        return None
+    return [
+        'winget',
+        'install',
+        '--manifest',
+        str(download.manifest.parent),
+        '--silent',
         '--accept-package-agreements',
         '--accept-source-agreements',
-    ])
+    ]
 
-    if interactive:
-        proc = subprocess.run(cmd, text=True)
-        stdout = proc.stdout or ''
-        stderr = proc.stderr or ''
-    else:
-        proc = subprocess.run(cmd, capture_output=True, text=True)
-        stdout = proc.stdout
-        stderr = proc.stderr
+
+@trace.traced('install_app')
+def install_app(
+    app: Dict[str, str],
+    interactive: bool = False,
+    download: Optional[DownloadResult] = None,
+    on_progress: Optional[ProgressCallback] = None,
+    cache=None,
+    upgrade: bool = False,
+    force: bool = False,
+) -> InstallResult:
+    """
+    Instala una aplicación usando winget.
+
+    Si `interactive` es True, permite interacción en terminal y no captura salida.
+    De lo contrario, se usa instalación silenciosa y la salida se lee en streaming:
+    el progreso se entrega a `on_progress` y stdout/stderr conservan el texto útil.
+    Si se pasa `download`, se ejecuta el instalador ya descargado cuando es
+    posible y, si no, `winget install --manifest` con su manifiesto. Al lanzar
+    el instalador directamente, REBOOT_CODES y los `InstallerSuccessCodes` del
+    manifiesto cuentan como éxito: el resultado queda con código 0 y, para
+    REBOOT_CODES, con `reboot_required`.
+    Sin `download`, si `cache` (una `PackageCache`) tiene el paquete se instala
+    desde la copia local. Con `upgrade` se recurre a `winget upgrade` en lugar
+    de `winget install` cuando no hay instalador local. Con `force` los
+    comandos de winget llevan `--force` y reinstalan aunque el paquete ya esté
+    instalado.
+    """
+    start = datetime.now()
+    leased = None
+    if download is None and cache is not None and not interactive:
+        download = leased = cache.lookup(app['id'], cache.target_version(app))
+    cmd = None if interactive or download is None else _local_install_cmd(download)
+    if cmd is None and not interactive and download is not None and download.manifest is not None:
+        cmd = _manifest_install_cmd(download)
+    if cmd is None:
+        cmd = [
+            'winget',
+            'upgrade' if upgrade else 'install',
+            '--id',
+            app['id'],
+        ]
+        if app.get('version'):
+            cmd.extend(['--version', app['version']])
+
+        if not interactive:
+            cmd.append('--silent')
+        cmd.extend([
+            '--accept-package-agreements',
+            '--accept-source-agreements',
+        ])
+    if force and cmd[0] == 'winget':
+        cmd.append('--force')
+
+    try:
+        if interactive:
+            proc = get_backend().run(cmd, capture=False)
+            stdout = proc.stdout or ''
+            stderr = proc.stderr or ''
+        else:
+            proc = run_streaming(cmd, on_progress=on_progress)
+            stdout = proc.stdout
+            stderr = proc.stderr
+    finally:
+        if leased is not None:
+            cache.release(leased)
 
     end = datetime.now()
+    returncode = proc.returncode
+    reboot_required = False
+    if returncode != 0 and cmd[0] != 'winget':
+        # winget ya interpreta estos códigos; el instalador lanzado a mano no
+        reboot_required = returncode in REBOOT_CODES
+        if reboot_required or returncode in _success_codes(download.manifest):
+            returncode = 0
+    if returncode == 0:
+        scanner.invalidate_snapshot()
 
-    log(f"Installed {app['id']}: {proc.returncode}")
-    if stdout:
-        log(stdout)
-    if stderr:
-        log(stderr)
+    failed = returncode != 0
+    log(
+        id=app['id'],
+        phase='install',
+        action=UPGRADE if upgrade else None,
+        returncode=proc.returncode,
+        reboot_required=reboot_required or None,
+        duration=(end - start).total_seconds(),
+        local=cmd[0] != 'winget' or '--manifest' in cmd,
+        stdout=stdout if failed else None,
+        stderr=stderr if failed else None,
+    )
 
     return InstallResult(
         name=app.get('name', ''),
         id=app['id'],
-        returncode=proc.returncode,
+        returncode=returncode,
         stdout=stdout,
         stderr=stderr,
-        start=start,
+        start=download.start if download is not None else start,
         end=end,
+        download_start=download.start if download is not None else None,
+        download_end=download.end if download is not None else None,
+        install_start=start,
+        action=UPGRADE if upgrade else INSTALL,
+        reboot_required=reboot_required,
+    )
+
+
+def blocked_result(app: Dict[str, str], blocker: Dict[str, str], upgrade: bool = False) -> InstallResult:
+    """Resultado de un paquete que no se instala porque falló `blocker`, una de sus dependencias."""
+    now = datetime.now()
+    reason = f"no se instaló porque falló {blocker.get('name', blocker['id'])}"
+    log(reason, id=app['id'], phase='install', requires=blocker['id'])
+    return InstallResult(
+        name=app.get('name', app['id']),
+        id=app['id'],
+        returncode=MISSING_DEPENDENCY,
+        stdout='',
+        stderr=reason,
+        start=now,
+        end=now,
+        action=UPGRADE if upgrade else INSTALL,
     )
 
 
 def install_apps(
-    apps: List[Dict[str, str]],
+    apps: Union[List[Dict[str, str]], InstallPlan],
     show_progress: bool = False,
     interactive: bool = False,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    retry_policy: Optional[RetryPolicy] = None,
+    history_store=None,
+    cache=None,
+    upgrade: bool = False,
+    force: bool = False,
 ) -> List[InstallResult]:
     """
     Instala múltiples aplicaciones. Si show_progress es True y rich está disponible,
     se muestra una barra de progreso.
+
+    Las descargas se ejecutan en paralelo con hasta `max_workers` hilos y las
+    instalaciones de una en una, respetando los campos `requires`, `priority`
+    y `exclusive` del catálogo (ver `graph.InstallGraph`). En modo interactivo no hay fase de descarga ni
+    reintentos; en el resto los fallos transitorios se reintentan según `retry_policy`.
+
+    Si `apps` es un `InstallPlan` solo se procesan los elementos a instalar o
+    actualizar; los ya instalados se omiten sin llamar a winget.
+
+    Con `history_store` (un `HistoryStore`) los resultados se guardan en el
+    historial y las descargas más largas se lanzan primero. Con `cache` (una
+    `PackageCache`) los paquetes cacheados no se descargan y los descargados
+    se guardan en ella. Con `upgrade` los paquetes se actualizan (ver
+    `planner.build_upgrade_plan`). Con `force` se reinstalan aunque ya estén
+    instalados (ver `install_app`).
     """
+    from .scheduler import InstallScheduler
+
+    if isinstance(apps, InstallPlan):
+        apps = apps.pending
+
     results: List[InstallResult] = []
+    verb = 'Actualizando' if upgrade else 'Instalando'
 
-    if show_progress and _RICH_AVAILABLE:
+    if interactive:
+        graph = InstallGraph(apps)
+        by_position = {}
+        failed = set()
+        for number, idx in enumerate(graph.sequential_order(), start=1):
+            app = apps[idx]
+            blocker = graph.blocked_by(idx, failed)
+            if blocker is not None:
+                result = blocked_result(app, apps[blocker], upgrade=upgrade)
+            else:
+                if show_progress:
+                    print(f"[{number}/{len(apps)}] {verb} {app.get('name', app['id'])}")
+                result = install_app(app, interactive=True, upgrade=upgrade, force=force)
+            if result.returncode != 0:
+                failed.add(idx)
+            by_position[idx] = result
+        return [by_position[idx] for idx in range(len(apps))]
+
+    Progress = _rich_progress() if show_progress else None
+    if Progress is not None:
         with Progress() as progress:
-            task = progress.add_task("Instalando", total=len(apps))
-            for app in apps:
-                progress.update(task, description=f"Instalando {app.get('name', app['id'])}")
-                result = install_app(app, interactive=interactive)
-                results.append(result)
-                progress.advance(task)
+            task = progress.add_task(verb, total=len(apps))
+            scheduler = InstallScheduler(
+                max_workers=max_workers,
+                retry_policy=retry_policy,
+                history_store=history_store,
+                cache=cache,
+                upgrade=upgrade,
+                force=force,
+                on_status=lambda app, phase: progress.update(
+                    task, description=f"{verb} {app.get('name', app['id'])}"
+                ) if phase == 'install' else None,
+                on_result=lambda result: progress.advance(task),
+            )
+            results = scheduler.run(apps)
     else:
-        for idx, app in enumerate(apps, start=1):
-            if show_progress:
-                print(f"[{idx}/{len(apps)}] Instalando {app.get('name', app['id'])}")
-            result = install_app(app, interactive=interactive)
-            results.append(result)
+        def on_status(app, phase):
+            if show_progress and phase == 'install':
+                print(f"[{scheduler.installed + 1}/{len(apps)}] {verb} {app.get('name', app['id'])}")
+
+        scheduler = InstallScheduler(max_workers=max_workers, on_status=on_status,
+                                     retry_policy=retry_policy, history_store=history_store,
+                                     cache=cache, upgrade=upgrade, force=force)
+        results = scheduler.run(apps)
 
     return results
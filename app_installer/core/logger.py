@@ -0,0 +1,150 @@
+import atexit
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from . import trace
+from .paths import DATA_DIR
+from .process import parse_progress
+
+LOG_PATH = DATA_DIR / 'logs' / 'install.jsonl'
+MAX_BYTES = 1024 * 1024
+BACKUP_COUNT = 3
+FLUSH_INTERVAL = 1.0
+# Registros pendientes a partir de los cuales se despierta al hilo de escritura.
+_FLUSH_THRESHOLD = 500
+
+
+def collapse_redraws(text: str) -> str:
+    """
+    Reduce la salida de winget a su estado final.
+
+    De cada línea se queda lo que hay tras el último retorno de carro y se
+    descartan los spinners y barras de progreso.
+    """
+    lines = []
+    for line in text.splitlines():
+        line = line.rsplit('\r', 1)[-1].rstrip()
+        if line.strip() and parse_progress(line) is None:
+            lines.append(line)
+    return '\n'.join(lines)
+
+
+class InstallLogger:
+    """
+    Registro JSON-lines con un único descriptor abierto.
+
+    `write` solo encola el registro; un hilo en segundo plano lo vuelca al
+    disco cada `flush_interval` segundos, en una sola escritura por lote, y
+    rota el fichero cuando supera `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        path: Path = LOG_PATH,
+        max_bytes: int = MAX_BYTES,
+        backup_count: int = BACKUP_COUNT,
+        flush_interval: float = FLUSH_INTERVAL,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self._pending: List[str] = []
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._handle = None
+        self._thread = threading.Thread(target=self._run, name='install-log', daemon=True)
+        self._thread.start()
+
+    def write(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._pending.append(line)
+            if len(self._pending) >= _FLUSH_THRESHOLD:
+                self._wake.set()
+
+    def event(self, message: Optional[str] = None, **fields):
+        record = {'ts': datetime.now().isoformat()}
+        if message is not None:
+            record['message'] = message
+        for key in ('stdout', 'stderr'):
+            if fields.get(key):
+                fields[key] = collapse_redraws(fields[key])
+        record.update({k: v for k, v in fields.items() if v not in (None, '')})
+        self.write(record)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        data = '\n'.join(pending) + '\n'
+        with trace.span('log.flush', records=len(pending)), self._io_lock:
+            handle = self._open()
+            handle.write(data)
+            handle.flush()
+            if handle.tell() >= self.max_bytes:
+                self._rotate()
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self.flush()
+        with self._io_lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def _open(self):
+        if self._handle is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._handle = self.path.open('a', encoding='utf-8')
+        return self._handle
+
+    def _rotate(self):
+        self._handle.close()
+        self._handle = None
+        for idx in range(self.backup_count - 1, 0, -1):
+            src = self.path.with_name(f'{self.path.name}.{idx}')
+            if src.exists():
+                src.replace(self.path.with_name(f'{self.path.name}.{idx + 1}'))
+        if self.backup_count > 0:
+            self.path.replace(self.path.with_name(f'{self.path.name}.1'))
+        else:
+            self.path.unlink()
+
+
+_logger: Optional[InstallLogger] = None
+_logger_lock = threading.Lock()
+
+
+def set_logger(logger: Optional[InstallLogger]):
+    """Sustituye el registro global (p. ej. para escribir en otro fichero)."""
+    global _logger
+    with _logger_lock:
+        if _logger is not None and _logger is not logger:
+            _logger.close()
+        _logger = logger
+
+
+def get_logger() -> InstallLogger:
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            _logger = InstallLogger()
+            atexit.register(_logger.close)
+        return _logger
@@ -0,0 +1,352 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from . import trace
+from .backend import get_backend
+from .catalog import app_to_dict
+from .file_manager import write_atomic
+from .paths import DATA_DIR
+
+METADATA_PATH = DATA_DIR / 'cache' / 'metadata.json'
+# Segundos que vale una entrada de `winget show`; las fallidas se reintentan antes.
+METADATA_TTL = 7 * 24 * 3600
+FAILED_TTL = 3600
+# Procesos de `winget show` simultáneos durante la precarga.
+PREFETCH_WORKERS = 4
+# Entradas nuevas entre escrituras del fichero durante la precarga.
+SAVE_EVERY = 25
+# winget show casi nunca indica el tamaño; se pide al servidor del instalador.
+HEAD_TIMEOUT = 10
+_FORMAT = 1
+
+# Etiquetas de `winget show` en inglés y español.
+_LABELS = {
+    'version': 'version',
+    'versión': 'version',
+    'publisher': 'publisher',
+    'editor': 'publisher',
+    'installer type': 'installer_type',
+    'tipo de instalador': 'installer_type',
+    'installer size': 'size',
+    'tamaño del instalador': 'size',
+    'installer url': 'installer_url',
+    'dirección url del instalador': 'installer_url',
+}
+_LINE = re.compile(r'^\s*([^:]+?):\s*(.*)$')
+_UPDATED_LABELS = {'updated', 'actualizado', 'última actualización'}
+_SIZE = re.compile(r'^([\d.,]+)\s*([KMG]?B)$', re.IGNORECASE)
+_SIZE_UNITS = {'b': 1 / 1048576, 'kb': 1 / 1024, 'mb': 1.0, 'gb': 1024.0}
+
+
+@dataclass
+class PackageInfo:
+    """Datos de `winget show` de un paquete, con el momento en que se obtuvieron."""
+    id: str
+    version: str = ''
+    publisher: str = ''
+    installer_type: str = ''
+    installer_url: str = ''
+    size_mb: Optional[float] = None
+    fetched: float = 0.0
+    # False si `winget show` falló (id desconocido, sin red...)
+    ok: bool = True
+    # Huellas de la fuente de winget y de la entrada del catálogo al obtenerla
+    source: str = ''
+    catalog: str = ''
+
+
+def parse_size(text: str) -> Optional[float]:
+    """'58.3 MB' -> 58.3; None si no se entiende."""
+    match = _SIZE.match(text.strip())
+    if not match:
+        return None
+    try:
+        value = float(match.group(1).replace(',', '.'))
+    except ValueError:
+        return None
+    return value * _SIZE_UNITS[match.group(2).lower()]
+
+
+def parse_show(output: str) -> Dict[str, str]:
+    """
+    Campos de la salida de `winget show`: version, publisher, installer_type,
+    installer_url y size.
+
+    Solo se toma la primera aparición de cada etiqueta, porque las de la
+    sección "Installer:" no se repiten arriba. Las líneas de progreso que
+    winget reescribe con "\\r" se descartan.
+    """
+    fields: Dict[str, str] = {}
+    for line in output.splitlines():
+        line = line.rsplit('\r', 1)[-1]
+        match = _LINE.match(line)
+        if not match:
+            continue
+        key = _LABELS.get(match.group(1).strip().lower())
+        if key and key not in fields and match.group(2).strip():
+            fields[key] = match.group(2).strip()
+    return fields
+
+
+def app_fingerprint(app) -> str:
+    """Huella de una entrada del catálogo; si la entrada cambia, su caché deja de valer."""
+    data = json.dumps(app_to_dict(app), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()[:12]
+
+
+def source_fingerprint() -> str:
+    """
+    Huella de las fuentes de winget (`winget source list`).
+
+    Si se añade, quita o cambia una fuente, las entradas obtenidas antes dejan
+    de estar vigentes. Si el comando falla devuelve ''.
+    """
+    try:
+        proc = get_backend().run(['winget', 'source', 'list'])
+    except Exception:
+        return ''
+    if proc.returncode != 0:
+        return ''
+    text = '\n'.join(line.rsplit('\r', 1)[-1].rstrip() for line in proc.stdout.splitlines())
+    return hashlib.sha1(text.strip().encode('utf-8')).hexdigest()[:12]
+
+
+def source_updated(name: str = 'winget') -> Optional[datetime]:
+    """
+    Última actualización de una fuente según `winget source list --name`, o
+    None si no se puede saber.
+    """
+    try:
+        proc = get_backend().run(['winget', 'source', 'list', '--name', name])
+    except Exception:
+        return None
+    if proc.returncode != 0:
+        return None
+    for line in proc.stdout.splitlines():
+        match = _LINE.match(line.rsplit('\r', 1)[-1])
+        if match and match.group(1).strip().lower() in _UPDATED_LABELS:
+            try:
+                return datetime.fromisoformat(match.group(2).strip()[:19].replace('/', '-'))
+            except ValueError:
+                return None
+    return None
+
+
+def head_size(url: str, timeout: float = HEAD_TIMEOUT) -> Optional[float]:
+    """Tamaño en MB según el Content-Length de una petición HEAD, o None."""
+    import urllib.request
+
+    class KeepHead(urllib.request.HTTPRedirectHandler):
+        # urllib convierte HEAD en GET al seguir una redirección (GitHub, CDNs).
+        def redirect_request(self, req, fp, code, msg, headers, newurl):
+            new = super().redirect_request(req, fp, code, msg, headers, newurl)
+            if new is not None:
+                new.method = req.get_method()
+            return new
+
+    if not url.lower().startswith(('http://', 'https://')):
+        return None
+    request = urllib.request.Request(url, method='HEAD', headers={'User-Agent': 'app-installer'})
+    opener = urllib.request.build_opener(KeepHead)
+    try:
+        with trace.span('metadata.head'), opener.open(request, timeout=timeout) as response:
+            length = response.headers.get('Content-Length')
+    except (OSError, ValueError):
+        return None
+    try:
+        return int(length) / 1048576 if length else None
+    except ValueError:
+        return None
+
+
+def fetch(app_id: str) -> PackageInfo:
+    """
+    Ejecuta `winget show` para un id y devuelve sus datos (ok=False si falla).
+
+    Si la salida no trae el tamaño del instalador, se obtiene con `head_size`
+    de su URL.
+    """
+    cmd = ['winget', 'show', '--id', app_id, '--exact', '--accept-source-agreements']
+    with trace.span('winget show'):
+        proc = get_backend().run(cmd)
+    if proc.returncode != 0:
+        return PackageInfo(app_id, fetched=time.time(), ok=False)
+    fields = parse_show(proc.stdout)
+    size_mb = parse_size(fields['size']) if 'size' in fields else None
+    if size_mb is None and fields.get('installer_url'):
+        size_mb = head_size(fields['installer_url'])
+    return PackageInfo(
+        app_id,
+        version=fields.get('version', ''),
+        publisher=fields.get('publisher', ''),
+        installer_type=fields.get('installer_type', ''),
+        installer_url=fields.get('installer_url', ''),
+        size_mb=size_mb,
+        fetched=time.time(),
+    )
+
+
+class MetadataCache:
+    """
+    Caché persistente de `winget show` por id (en minúsculas).
+
+    Cada entrada guarda cuándo se obtuvo y las huellas de la fuente de winget
+    y de su entrada del catálogo; deja de estar vigente cuando caduca su TTL o
+    cambia alguna de las dos. Las entradas caducadas se siguen devolviendo
+    con `get` para mostrar algo mientras se vuelven a pedir.
+    """
+
+    def __init__(self, path: Path = METADATA_PATH, ttl: float = METADATA_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.source = ''
+        self._entries: Dict[str, PackageInfo] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get('format') != _FORMAT:
+            return
+        self.source = data.get('source', '')
+        for key, entry in data.get('entries', {}).items():
+            try:
+                self._entries[key] = PackageInfo(**entry)
+            except TypeError:
+                continue
+
+    def save(self):
+        with self._lock:
+            data = {
+                'format': _FORMAT,
+                'source': self.source,
+                'entries': {key: asdict(info) for key, info in self._entries.items()},
+            }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(self.path, json.dumps(data, ensure_ascii=False))
+        except OSError:
+            pass
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, app_id: str) -> Optional[PackageInfo]:
+        return self._entries.get(app_id.lower())
+
+    def put(self, info: PackageInfo):
+        with self._lock:
+            self._entries[info.id.lower()] = info
+
+    def is_fresh(self, info: PackageInfo, fingerprint: str = '', now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        ttl = self.ttl if info.ok else min(self.ttl, FAILED_TTL)
+        return (now - info.fetched <= ttl and info.source == self.source
+                and (not fingerprint or info.catalog == fingerprint))
+
+    def stale(self, apps: Iterable) -> List:
+        """Apps del catálogo sin entrada vigente, en el orden recibido."""
+        now = time.time()
+        stale = []
+        for app in apps:
+            info = self.get(app['id'])
+            if info is None or not self.is_fresh(info, app_fingerprint(app), now):
+                stale.append(app)
+        return stale
+
+    def retain(self, app_ids: Iterable[str]):
+        """Descarta las entradas de ids que ya no están en el catálogo."""
+        keep = {app_id.lower() for app_id in app_ids}
+        with self._lock:
+            for key in [key for key in self._entries if key not in keep]:
+                del self._entries[key]
+
+
+class MetadataPrefetcher:
+    """
+    Rellena una `MetadataCache` en segundo plano con `winget show`.
+
+    Lanza como mucho `workers` procesos a la vez y llama a `on_update` (desde
+    los hilos de trabajo) con cada `PackageInfo` nueva. `stop` deja de lanzar
+    procesos; los que están en marcha terminan. El fichero se guarda cada
+    SAVE_EVERY entradas y al acabar.
+    """
+
+    def __init__(
+        self,
+        cache: MetadataCache,
+        apps: List,
+        workers: int = PREFETCH_WORKERS,
+        on_update: Optional[Callable[[PackageInfo], None]] = None,
+        on_done: Optional[Callable[[int], None]] = None,
+    ):
+        self.cache = cache
+        self.apps = list(apps)
+        self.workers = max(1, workers)
+        self.on_update = on_update
+        self.on_done = on_done
+        self.fetched = 0
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'MetadataPrefetcher':
+        self._thread = threading.Thread(target=self.run, name='metadata-prefetch', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout: Optional[float] = None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run(self) -> int:
+        """Pide los paquetes sin entrada vigente y devuelve cuántos se obtuvieron."""
+        with trace.span('metadata.prefetch'):
+            source = source_fingerprint()
+            if source:
+                # Sin huella (comando fallido) se conserva la anterior.
+                self.cache.source = source
+            self.cache.retain(app['id'] for app in self.apps)
+            pending = self.cache.stale(self.apps)
+            if pending and not self._stop.is_set():
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    for _ in pool.map(self._fetch, pending):
+                        pass
+            self.cache.save()
+        if self.on_done is not None:
+            self.on_done(self.fetched)
+        return self.fetched
+
+    def _fetch(self, app):
+        if self._stop.is_set():
+            return
+        info = fetch(app['id'])
+        info.source = self.cache.source
+        info.catalog = app_fingerprint(app)
+        previous = self.cache.get(app['id'])
+        if not info.ok and previous is not None and previous.ok:
+            # Un fallo puntual (sin red) no borra los datos que ya había; la
+            # entrada sigue caducada y se vuelve a pedir en la próxima precarga.
+            return
+        self.cache.put(info)
+        with self._lock:
+            self.fetched += 1
+            save = self.fetched % SAVE_EVERY == 0
+        if save:
+            self.cache.save()
+        if self.on_update is not None:
+            self.on_update(info)
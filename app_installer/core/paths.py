@@ -0,0 +1,24 @@
+import os
+import sys
+from pathlib import Path
+
+# Carpeta del paquete (app_installer/).
+PACKAGE_DIR = Path(__file__).resolve().parent.parent
+APP_NAME = 'app_installer'
+
+
+def data_dir() -> Path:
+    """
+    Carpeta donde se guardan registros, cachés, copias de seguridad y perfiles.
+
+    En el ejecutable de PyInstaller (onefile) `__file__` está dentro de
+    `_MEIPASS`, una carpeta temporal que se borra al cerrar, así que se usa
+    %LOCALAPPDATA%\\app_installer. Desde el código fuente, la carpeta del paquete.
+    """
+    if getattr(sys, 'frozen', False):
+        base = os.environ.get('LOCALAPPDATA') or str(Path.home() / 'AppData' / 'Local')
+        return Path(base) / APP_NAME
+    return PACKAGE_DIR
+
+
+DATA_DIR = data_dir()
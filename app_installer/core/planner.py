@@ -0,0 +1,223 @@
+import re
+from dataclasses import dataclass, field
+from typing import Callable, List, Dict, Optional
+
+from . import scanner
+
+INSTALL = 'install'
+SKIP = 'skip'
+UPGRADE = 'upgrade'
+
+
+@dataclass
+class PlanItem:
+    app: Dict[str, str]
+    action: str
+    installed_version: str = ''
+    available_version: str = ''
+    # Motivo que se muestra en el resumen (p. ej. una versión fijada)
+    note: str = ''
+
+
+@dataclass
+class InstallPlan:
+    items: List[PlanItem] = field(default_factory=list)
+    # Plan de `build_upgrade_plan`: lo omitido no tiene actualización.
+    upgrade_only: bool = False
+
+    def _by_action(self, action: str) -> List[PlanItem]:
+        return [item for item in self.items if item.action == action]
+
+    @property
+    def to_install(self) -> List[PlanItem]:
+        return self._by_action(INSTALL)
+
+    @property
+    def to_upgrade(self) -> List[PlanItem]:
+        return self._by_action(UPGRADE)
+
+    @property
+    def to_skip(self) -> List[PlanItem]:
+        return self._by_action(SKIP)
+
+    @property
+    def pending(self) -> List[Dict[str, str]]:
+        """Aplicaciones que hay que pasar a winget (instalar o actualizar)."""
+        return [item.app for item in self.items if item.action != SKIP]
+
+    def summary(self) -> str:
+        if self.upgrade_only:
+            lines = [f"Plan: {len(self.to_upgrade)} a actualizar, {len(self.to_skip)} sin actualizaciones"]
+        else:
+            lines = [
+                f"Plan: {len(self.to_install)} a instalar, "
+                f"{len(self.to_upgrade)} a actualizar, "
+                f"{len(self.to_skip)} ya instaladas"
+            ]
+        labels = {INSTALL: 'Instalar', UPGRADE: 'Actualizar', SKIP: 'Omitir'}
+        for item in self.items:
+            name = item.app.get('name', item.app['id'])
+            line = f"  {labels[item.action]}: {name} ({item.app['id']})"
+            if item.action == UPGRADE or (item.action == INSTALL and item.installed_version):
+                line += f" {item.installed_version} -> {item.available_version}"
+            elif item.action == INSTALL and item.available_version:
+                line += f" {item.available_version}"
+            elif item.action == SKIP and item.installed_version:
+                line += f" {item.installed_version}"
+            if item.note:
+                line += f" ({item.note})"
+            lines.append(line)
+        return '\n'.join(lines)
+
+
+def build_plan(
+    apps: List[Dict[str, str]],
+    installed: Optional[List[Dict[str, str]]] = None,
+) -> InstallPlan:
+    """
+    Cruza la selección con una única lista de paquetes instalados.
+
+    `installed` es la salida de `scanner.list_installed_apps`; si no se pasa,
+    se obtiene aquí. Los ids de winget no distinguen mayúsculas; los ids que
+    winget truncó con "…" se comparan por prefijo.
+
+    Una app con `version` (fijada por el usuario) se omite si ya está en esa
+    versión y, si no, se instala esa versión con `--version`, aunque winget
+    ofrezca otra más nueva.
+    """
+    if installed is None:
+        installed = scanner.list_installed_apps()
+
+    find = _matcher(installed)
+    plan = InstallPlan()
+    for app in apps:
+        pkg = find(app['id'])
+        pin = app.get('version')
+        if pin:
+            current = pkg.get('version', '') if pkg is not None else ''
+            if pkg is not None and _same_version(current, pin):
+                plan.items.append(PlanItem(app, SKIP, current, pin, note='versión fijada'))
+            else:
+                plan.items.append(PlanItem(app, INSTALL, current, pin, note='versión fijada'))
+        elif pkg is None:
+            plan.items.append(PlanItem(app, INSTALL))
+        elif pkg.get('available'):
+            # Con la versión de destino la caché de instaladores no sirve una anterior.
+            target = dict(app, version=pkg['available'])
+            plan.items.append(PlanItem(target, UPGRADE, pkg.get('version', ''), pkg['available']))
+        else:
+            plan.items.append(PlanItem(app, SKIP, pkg.get('version', '')))
+    return plan
+
+
+def build_upgrade_plan(
+    apps: List[Dict[str, str]],
+    upgrades: Optional[List[Dict[str, str]]] = None,
+) -> InstallPlan:
+    """
+    Cruza la selección con una única ejecución de `winget upgrade`.
+
+    `upgrades` es la salida de `scanner.list_upgrades`; si no se pasa, se
+    obtiene aquí. Las apps con actualización se copian con la versión
+    disponible en `version`, de modo que la caché de instaladores busque esa
+    versión; el resto se omite. Las apps con una versión fijada también se
+    omiten: actualizarlas la ignoraría.
+    """
+    if upgrades is None:
+        upgrades = scanner.list_upgrades()
+
+    find = _matcher(upgrades)
+    plan = InstallPlan(upgrade_only=True)
+    for app in apps:
+        pkg = find(app['id'])
+        if app.get('version'):
+            plan.items.append(PlanItem(app, SKIP, pkg.get('version', '') if pkg else '', app['version'],
+                                       note='versión fijada'))
+        elif pkg is not None and pkg.get('available'):
+            target = dict(app, version=pkg['available'])
+            plan.items.append(PlanItem(target, UPGRADE, pkg.get('version', ''), pkg['available']))
+        else:
+            plan.items.append(PlanItem(app, SKIP))
+    return plan
+
+
+def build_restore_plan(
+    target: List[Dict[str, str]],
+    installed: Optional[List[Dict[str, str]]] = None,
+) -> InstallPlan:
+    """
+    Plan mínimo para llevar el equipo a una instantánea (`snapshots.SnapshotStore.state`).
+
+    Se instala lo que falta y se actualiza lo que tiene una versión anterior a
+    la de la instantánea; lo que ya está igual o más nuevo se omite. No se
+    desinstala nada: los paquetes que no están en la instantánea se quedan.
+    """
+    if installed is None:
+        installed = scanner.list_installed_apps(refresh=True)
+
+    find = _matcher(installed)
+    plan = InstallPlan()
+    for package in target:
+        app = {'id': package['id'], 'name': package.get('name') or package['id']}
+        pkg = find(package['id'])
+        wanted = package.get('version', '')
+        if pkg is None:
+            plan.items.append(PlanItem(app, INSTALL, '', wanted))
+        elif compare_versions(pkg.get('version', ''), wanted) < 0:
+            plan.items.append(PlanItem(app, UPGRADE, pkg.get('version', ''), wanted))
+        else:
+            plan.items.append(PlanItem(app, SKIP, pkg.get('version', '')))
+    return plan
+
+
+def _version_key(version: str) -> tuple:
+    return tuple(int(part) for part in re.findall(r'\d+', version))
+
+
+def compare_versions(a: str, b: str) -> int:
+    """
+    Compara dos versiones de winget por sus números (1.10 > 1.9).
+
+    Devuelve -1, 0 o 1. Si alguna no tiene números ("Unknown") se consideran
+    iguales, para no actualizar a ciegas.
+    """
+    key_a, key_b = _version_key(a), _version_key(b)
+    if not key_a or not key_b:
+        return 0
+    return (key_a > key_b) - (key_a < key_b)
+
+
+def _same_version(a: str, b: str) -> bool:
+    """Igualdad de versiones por sus números (2.40 == 2.40.0); sin números, literal."""
+    key_a, key_b = _version_key(a), _version_key(b)
+    if not key_a or not key_b:
+        return a.strip().lower() == b.strip().lower()
+    width = max(len(key_a), len(key_b))
+    return key_a + (0,) * (width - len(key_a)) == key_b + (0,) * (width - len(key_b))
+
+
+def _matcher(packages: List[Dict[str, str]]) -> Callable[[str], Optional[Dict[str, str]]]:
+    """
+    Devuelve una función que busca un id en `packages`.
+
+    Los ids de winget no distinguen mayúsculas; los ids que winget truncó
+    con "…" se comparan por prefijo.
+    """
+    index = {}
+    truncated = []
+    for pkg in packages:
+        if not pkg.get('id'):
+            continue
+        if pkg.get('truncated') and pkg['id'].endswith('…'):
+            truncated.append((pkg['id'][:-1].lower(), pkg))
+        else:
+            index[pkg['id'].lower()] = pkg
+
+    def find(app_id: str) -> Optional[Dict[str, str]]:
+        app_id = app_id.lower()
+        pkg = index.get(app_id)
+        if pkg is None:
+            pkg = next((p for prefix, p in truncated if app_id.startswith(prefix)), None)
+        return pkg
+
+    return find
@@ -0,0 +1,146 @@
+import codecs
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from . import trace
+from .backend import get_backend
+
+# Líneas de salida que se conservan por flujo; el resto se descarta para que
+# la memoria no crezca con instalaciones que imprimen miles de redibujados.
+DEFAULT_KEEP_LINES = 200
+_CHUNK_SIZE = 4096
+
+_SEGMENT_END = re.compile(r'[\r\n\b]')
+_SPINNER = {'-', '\\', '|', '/'}
+_BYTES = re.compile(
+    r'([\d.,]+)\s*(B|KB|MB|GB)\s*/\s*([\d.,]+)\s*(B|KB|MB|GB)', re.IGNORECASE
+)
+_PERCENT = re.compile(r'(\d{1,3})\s*%\s*$')
+_UNITS = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+
+@dataclass
+class ProgressEvent:
+    """Estado de progreso extraído de una línea de redibujado de winget."""
+    kind: str  # 'spinner', 'bytes' o 'percent'
+    text: str
+    current: Optional[int] = None
+    total: Optional[int] = None
+    percent: Optional[float] = None
+
+
+@dataclass
+class StreamResult:
+    returncode: int
+    stdout: str
+    stderr: str
+
+
+ProgressCallback = Callable[[ProgressEvent], None]
+
+
+def _to_bytes(value: str, unit: str) -> int:
+    return int(float(value.replace(',', '.')) * _UNITS[unit.upper()])
+
+
+def parse_progress(line: str) -> Optional[ProgressEvent]:
+    """Devuelve un ProgressEvent si `line` es un spinner o una barra de progreso."""
+    text = line.strip()
+    if not text:
+        return None
+    if text in _SPINNER:
+        return ProgressEvent('spinner', text)
+    match = _BYTES.search(text)
+    if match:
+        current = _to_bytes(match.group(1), match.group(2))
+        total = _to_bytes(match.group(3), match.group(4))
+        percent = current * 100.0 / total if total else None
+        return ProgressEvent('bytes', text, current, total, percent)
+    match = _PERCENT.search(text)
+    if match and (len(text) == len(match.group(0)) or not text[0].isalnum()):
+        return ProgressEvent('percent', text, percent=float(match.group(1)))
+    return None
+
+
+def _drain(
+    stream,
+    lines: deque,
+    on_progress: Optional[ProgressCallback],
+    on_first_output: Optional[Callable[[], None]] = None,
+):
+    """Lee `stream` por bloques y separa los redibujados de las líneas de texto."""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    pending = ''
+
+    def handle(segment: str):
+        event = parse_progress(segment)
+        if event is not None:
+            if on_progress:
+                on_progress(event)
+        elif segment.strip():
+            lines.append(segment.rstrip())
+
+    while True:
+        chunk = stream.read1(_CHUNK_SIZE) if hasattr(stream, 'read1') else stream.read(_CHUNK_SIZE)
+        if not chunk:
+            break
+        if on_first_output is not None:
+            on_first_output()
+            on_first_output = None
+        pending += decoder.decode(chunk)
+        *segments, pending = _SEGMENT_END.split(pending)
+        for segment in segments:
+            handle(segment)
+    handle(pending + decoder.decode(b'', final=True))
+    stream.close()
+
+
+def command_name(cmd: List[str]) -> str:
+    """Nombre de un comando para la traza: 'winget download', 'winget list', 'installer'..."""
+    program = cmd[0].replace('\\', '/').rsplit('/', 1)[-1].lower() if cmd else ''
+    if program in ('winget', 'winget.exe'):
+        return f"winget {cmd[1]}" if len(cmd) > 1 else 'winget'
+    if program in ('msiexec', 'msiexec.exe'):
+        return 'msiexec'
+    return 'installer'
+
+
+def run_streaming(
+    cmd: List[str],
+    on_progress: Optional[ProgressCallback] = None,
+    keep_lines: int = DEFAULT_KEEP_LINES,
+) -> StreamResult:
+    """
+    Ejecuta `cmd` leyendo stdout y stderr a medida que se producen.
+
+    Los spinners y barras de progreso se convierten en ProgressEvent y se
+    entregan a `on_progress` desde el hilo que llama; no se guardan en la
+    salida. De cada flujo se conservan solo las últimas `keep_lines` líneas.
+    """
+    name = command_name(cmd)
+    on_first_output = None
+    if trace.enabled():
+        # Hasta la primera salida winget arranca y actualiza sus orígenes.
+        spawned = time.perf_counter()
+        on_first_output = lambda: trace.complete(f'{name} (arranque)', spawned, time.perf_counter())
+
+    with trace.span(name, cmd=' '.join(cmd[:4])):
+        proc = get_backend().spawn(cmd)
+        stdout_lines: deque = deque(maxlen=keep_lines)
+        stderr_lines: deque = deque(maxlen=keep_lines)
+        reader = threading.Thread(
+            target=_drain, args=(proc.stderr, stderr_lines, None), daemon=True
+        )
+        reader.start()
+        _drain(proc.stdout, stdout_lines, on_progress, on_first_output)
+        reader.join()
+        returncode = proc.wait()
+    return StreamResult(
+        returncode=returncode,
+        stdout='\n'.join(stdout_lines),
+        stderr='\n'.join(stderr_lines),
+    )
@@ -0,0 +1,172 @@
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .file_manager import selection_from_json, write_atomic
+from .paths import DATA_DIR
+
+# Los perfiles se guardan en la carpeta de datos (ver `paths.data_dir`), uno por fichero.
+PROFILE_DIR = DATA_DIR / 'data' / 'profiles'
+MANIFEST_SUFFIX = '.apps'
+MANIFEST_HEADER = '# app-installer manifest v1'
+PIN_SEPARATOR = '=='
+
+_PROFILE_NAME = re.compile(r'^[\w][\w .-]{0,63}$')
+
+
+@dataclass
+class ManifestEntry:
+    id: str
+    version: str = ''
+    line: int = 0
+
+
+@dataclass
+class ManifestReport:
+    """Resultado de leer un manifiesto: entradas válidas y problemas por línea."""
+    entries: List[ManifestEntry] = field(default_factory=list)
+    # (línea, id) de los ids que no están en el catálogo
+    unknown: List[Tuple[int, str]] = field(default_factory=list)
+    # (línea, id) de los ids repetidos; cuenta la primera aparición
+    duplicates: List[Tuple[int, str]] = field(default_factory=list)
+    # (línea, texto) de las líneas que no se entienden
+    invalid: List[Tuple[int, str]] = field(default_factory=list)
+
+    @property
+    def pins(self) -> Dict[str, str]:
+        return {entry.id: entry.version for entry in self.entries if entry.version}
+
+    def problems(self) -> List[str]:
+        problems = [(line, f'"{app_id}" no está en el catálogo') for line, app_id in self.unknown]
+        problems += [(line, f'"{app_id}" está repetido') for line, app_id in self.duplicates]
+        problems += [(line, f'no se entiende "{text}"') for line, text in self.invalid]
+        return [f'línea {line}: {text}' for line, text in sorted(problems)]
+
+    def apps(self, catalog=None) -> List[Dict[str, str]]:
+        """
+        Entradas como apps para el instalador, con la versión fijada en `version`.
+
+        Con `catalog` se usan sus entradas (nombre, `requires`...); los ids
+        desconocidos se devuelven igualmente, solo con el id.
+        """
+        apps = []
+        for entry in self.entries:
+            app = catalog.app(entry.id) if catalog is not None else None
+            app = app.to_dict() if app is not None else {'id': entry.id}
+            if entry.version:
+                app['version'] = entry.version
+            apps.append(app)
+        return apps
+
+
+def format_manifest(apps: Iterable[Dict[str, str]]) -> str:
+    """Un id por línea, con `==versión` si la app tiene una versión fijada."""
+    lines = [MANIFEST_HEADER]
+    for app in apps:
+        version = app.get('version')
+        lines.append(f"{app['id']}{PIN_SEPARATOR}{version}" if version else app['id'])
+    return '\n'.join(lines) + '\n'
+
+
+def iter_manifest(lines: Iterable[str]) -> Iterator[Tuple[int, Optional[ManifestEntry], str]]:
+    """
+    Recorre un manifiesto línea a línea sin cargarlo entero.
+
+    Devuelve (número de línea, entrada, texto); la entrada es None si la
+    línea no es un id válido. Se ignoran las líneas vacías y los comentarios.
+    """
+    for number, raw in enumerate(lines, start=1):
+        text = raw.split('#', 1)[0].strip()
+        if not text:
+            continue
+        app_id, _, version = text.partition(PIN_SEPARATOR)
+        app_id, version = app_id.strip(), version.strip()
+        if not app_id or any(c.isspace() for c in app_id) or any(c.isspace() for c in version):
+            yield number, None, text
+        else:
+            yield number, ManifestEntry(app_id, version, number), text
+
+
+def read_manifest(lines: Iterable[str], catalog=None) -> ManifestReport:
+    """
+    Lee un manifiesto comprobando ids repetidos y, con `catalog`, desconocidos.
+
+    Los ids del catálogo se normalizan a su forma exacta (winget no distingue
+    mayúsculas); los desconocidos se conservan en `entries` y se anotan en
+    `unknown`.
+    """
+    report = ManifestReport()
+    seen = set()
+    for number, entry, text in iter_manifest(lines):
+        if entry is None:
+            report.invalid.append((number, text))
+            continue
+        key = entry.id.lower()
+        if key in seen:
+            report.duplicates.append((number, entry.id))
+            continue
+        seen.add(key)
+        if catalog is not None:
+            app = catalog.app(entry.id)
+            if app is None:
+                report.unknown.append((number, entry.id))
+            else:
+                entry.id = app['id']
+        report.entries.append(entry)
+    return report
+
+
+def read_file(path: Path, catalog=None) -> ManifestReport:
+    """
+    Lee un manifiesto o una selección JSON exportada por versiones anteriores.
+
+    Los manifiestos se leen en streaming; el JSON se reconoce por empezar por "[".
+    """
+    with Path(path).open(encoding='utf-8-sig') as f:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == '[':
+            apps = selection_from_json(f.read())
+            lines = (f"{a['id']}{PIN_SEPARATOR}{a['version']}" if a.get('version') else a['id'] for a in apps)
+            return read_manifest(lines, catalog)
+        return read_manifest(f, catalog)
+
+
+def write_file(path: Path, apps: Iterable[Dict[str, str]]):
+    write_atomic(Path(path), format_manifest(apps))
+
+
+class ProfileStore:
+    """Perfiles de selección con nombre, guardados como manifiestos en `root`."""
+
+    def __init__(self, root: Path = PROFILE_DIR):
+        self.root = Path(root)
+
+    def path(self, name: str) -> Path:
+        name = name.strip()
+        if not _PROFILE_NAME.match(name):
+            raise ValueError(f'nombre de perfil no válido: "{name}"')
+        return self.root / f'{name}{MANIFEST_SUFFIX}'
+
+    def names(self) -> List[str]:
+        if not self.root.is_dir():
+            return []
+        return sorted((p.stem for p in self.root.glob(f'*{MANIFEST_SUFFIX}')), key=str.lower)
+
+    def save(self, name: str, apps: Iterable[Dict[str, str]]) -> Path:
+        path = self.path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_file(path, apps)
+        return path
+
+    def load(self, name: str, catalog=None) -> ManifestReport:
+        path = self.path(name)
+        if not path.exists():
+            raise ValueError(f'no existe el perfil "{name}"')
+        return read_file(path, catalog)
+
+    def delete(self, name: str):
+        self.path(name).unlink(missing_ok=True)
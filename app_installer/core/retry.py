@@ -0,0 +1,94 @@
+import random
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Tuple
+
+OK = 'ok'
+RETRYABLE = 'retryable'
+FATAL = 'fatal'
+
+# Códigos de salida de winget (HRESULT sin signo) y de Windows Installer que
+# suelen desaparecer al repetir la instalación.
+RETRYABLE_CODES = {
+    0x8A150008: 'descarga fallida',
+    0x8A150011: 'el hash del instalador no coincide (CDN inestable)',
+    0x8A150101: 'la aplicación está en uso',
+    0x8A150102: 'hay otra instalación en curso',
+    0x8A150103: 'uno o más ficheros están en uso',
+    0x8A150107: 'sin conexión de red',
+    0x8A150111: 'otra aplicación está usando el paquete',
+    1618: 'hay otra instalación de Windows Installer en curso (1618)',
+}
+
+# El planificador lo usa también para los paquetes cuya dependencia falló.
+MISSING_DEPENDENCY = 0x8A150104
+
+# Errores que no se resuelven reintentando.
+FATAL_CODES = {
+    0x8A150014: 'no se encontró el paquete',
+    0x8A15002B: 'no hay actualización aplicable',
+    0x8A150061: 'el paquete ya está instalado',
+    MISSING_DEPENDENCY: 'falta una dependencia',
+    0x8A150105: 'disco lleno',
+    0x8A150106: 'memoria insuficiente',
+    0x8A150109: 'se requiere reiniciar para terminar',
+    0x8A15010A: 'se requiere reiniciar antes de instalar',
+    0x8A15010C: 'cancelado por el usuario',
+    0x8A15010D: 'ya hay otra versión instalada',
+    0x8A15010E: 'hay una versión más reciente instalada',
+    0x8A15010F: 'bloqueado por una directiva',
+    1602: 'cancelado por el usuario (1602)',
+    1603: 'error fatal del instalador (1603)',
+}
+
+# Mensajes de winget que identifican fallos transitorios cuando el código de
+# salida es genérico.
+RETRYABLE_MESSAGES = (
+    ('failed when opening source', 'no se pudo abrir el origen'),
+    ('failed in attempting to update the source', 'no se pudo actualizar el origen'),
+    ('source agreements', 'acuerdos del origen pendientes de actualizar'),
+    ('installer hash does not match', 'el hash del instalador no coincide (CDN inestable)'),
+    ('another installation is in progress', 'hay otra instalación en curso'),
+    ('timed out', 'tiempo de espera agotado'),
+)
+
+
+@dataclass
+class Attempt:
+    number: int
+    returncode: int
+    error_class: str
+    reason: str
+    start: datetime
+    end: datetime
+    # Espera antes del siguiente intento; 0 si no hubo reintento.
+    delay: float = 0.0
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 3
+    base_delay: float = 10.0
+    max_delay: float = 120.0
+    jitter: float = 0.5
+
+    def delay(self, attempt: int) -> float:
+        """Espera exponencial tras el intento `attempt`, con ruido de ±`jitter`."""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+def classify(returncode: int, stdout: str = '', stderr: str = '') -> Tuple[str, str]:
+    """Clasifica un resultado en OK, RETRYABLE o FATAL y devuelve el motivo."""
+    if returncode == 0:
+        return OK, ''
+    code = returncode & 0xFFFFFFFF
+    if code in RETRYABLE_CODES:
+        return RETRYABLE, RETRYABLE_CODES[code]
+    if code in FATAL_CODES:
+        return FATAL, FATAL_CODES[code]
+    text = f'{stdout}\n{stderr}'.lower()
+    for needle, reason in RETRYABLE_MESSAGES:
+        if needle in text:
+            return RETRYABLE, reason
+    return FATAL, (f'código de salida {code:#x}' if code > 0xFFFF else f'código de salida {returncode}')
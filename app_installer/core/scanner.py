@@ -1,17 +1,188 @@
-import subprocess
-from typing import List, Dict
-
-
-def list_installed_apps(user_only: bool = True) -> List[Dict[str, str]]:
-    cmd = ['winget', 'list']
-    if user_only:
-        cmd.append('--source=winget')
-    proc = subprocess.run(cmd, capture_output=True, text=True)
-    apps = []
-    for line in proc.stdout.splitlines()[2:]:
-        parts = line.split()
-        if len(parts) >= 3:
-            app_id = parts[-1]
-            name = ' '.join(parts[:-2])
-            apps.append({'name': name, 'id': app_id})
+import json
+import re
+import threading
+import time
+from typing import List, Dict, Optional
+
+from . import trace
+from .backend import get_backend
+from .paths import DATA_DIR
+
+SNAPSHOT_PATH = DATA_DIR / 'cache' / 'installed.json'
+# Segundos que una lista de paquetes instalados se considera vigente.
+SNAPSHOT_TTL = 300
+
+# Cabeceras de `winget list` en los idiomas más habituales; el resto de
+# columnas se identifica por posición.
+_AVAILABLE_HEADERS = {'available', 'disponible', 'verfügbar', 'disponibile'}
+_SOURCE_HEADERS = {'source', 'origen', 'quelle', 'origine', 'fonte'}
+_SEPARATOR = re.compile(r'^-{10,}$')
+_ELLIPSIS = '…'
+# Código de `winget list` cuando no hay ningún paquete que listar.
+NO_PACKAGES = 0x8A150014
+
+_snapshot_lock = threading.Lock()
+_snapshots: Dict[bool, Dict] = {}
+
+
+class ScanError(OSError):
+    """`winget list` falló: su salida no refleja los paquetes instalados."""
+
+
+def _columns(header: str) -> List[tuple]:
+    """Devuelve (clave, inicio) para cada columna de la cabecera."""
+    starts = [m.start() for m in re.finditer(r'\S+', header)]
+    labels = [header[s:].split()[0].lower() for s in starts]
+    keys = ['name', 'id', 'version']
+    for label in labels[3:]:
+        if label in _AVAILABLE_HEADERS:
+            keys.append('available')
+        elif label in _SOURCE_HEADERS:
+            keys.append('source')
+        else:
+            keys.append('available' if 'available' not in keys else 'source')
+    return list(zip(keys, starts))
+
+
+@trace.traced('scanner.parse_table')
+def parse_table(output: str) -> List[Dict[str, str]]:
+    """
+    Interpreta las tablas de ancho fijo que imprimen `winget list` y `winget upgrade`.
+
+    Las posiciones de las columnas se toman de la cabecera que precede a cada
+    línea de guiones, así que los nombres con espacios y las columnas vacías
+    (Available, Source) se respetan. Los ids truncados por winget conservan el
+    carácter "…" y se marcan con `truncated`.
+    """
+    lines = [line.rsplit('\r', 1)[-1].rstrip() for line in output.splitlines()]
+    apps: List[Dict[str, str]] = []
+    columns: List[tuple] = []
+    for idx, line in enumerate(lines):
+        if _SEPARATOR.match(line.strip()):
+            columns = _columns(lines[idx - 1]) if idx else []
+            continue
+        if not columns or not line.strip():
+            continue
+        row = {key: '' for key in ('name', 'id', 'version', 'available', 'source')}
+        for pos, (key, start) in enumerate(columns):
+            end = columns[pos + 1][1] if pos + 1 < len(columns) else None
+            row[key] = line[start:end].strip()
+        if not row['id'] or ' ' in row['id']:
+            # Líneas de resumen ("3 upgrades available.") o texto libre.
+            continue
+        if row['id'].endswith(_ELLIPSIS) or row['name'].endswith(_ELLIPSIS):
+            row['truncated'] = True
+        apps.append(row)
     return apps
+
+
+def invalidate_snapshot():
+    """Descarta la lista cacheada; se llama tras instalar o actualizar paquetes."""
+    with _snapshot_lock:
+        _snapshots.clear()
+        try:
+            SNAPSHOT_PATH.unlink()
+        except OSError:
+            pass
+
+
+def _load_snapshot(user_only: bool, max_age: float) -> Optional[List[Dict[str, str]]]:
+    snapshot = _snapshots.get(user_only)
+    if snapshot is None:
+        try:
+            stored = json.loads(SNAPSHOT_PATH.read_text(encoding='utf-8'))
+            snapshot = stored.get(str(user_only))
+        except (OSError, ValueError):
+            snapshot = None
+    if snapshot and time.time() - snapshot['created'] <= max_age:
+        _snapshots[user_only] = snapshot
+        return snapshot['apps']
+    return None
+
+
+def _save_snapshot(user_only: bool, apps: List[Dict[str, str]]):
+    _snapshots[user_only] = {'created': time.time(), 'apps': apps}
+    try:
+        SNAPSHOT_PATH.parent.mkdir(parents=True, exist_ok=True)
+        stored = {str(k): v for k, v in _snapshots.items()}
+        tmp = SNAPSHOT_PATH.with_suffix('.tmp')
+        tmp.write_text(json.dumps(stored), encoding='utf-8')
+        tmp.replace(SNAPSHOT_PATH)
+    except OSError:
+        pass
+
+
+@trace.traced('list_installed_apps')
+def list_installed_apps(
+    user_only: bool = True,
+    max_age: float = SNAPSHOT_TTL,
+    refresh: bool = False,
+    check: bool = False,
+) -> List[Dict[str, str]]:
+    """
+    Lista los paquetes instalados con name, id, version, available y source.
+
+    El resultado se guarda en `SNAPSHOT_PATH` y se reutiliza durante `max_age`
+    segundos, de modo que el plan de instalación, el respaldo y la interfaz
+    comparten una sola ejecución de `winget list`. Si `winget list` falla se
+    devuelve lo que se pudo leer, o se lanza `ScanError` con `check`.
+    """
+    with _snapshot_lock:
+        if not refresh:
+            apps = _load_snapshot(user_only, max_age)
+            if apps is not None:
+                trace.count('scanner.snapshot_hit')
+                return list(apps)
+
+        cmd = ['winget', 'list']
+        if user_only:
+            cmd.append('--source=winget')
+        cmd.append('--accept-source-agreements')
+        with trace.span('winget list'):
+            proc = get_backend().run(cmd)
+        apps = parse_table(proc.stdout)
+        ok = proc.returncode == 0 or (proc.returncode == NO_PACKAGES and not apps)
+        if ok:
+            _save_snapshot(user_only, apps)
+        elif check:
+            raise ScanError(f'winget list terminó con el código {proc.returncode:#x}')
+        return list(apps)
+
+
+def resolve_truncated(apps: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """
+    Sustituye los ids truncados con "…" por el id completo, consultando
+    `winget list --id` con el prefijo. Los que no se resuelven a un único
+    paquete se descartan: no sirven para `winget install --id`.
+    """
+    resolved = []
+    for app in apps:
+        if not app['id'].endswith(_ELLIPSIS):
+            resolved.append(app)
+            continue
+        prefix = app['id'][:-1]
+        cmd = ['winget', 'list', '--id', prefix, '--accept-source-agreements']
+        with trace.span('winget list --id'):
+            proc = get_backend().run(cmd)
+        matches = [row for row in parse_table(proc.stdout) if proc.returncode == 0
+                   and row['id'].lower().startswith(prefix.lower()) and not row.get('truncated')]
+        if len(matches) == 1:
+            resolved.append(dict(app, id=matches[0]['id'], name=matches[0]['name'], truncated=False))
+    return resolved
+
+
+def list_upgrades(include_unknown: bool = False) -> List[Dict[str, str]]:
+    """
+    Lista los paquetes con actualización disponible con una sola ejecución de
+    `winget upgrade`.
+
+    Cada elemento tiene name, id, version (instalada), available y source.
+    Con `include_unknown` se incluyen los paquetes cuya versión instalada no
+    se conoce.
+    """
+    cmd = ['winget', 'upgrade', '--accept-source-agreements']
+    if include_unknown:
+        cmd.append('--include-unknown')
+    with trace.span('winget upgrade'):
+        proc = get_backend().run(cmd)
+    return [app for app in parse_table(proc.stdout) if app['available']]
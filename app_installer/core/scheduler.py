@@ -0,0 +1,336 @@
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+
+from . import installer, retry, trace
+from .cache import PackageCache
+from .graph import InstallGraph
+from .history import HistoryStore
+from .installer import DownloadResult, InstallResult
+from .process import ProgressEvent
+from .retry import Attempt, RetryPolicy
+
+StatusCallback = Callable[[Dict[str, str], str], None]
+ResultCallback = Callable[[InstallResult], None]
+AppProgressCallback = Callable[[Dict[str, str], str, ProgressEvent], None]
+
+
+class InstallScheduler:
+    """
+    Planificador de instalaciones en dos fases.
+
+    Las descargas (`winget download`) se reparten en un pool de hilos acotado
+    por `max_workers`. Los instaladores se ejecutan de uno en uno en el hilo que
+    llama a `run`, en el orden en que terminan las descargas, porque Windows
+    Installer no admite dos instalaciones a la vez.
+
+    El orden sale de `graph.InstallGraph`: las descargas empiezan por la mayor
+    `priority` y la ruta crítica más larga, y de los paquetes ya descargados se
+    instala antes el de mayor rango cuyos `requires` del lote hayan terminado
+    bien. Si una dependencia falla, lo que depende de ella no se descarga ni
+    se instala y termina con `retry.MISSING_DEPENDENCY`. Los paquetes
+    `exclusive` se instalan con las descargas en pausa, cuando ya no queda
+    ninguna en curso.
+
+    Los fallos transitorios (ver `retry.classify`) se vuelven a encolar tras una
+    espera exponencial con ruido, sin detener al resto del lote, hasta
+    `retry_policy.max_attempts` intentos. `history` guarda los intentos de
+    cada id.
+
+    Con `history_store` cada paquete se registra en el historial SQLite, las
+    descargas se lanzan de la más larga a la más corta según la duración
+    mediana de instalaciones anteriores y `eta()` estima el tiempo restante.
+
+    Con `upgrade` los paquetes se actualizan en lugar de instalarse; la
+    descarga es la misma y solo cambia el comando de respaldo de winget. Con
+    `force` los comandos de winget llevan `--force`.
+
+    Con `cache` los paquetes que ya están en la caché se instalan desde ella
+    sin pasar por `winget download`, y las descargas nuevas se añaden a la caché.
+
+    `on_status(app, phase)` se llama con phase 'download' desde los hilos de
+    descarga, con phase 'install' desde el hilo de instalación y con phase
+    'retry' cuando un paquete se reprograma.
+    `on_result(result)` se llama al terminar cada paquete.
+    `on_progress(app, phase, event)` recibe el progreso de winget en streaming,
+    desde el mismo hilo que la fase correspondiente.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = installer.DEFAULT_MAX_WORKERS,
+        download_dir: Optional[Path] = None,
+        on_status: Optional[StatusCallback] = None,
+        on_result: Optional[ResultCallback] = None,
+        on_progress: Optional[AppProgressCallback] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        history_store: Optional[HistoryStore] = None,
+        cache: Optional[PackageCache] = None,
+        upgrade: bool = False,
+        force: bool = False,
+    ):
+        self.max_workers = max(1, int(max_workers))
+        self.download_dir = download_dir
+        self.on_status = on_status
+        self.on_result = on_result
+        self.on_progress = on_progress
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.history_store = history_store
+        self.cache = cache
+        self.upgrade = upgrade
+        self.force = force
+        self.installed = 0
+        self.history: Dict[str, List[Attempt]] = {}
+        self._expected: Dict[int, tuple] = {}
+        self._downloaded: set = set()
+        self._done: set = set()
+        self._install_started: Optional[float] = None
+        self._installing: Optional[int] = None
+        self._state_lock = threading.Lock()
+        self._graph: Optional[InstallGraph] = None
+        self._failed: Set[int] = set()
+        # Descargas en curso y pausa para los paquetes `exclusive`
+        self._gate = threading.Condition()
+        self._active_downloads = 0
+        self._paused = False
+
+    def run(self, apps: List[Dict[str, str]]) -> List[InstallResult]:
+        """Descarga e instala `apps`; devuelve los resultados en el orden de entrada."""
+        self.installed = 0
+        self.history = {}
+        self._downloaded = set()
+        self._done = set()
+        self._failed = set()
+        if not apps:
+            return []
+
+        weights = None
+        run_id = None
+        if self.history_store is not None:
+            expected = self.history_store.expected_durations([app['id'] for app in apps])
+            self._expected = {idx: expected[app['id']] for idx, app in enumerate(apps)}
+            weights = [sum(self._expected[idx]) for idx in range(len(apps))]
+            run_id = self.history_store.start_run(len(apps))
+        graph = self._graph = InstallGraph(apps, weights)
+        for cycle in graph.cycles:
+            installer.log('dependencias circulares; se ignoran', phase='plan', ids=cycle)
+
+        root = self.download_dir or Path(tempfile.mkdtemp(prefix='winget-'))
+        ready: 'queue.Queue[tuple]' = queue.Queue()
+        results: List[Optional[InstallResult]] = [None] * len(apps)
+        attempts: Dict[int, List[Attempt]] = {}
+        # Descargados que esperan su turno o a sus dependencias
+        arrived: Dict[int, tuple] = {}
+        succeeded: Set[int] = set()
+
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix='winget-download',
+            ) as pool:
+                def submit(idx: int, app: Dict[str, str]):
+                    number = len(attempts.get(idx, ())) + 1
+                    directory = root / f"{idx:04d}-{app['id']}-{number}"
+                    pool.submit(self._download, idx, app, directory, ready)
+
+                for idx in graph.download_order():
+                    submit(idx, apps[idx])
+
+                pending = len(apps)
+                while pending:
+                    idx = self._next_install(arrived, ready, succeeded)
+                    app, download = arrived.pop(idx)
+                    blocker = graph.blocked_by(idx, self._failed)
+                    if blocker is not None:
+                        result = installer.blocked_result(app, apps[blocker], upgrade=self.upgrade)
+                        self._discard(download, root)
+                    else:
+                        self._installing, self._install_started = idx, time.monotonic()
+                        if graph.exclusive(idx):
+                            self._pause_downloads()
+                        self._status(app, 'install')
+                        try:
+                            result = installer.install_app(
+                                app,
+                                download=download,
+                                on_progress=self._progress(app, 'install'),
+                                upgrade=self.upgrade,
+                                force=self.force,
+                            )
+                        except Exception as e:
+                            # Un instalador que no se puede lanzar (fichero bloqueado,
+                            # ejecutable vetado) falla solo su paquete, no el lote.
+                            result = self._error_result(app, download, e)
+                        finally:
+                            if graph.exclusive(idx):
+                                self._resume_downloads()
+                            self._discard(download, root)
+
+                    history = attempts.setdefault(idx, [])
+                    self.history[app['id']] = history
+                    error_class, reason = retry.classify(result.returncode, result.stdout, result.stderr)
+                    attempt = Attempt(len(history) + 1, result.returncode, error_class, reason,
+                                      result.start, result.end)
+                    history.append(attempt)
+                    if error_class == retry.RETRYABLE and attempt.number < self.retry_policy.max_attempts:
+                        attempt.delay = self.retry_policy.delay(attempt.number)
+                        installer.log(reason, id=app['id'], phase='retry', attempt=attempt.number,
+                                      delay=round(attempt.delay, 1))
+                        self._status(app, 'retry')
+                        timer = threading.Timer(attempt.delay, submit, args=(idx, app))
+                        timer.daemon = True
+                        timer.start()
+                        continue
+
+                    result.attempts = list(history)
+                    results[idx] = result
+                    pending -= 1
+                    self.installed += 1
+                    with self._state_lock:
+                        self._done.add(idx)
+                        if result.returncode == 0:
+                            succeeded.add(idx)
+                        else:
+                            self._failed.add(idx)
+                    if self.history_store is not None:
+                        self.history_store.record(run_id, result)
+                    if self.on_result:
+                        self.on_result(result)
+        finally:
+            self._install_started = None
+            if self.download_dir is None:
+                shutil.rmtree(root, ignore_errors=True)
+            if run_id is not None:
+                self.history_store.finish_run(
+                    run_id, sum(1 for r in results if r is not None and r.returncode != 0)
+                )
+
+        return [r for r in results if r is not None]
+
+    def _next_install(self, arrived: Dict[int, tuple], ready: queue.Queue, succeeded: Set[int]) -> int:
+        """
+        Siguiente paquete de la cola de instalación.
+
+        Primero los que ya no se pueden instalar porque falló una dependencia;
+        si no, el de mayor rango con las dependencias cumplidas. Mientras no
+        haya ninguno espera a la siguiente descarga.
+        """
+        graph = self._graph
+        while True:
+            blocked = next((idx for idx in arrived if graph.blocked_by(idx, self._failed) is not None), None)
+            if blocked is not None:
+                return blocked
+            idx = graph.pick(list(arrived), succeeded)
+            if idx is not None:
+                return idx
+            with trace.span('scheduler.wait_download'):
+                idx, app, download = ready.get()
+            arrived[idx] = (app, download)
+
+    def _error_result(self, app: Dict[str, str], download: Optional[DownloadResult],
+                      error: Exception) -> InstallResult:
+        now = datetime.now()
+        installer.log(str(error), id=app['id'], phase='install', error=type(error).__name__)
+        return InstallResult(
+            name=app.get('name', app['id']),
+            id=app['id'],
+            returncode=1,
+            stdout='',
+            stderr=str(error),
+            start=download.start if download is not None else now,
+            end=now,
+            download_start=download.start if download is not None else None,
+            download_end=download.end if download is not None else None,
+            install_start=now,
+            action=installer.UPGRADE if self.upgrade else installer.INSTALL,
+        )
+
+    def _discard(self, download: Optional[DownloadResult], root: Path):
+        # Las entradas de la caché no se borran; se libera su préstamo.
+        if download is None:
+            return
+        if root in download.directory.parents:
+            shutil.rmtree(download.directory, ignore_errors=True)
+        elif self.cache is not None:
+            self.cache.release(download)
+
+    def _pause_downloads(self):
+        """Impide que empiecen descargas nuevas y espera a que terminen las que están en curso."""
+        with trace.span('scheduler.drain_downloads'), self._gate:
+            self._paused = True
+            while self._active_downloads:
+                self._gate.wait()
+
+    def _resume_downloads(self):
+        with self._gate:
+            self._paused = False
+            self._gate.notify_all()
+
+    def _download(self, idx: int, app: Dict[str, str], directory: Path, ready: queue.Queue):
+        download: Optional[DownloadResult] = None
+        with self._state_lock:
+            blocked = self._graph.blocked_by(idx, self._failed) is not None
+        if blocked:
+            # Ya no se va a instalar; la cola de instalación genera su resultado.
+            with self._state_lock:
+                self._downloaded.add(idx)
+            ready.put((idx, app, None))
+            return
+        with self._gate:
+            while self._paused:
+                self._gate.wait()
+            self._active_downloads += 1
+        try:
+            if self.cache is not None:
+                download = self.cache.lookup(app['id'], self.cache.target_version(app))
+            if download is None:
+                self._status(app, 'download')
+                download = installer.download_app(
+                    app, directory, on_progress=self._progress(app, 'download')
+                )
+                if self.cache is not None:
+                    self.cache.store(download)
+        except Exception as e:
+            # Sin descarga previa la fase de instalación usa `winget install`.
+            installer.log(str(e), id=app['id'], phase='download')
+        finally:
+            with self._gate:
+                self._active_downloads -= 1
+                self._gate.notify_all()
+            with self._state_lock:
+                self._downloaded.add(idx)
+            ready.put((idx, app, download))
+
+    def eta(self) -> Optional[float]:
+        """
+        Segundos que faltan para terminar el lote según el historial, o None sin él.
+
+        La cola de instalación es secuencial, así que el resto es la suma de las
+        instalaciones pendientes, salvo que las descargas que faltan (repartidas
+        entre los hilos) tarden más.
+        """
+        if not self._expected:
+            return None
+        with self._state_lock:
+            pending = [idx for idx in self._expected if idx not in self._done]
+            downloads = sum(self._expected[idx][0] for idx in pending if idx not in self._downloaded)
+        install = sum(self._expected[idx][1] for idx in pending)
+        current, started = self._installing, self._install_started
+        if started is not None and current in pending:
+            install -= min(time.monotonic() - started, self._expected[current][1])
+        return max(install, downloads / self.max_workers, 0.0)
+
+    def _progress(self, app: Dict[str, str], phase: str):
+        if not self.on_progress:
+            return None
+        return lambda event: self.on_progress(app, phase, event)
+
+    def _status(self, app: Dict[str, str], phase: str):
+        if self.on_status:
+            self.on_status(app, phase)
@@ -0,0 +1,192 @@
+import bisect
+import re
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+
+Key = Tuple[str, str]  # (categoría, id)
+
+# Peso de cada campo del catálogo en la puntuación.
+FIELD_WEIGHTS = {'name': 3.0, 'id': 2.0, 'category': 1.0}
+# Similitud mínima de trigramas para aceptar un término con errores, salvo
+# que la distancia de edición quede dentro de `_edit_budget`.
+FUZZY_THRESHOLD = 0.45
+
+_SPLIT = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(text: str) -> str:
+    """Pasa a minúsculas y elimina acentos ("Diseño" -> "diseno")."""
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _SPLIT.split(normalize(text)) if t]
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Distancia de Levenshtein; devuelve `limit + 1` en cuanto la supera."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def ngrams(token: str, n: int = 3) -> Set[str]:
+    padded = f' {token} '
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def _edit_budget(term: str) -> int:
+    return 1 if len(term) <= 5 else 2
+
+
+class SearchIndex:
+    """
+    Índice invertido sobre nombre, id y categoría de las apps del catálogo.
+
+    Guarda tokens normalizados y sus trigramas para resolver coincidencias
+    exactas, por prefijo, por subcadena y aproximadas (errores de tecleo).
+    `update` aplica solo las diferencias con el catálogo anterior.
+    """
+
+    def __init__(self):
+        self._docs: Dict[Key, Tuple[tuple, Dict[str, float]]] = {}
+        self._names: Dict[Key, str] = {}
+        self._postings: Dict[str, Dict[Key, float]] = {}
+        self._grams: Dict[str, Set[str]] = {}
+        self._sorted: List[str] = []
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def update(self, catalog: Dict[str, List[Dict[str, str]]]):
+        """Sincroniza el índice con `catalog` tocando solo las entradas que cambiaron."""
+        seen = set()
+        for category, apps in catalog.items():
+            for app in apps:
+                key = (category, app.get('id', ''))
+                signature = (app.get('name', ''), app.get('id', ''), category)
+                seen.add(key)
+                current = self._docs.get(key)
+                if current is not None and current[0] == signature:
+                    continue
+                if current is not None:
+                    self._remove(key)
+                self._add(key, signature)
+        for key in [k for k in self._docs if k not in seen]:
+            self._remove(key)
+
+    def _add(self, key: Key, signature: tuple):
+        name, app_id, category = signature
+        weights: Dict[str, float] = {}
+        for field, text in (('name', name), ('id', app_id), ('category', category)):
+            for token in tokenize(text):
+                weights[token] = max(weights.get(token, 0.0), FIELD_WEIGHTS[field])
+        for token, weight in weights.items():
+            if token not in self._postings:
+                self._postings[token] = {}
+                for gram in ngrams(token):
+                    self._grams.setdefault(gram, set()).add(token)
+                self._dirty = True
+            self._postings[token][key] = weight
+        self._docs[key] = (signature, weights)
+        self._names[key] = normalize(name)
+
+    def _remove(self, key: Key):
+        _, weights = self._docs.pop(key)
+        self._names.pop(key, None)
+        for token in weights:
+            postings = self._postings[token]
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[token]
+                for gram in ngrams(token):
+                    tokens = self._grams.get(gram)
+                    if tokens is not None:
+                        tokens.discard(token)
+                        if not tokens:
+                            del self._grams[gram]
+                self._dirty = True
+
+    def _term_matches(self, term: str) -> Dict[str, float]:
+        """Tokens del índice que casan con `term` y la calidad de cada coincidencia."""
+        if self._dirty:
+            self._sorted = sorted(self._postings)
+            self._dirty = False
+        matches: Dict[str, float] = {}
+        if term in self._postings:
+            matches[term] = 1.0
+        start = bisect.bisect_left(self._sorted, term)
+        for token in self._sorted[start:]:
+            if not token.startswith(term):
+                break
+            matches.setdefault(token, 0.8)
+        if len(term) < 3:
+            return matches
+
+        term_grams = ngrams(term)
+        shared: Dict[str, int] = {}
+        for gram in term_grams:
+            for token in self._grams.get(gram, ()):
+                shared[token] = shared.get(token, 0) + 1
+        for token, count in shared.items():
+            if token in matches:
+                continue
+            if term in token:
+                matches[token] = 0.6
+                continue
+            similarity = count / len(term_grams | ngrams(token))
+            if similarity >= FUZZY_THRESHOLD:
+                matches[token] = 0.5 * similarity
+                continue
+            budget = _edit_budget(term)
+            # Comparar solo el prefijo permite errores en "firefx" frente a "firefox"
+            # y también en términos que aún se están escribiendo.
+            distance = edit_distance(term, token[:len(term) + budget], budget)
+            if distance <= budget:
+                matches[token] = 0.5 * (1 - distance / len(term))
+        return matches
+
+    def search(self, query: str) -> Optional[Dict[Key, float]]:
+        """
+        Puntúa las entradas que casan con todos los términos de `query`.
+
+        Devuelve None si la consulta está vacía (no hay filtro).
+        """
+        terms = tokenize(query)
+        if not terms:
+            return None
+        scores: Optional[Dict[Key, float]] = None
+        for term in terms:
+            term_scores: Dict[Key, float] = {}
+            for token, quality in self._term_matches(term).items():
+                for key, weight in self._postings[token].items():
+                    score = quality * weight
+                    if score > term_scores.get(key, 0.0):
+                        term_scores[key] = score
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {k: s + term_scores[k] for k, s in scores.items() if k in term_scores}
+            if not scores:
+                return {}
+        phrase = normalize(query).strip()
+        for key in scores:
+            if phrase in self._names[key]:
+                scores[key] += 1.0
+        return scores
+
+    def rank(self, query: str) -> List[Key]:
+        scores = self.search(query)
+        if scores is None:
+            return list(self._docs)
+        return sorted(scores, key=lambda k: (-scores[k], self._names[k]))
@@ -0,0 +1,144 @@
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+Listener = Callable[[Set[str]], None]
+
+
+class SelectionModel:
+    """
+    Selección de aplicaciones independiente de los widgets.
+
+    Mantiene el total y el número de seleccionadas por categoría de forma
+    incremental. Los cambios hechos dentro de `batch()` se notifican una sola
+    vez al terminar el lote, con el conjunto de ids que cambiaron.
+    """
+
+    def __init__(self):
+        self._apps: Dict[str, Tuple[Dict[str, str], str]] = {}
+        self._selected: Dict[str, Dict[str, str]] = {}
+        self._counts: Dict[str, int] = {}
+        # id -> versión fijada por un perfil o manifiesto
+        self._pins: Dict[str, str] = {}
+        self._listeners: List[Listener] = []
+        self._depth = 0
+        self._changed: Set[str] = set()
+
+    def set_catalog(self, catalog: Dict[str, List[Dict[str, str]]]):
+        """Registra las apps del catálogo y descarta las seleccionadas que ya no existen."""
+        with self.batch():
+            self._apps = {
+                app['id']: (app, category)
+                for category, apps in catalog.items()
+                for app in apps
+            }
+            for app_id in [i for i in self._selected if i not in self._apps]:
+                del self._selected[app_id]
+                self._pins.pop(app_id, None)
+                self._changed.add(app_id)
+            self._counts = {}
+            for app_id in self._selected:
+                app, category = self._apps[app_id]
+                self._selected[app_id] = app
+                self._counts[category] = self._counts.get(category, 0) + 1
+
+    def subscribe(self, listener: Listener):
+        self._listeners.append(listener)
+
+    @contextmanager
+    def batch(self):
+        self._depth += 1
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self._notify()
+
+    def _notify(self):
+        if not self._changed:
+            return
+        changed, self._changed = self._changed, set()
+        for listener in self._listeners:
+            listener(changed)
+
+    def set(self, app_id: str, value: bool):
+        if app_id not in self._apps or (app_id in self._selected) == value:
+            return
+        app, category = self._apps[app_id]
+        if value:
+            self._selected[app_id] = app
+            self._counts[category] = self._counts.get(category, 0) + 1
+        else:
+            del self._selected[app_id]
+            self._pins.pop(app_id, None)
+            self._counts[category] -= 1
+        self._changed.add(app_id)
+        if self._depth == 0:
+            self._notify()
+
+    def select(self, app_ids: Iterable[str]):
+        with self.batch():
+            for app_id in app_ids:
+                self.set(app_id, True)
+
+    def deselect(self, app_ids: Iterable[str]):
+        with self.batch():
+            for app_id in app_ids:
+                self.set(app_id, False)
+
+    def apply(self, app_ids: Iterable[str], pins: Optional[Dict[str, str]] = None, replace: bool = False):
+        """
+        Aplica una selección importada en un solo lote.
+
+        Con `replace` se deselecciona antes todo lo demás. `pins` asigna una
+        versión fija a algunas de las apps; las demás se instalan en la
+        última versión.
+        """
+        app_ids = [app_id for app_id in app_ids if app_id in self._apps]
+        with self.batch():
+            if replace:
+                keep = set(app_ids)
+                for app_id in [i for i in self._selected if i not in keep]:
+                    self.set(app_id, False)
+            for app_id in app_ids:
+                self.set(app_id, True)
+                self._pins.pop(app_id, None)
+            for app_id, version in (pins or {}).items():
+                if app_id in self._selected and version:
+                    self._pins[app_id] = version
+                    self._changed.add(app_id)
+
+    def clear(self):
+        self.deselect(list(self._selected))
+
+    def toggle(self, app_ids: Iterable[str]) -> bool:
+        """Selecciona todas las `app_ids` o, si ya lo estaban, las deselecciona."""
+        app_ids = list(app_ids)
+        new_state = not all(app_id in self._selected for app_id in app_ids)
+        with self.batch():
+            for app_id in app_ids:
+                self.set(app_id, new_state)
+        return new_state
+
+    def is_selected(self, app_id: str) -> bool:
+        return app_id in self._selected
+
+    @property
+    def count(self) -> int:
+        return len(self._selected)
+
+    def category_count(self, category: str) -> int:
+        return self._counts.get(category, 0)
+
+    def category_of(self, app_id: str) -> str:
+        return self._apps[app_id][1]
+
+    def pin_of(self, app_id: str) -> Optional[str]:
+        return self._pins.get(app_id)
+
+    def selected_apps(self) -> List[Dict[str, str]]:
+        """Apps seleccionadas, en el orden en que se seleccionaron, con `version` si está fijada."""
+        return [
+            dict(app, version=self._pins[app_id]) if app_id in self._pins else app
+            for app_id, app in self._selected.items()
+        ]
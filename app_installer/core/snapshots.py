@@ -0,0 +1,218 @@
+import json
+import os
+import platform
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .paths import DATA_DIR
+
+SNAPSHOT_DIR = DATA_DIR / 'backups'
+SNAPSHOT_FILE = 'snapshots.jsonl'
+# Cada KEYFRAME_EVERY instantáneas se guarda una completa, para que
+# reconstruir una no obligue a recorrer toda la cadena.
+KEYFRAME_EVERY = 50
+
+# Campos de `scanner.list_installed_apps` que se guardan de cada paquete
+_FIELDS = ('id', 'name', 'version', 'source')
+
+Packages = Dict[str, Dict[str, str]]
+
+
+@dataclass
+class SnapshotDiff:
+    """Diferencia entre dos estados, por id en minúsculas."""
+    added: Packages = field(default_factory=dict)
+    removed: Packages = field(default_factory=dict)
+    # id -> (id, versión anterior, versión nueva)
+    changed: Dict[str, Tuple[str, str, str]] = field(default_factory=dict)
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+    def summary(self) -> str:
+        return f'+{len(self.added)} -{len(self.removed)} ~{len(self.changed)}'
+
+    def to_dict(self) -> Dict:
+        return {
+            'added': sorted(self.added.values(), key=lambda p: p['id'].lower()),
+            'removed': sorted(self.removed.values(), key=lambda p: p['id'].lower()),
+            'changed': [
+                {'id': app_id, 'from': old, 'to': new} for _, (app_id, old, new) in sorted(self.changed.items())
+            ],
+        }
+
+
+@dataclass
+class SnapshotInfo:
+    number: int
+    created: str
+    host: str
+    label: str
+    # Instantánea completa (no depende de las anteriores)
+    full: bool
+    added: int
+    removed: int
+    changed: int
+
+
+def packages_from_apps(apps: List[Dict[str, str]]) -> Packages:
+    """
+    Estado a partir de la salida de `scanner.list_installed_apps`. Los ids
+    truncados con "…" se omiten (ver `scanner.resolve_truncated`).
+    """
+    return {
+        app['id'].lower(): {key: app.get(key, '') for key in _FIELDS}
+        for app in apps if app.get('id') and not app['id'].endswith('…')
+    }
+
+
+def diff_states(old: Packages, new: Packages) -> SnapshotDiff:
+    diff = SnapshotDiff()
+    for key, package in new.items():
+        previous = old.get(key)
+        if previous is None:
+            diff.added[key] = package
+        elif previous['version'] != package['version']:
+            diff.changed[key] = (package['id'], previous['version'], package['version'])
+    for key, package in old.items():
+        if key not in new:
+            diff.removed[key] = package
+    return diff
+
+
+class SnapshotStore:
+    """
+    Instantáneas versionadas de los paquetes instalados.
+
+    Se guardan en un único fichero JSON Lines, una línea por instantánea, que
+    solo contiene la diferencia con la anterior (paquetes añadidos, ids
+    quitados y versiones cambiadas). La primera y cada KEYFRAME_EVERY son
+    completas. Una instantánea sin cambios no se escribe. El fichero solo se
+    amplía, así que se puede copiar a otro equipo para restaurar allí.
+    """
+
+    def __init__(self, root: Path = SNAPSHOT_DIR):
+        self.root = Path(root)
+        self.path = self.root / SNAPSHOT_FILE
+        self._records: List[Dict] = []
+        self._stamp = None
+
+    def _load(self) -> List[Dict]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            self._records, self._stamp = [], None
+            return self._records
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp != self._stamp:
+            records = []
+            with self.path.open(encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # Una línea a medio escribir (corte de luz) se ignora.
+                        continue
+            self._records, self._stamp = records, stamp
+        return self._records
+
+    def list(self) -> List[SnapshotInfo]:
+        return [
+            SnapshotInfo(r['n'], r['created'], r.get('host', ''), r.get('label', ''), r.get('base') is None,
+                         len(r.get('add', ())), len(r.get('remove', ())), len(r.get('change', {})))
+            for r in self._load()
+        ]
+
+    def latest(self) -> Optional[int]:
+        records = self._load()
+        return records[-1]['n'] if records else None
+
+    def resolve(self, ref) -> int:
+        """Número de instantánea a partir de un número, 'latest' o un índice negativo (-1 = última)."""
+        records = self._load()
+        if not records:
+            raise ValueError('no hay instantáneas')
+        if ref in (None, 'latest'):
+            return records[-1]['n']
+        number = int(ref)
+        if number < 0:
+            if -number > len(records):
+                raise ValueError(f'solo hay {len(records)} instantáneas')
+            return records[number]['n']
+        if not any(r['n'] == number for r in records):
+            raise ValueError(f'no existe la instantánea {number}')
+        return number
+
+    def state(self, ref=None) -> Packages:
+        """Paquetes de una instantánea, reconstruidos desde la última completa anterior."""
+        number = self.resolve(ref)
+        records = self._load()
+        end = next(pos for pos, r in enumerate(records) if r['n'] == number)
+        start = end
+        while start > 0 and records[start].get('base') is not None:
+            start -= 1
+        packages: Packages = {}
+        for record in records[start:end + 1]:
+            if record.get('base') is None:
+                packages = {}
+            for key in record.get('remove', ()):
+                packages.pop(key, None)
+            for key, version in record.get('change', {}).items():
+                if key in packages:
+                    packages[key] = dict(packages[key], version=version)
+            for package in record.get('add', ()):
+                packages[package['id'].lower()] = package
+        return packages
+
+    def diff(self, old_ref, new_ref=None) -> SnapshotDiff:
+        return diff_states(self.state(old_ref), self.state(new_ref))
+
+    def take(self, apps: List[Dict[str, str]], label: str = '') -> Tuple[Optional[SnapshotInfo], SnapshotDiff]:
+        """
+        Guarda el estado de `apps` (salida de `scanner.list_installed_apps`
+        con `check=True`: una lista de un `winget list` fallido se tomaría
+        como si se hubieran desinstalado todos los paquetes).
+
+        Devuelve la instantánea nueva y su diferencia con la anterior; si no
+        cambió nada no se escribe y la instantánea es None.
+        """
+        records = self._load()
+        current = packages_from_apps(apps)
+        previous = self.state() if records else {}
+        diff = diff_states(previous, current)
+        if records and diff.empty:
+            return None, diff
+
+        number = records[-1]['n'] + 1 if records else 1
+        full = not records or number % KEYFRAME_EVERY == 0
+        record = {
+            'n': number,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'host': platform.node(),
+            'label': label,
+            'base': None if full else records[-1]['n'],
+        }
+        if full:
+            record['add'] = [current[key] for key in sorted(current)]
+        else:
+            record['add'] = [diff.added[key] for key in sorted(diff.added)]
+            record['remove'] = sorted(diff.removed)
+            record['change'] = {key: new for key, (_, _, new) in sorted(diff.changed.items())}
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self.path.open('a+b') as f:
+            # Si la última línea quedó a medias, la nueva empieza en otra línea.
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+            f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n')
+            f.flush()
+            os.fsync(f.fileno())
+        return self.list()[-1], diff
@@ -0,0 +1,38 @@
+import os
+import sys
+import time
+from typing import Dict, List, Tuple
+
+# Con APP_INSTALLER_STARTUP_TRACE=1 cada hito se imprime en stderr al momento.
+TRACE_ENV = 'APP_INSTALLER_STARTUP_TRACE'
+
+# Referencia de los tiempos: la primera importación de este módulo, que la
+# interfaz hace antes que cualquier otra dependencia.
+STARTED = time.perf_counter()
+
+_marks: List[Tuple[str, float]] = []
+
+
+def mark(name: str) -> float:
+    """Registra un hito del arranque y devuelve los segundos desde `STARTED`."""
+    elapsed = time.perf_counter() - STARTED
+    _marks.append((name, elapsed))
+    if os.environ.get(TRACE_ENV):
+        print(f'[arranque] {name}: {elapsed * 1000:.0f} ms', file=sys.stderr)
+    return elapsed
+
+
+def marks() -> Dict[str, float]:
+    return dict(_marks)
+
+
+def report():
+    """Escribe los hitos en el registro de instalación (phase 'startup')."""
+    from .logger import get_logger
+
+    get_logger().event(
+        'arranque',
+        phase='startup',
+        frozen=bool(getattr(sys, 'frozen', False)),
+        **{name: round(elapsed, 3) for name, elapsed in _marks},
+    )
@@ -0,0 +1,230 @@
+import atexit
+import json
+import os
+import threading
+import time
+from functools import wraps
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .paths import DATA_DIR
+
+# APP_INSTALLER_TRACE=1 guarda la traza en TRACE_PATH al salir; cualquier otro
+# valor se toma como la ruta del fichero. Sin la variable, `span`, `count` y
+# `traced` no hacen nada.
+TRACE_ENV = 'APP_INSTALLER_TRACE'
+TRACE_PATH = DATA_DIR / 'logs' / 'trace.json'
+# Eventos que se guardan para el fichero; las estadísticas no tienen límite.
+MAX_EVENTS = 200_000
+
+
+class _Stat:
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class Tracer:
+    """
+    Recoge intervalos (spans) y contadores en memoria.
+
+    `export` los escribe en el formato de Chrome Trace Event (abrir con
+    chrome://tracing o https://ui.perfetto.dev) y `summary` los agrega por
+    nombre para la ventana de rendimiento.
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_events: int = MAX_EVENTS):
+        self.path = path
+        self.max_events = max_events
+        self.origin = time.perf_counter()
+        self.events: List[Dict] = []
+        self.dropped = 0
+        self._stats: Dict[str, _Stat] = {}
+        self._counters: Dict[str, float] = {}
+        self._threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, event: Dict):
+        tid = threading.get_ident()
+        event['pid'] = os.getpid()
+        event['tid'] = tid
+        if tid not in self._threads:
+            self._threads[tid] = threading.current_thread().name
+        if len(self.events) < self.max_events:
+            self.events.append(event)
+        else:
+            self.dropped += 1
+
+    def complete(self, name: str, start: float, end: float, args: Optional[Dict] = None):
+        """Registra un intervalo con tiempos de `time.perf_counter()`."""
+        duration = end - start
+        event = {'name': name, 'ph': 'X', 'ts': (start - self.origin) * 1e6, 'dur': duration * 1e6}
+        if args:
+            event['args'] = args
+        with self._lock:
+            stat = self._stats.get(name)
+            if stat is None:
+                stat = self._stats[name] = _Stat()
+            stat.count += 1
+            stat.total += duration
+            if duration > stat.max:
+                stat.max = duration
+            self._add(event)
+
+    def count(self, name: str, value: float = 1):
+        with self._lock:
+            total = self._counters[name] = self._counters.get(name, 0) + value
+            self._add({'name': name, 'ph': 'C', 'ts': (time.perf_counter() - self.origin) * 1e6,
+                       'args': {'value': total}})
+
+    def summary(self) -> Dict:
+        """Por cada span: llamadas, total, media y máximo en ms; y el valor de cada contador."""
+        with self._lock:
+            spans = {
+                name: {
+                    'count': stat.count,
+                    'total_ms': round(stat.total * 1000, 3),
+                    'mean_ms': round(stat.total * 1000 / stat.count, 3),
+                    'max_ms': round(stat.max * 1000, 3),
+                }
+                for name, stat in self._stats.items()
+            }
+            counters = dict(self._counters)
+        return {'spans': dict(sorted(spans.items(), key=lambda item: -item[1]['total_ms'])),
+                'counters': counters}
+
+    def export(self, path: Optional[Path] = None) -> Optional[Path]:
+        path = Path(path or self.path or TRACE_PATH)
+        with self._lock:
+            events = list(self.events)
+            threads = dict(self._threads)
+            dropped = self.dropped
+        metadata = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': name}}
+            for tid, name in threads.items()
+        ]
+        data = {'traceEvents': metadata + events, 'displayTimeUnit': 'ms',
+                'otherData': {'dropped_events': dropped}}
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(data), encoding='utf-8')
+        except OSError:
+            return None
+        return path
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'args', 'start')
+
+    def __init__(self, tracer: Tracer, name: str, args: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.complete(self.name, self.start, time.perf_counter(), self.args)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+_tracer: Optional[Tracer] = None
+
+
+def enable(path: Optional[Path] = None, export_at_exit: bool = True) -> Tracer:
+    """Activa la traza (también la activa APP_INSTALLER_TRACE al importar el módulo)."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(path)
+        if export_at_exit:
+            atexit.register(_tracer.export)
+    return _tracer
+
+
+def disable():
+    global _tracer
+    _tracer = None
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def span(name: str, **args):
+    """`with trace.span('nombre', id=...):` mide el bloque; sin traza no hace nada."""
+    if _tracer is None:
+        return _NO_SPAN
+    return _Span(_tracer, name, args)
+
+
+def complete(name: str, start: float, end: float, **args):
+    if _tracer is not None:
+        _tracer.complete(name, start, end, args)
+
+
+def count(name: str, value: float = 1):
+    if _tracer is not None:
+        _tracer.count(name, value)
+
+
+def traced(name: str):
+    """Decorador equivalente a envolver la función en `span(name)`."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                tracer.complete(name, start, time.perf_counter())
+        return wrapper
+    return decorator
+
+
+def summary() -> Optional[Dict]:
+    return _tracer.summary() if _tracer is not None else None
+
+
+def format_summary(data: Dict) -> str:
+    """Tabla de texto de `summary()`, de más a menos tiempo total."""
+    width = max((len(name) for name in data['spans']), default=10)
+    lines = [f"{'span':<{width}}  {'llamadas':>8}  {'total ms':>10}  {'media ms':>9}  {'máx ms':>9}"]
+    for name, stat in data['spans'].items():
+        lines.append(f"{name:<{width}}  {stat['count']:>8}  {stat['total_ms']:>10.1f}  "
+                     f"{stat['mean_ms']:>9.2f}  {stat['max_ms']:>9.1f}")
+    if data['counters']:
+        lines.append('')
+        lines.extend(f'{name}: {value:g}' for name, value in sorted(data['counters'].items()))
+    return '\n'.join(lines)
+
+
+def _from_env():
+    value = os.environ.get(TRACE_ENV, '')
+    if value and value != '0':
+        enable(None if value == '1' else Path(value))
+
+
+_from_env()
@@ -0,0 +1,107 @@
+import threading
+import traceback
+from typing import Callable, Dict, List, Tuple
+
+from app_installer.core import trace
+
+# Interval between two drains of the queue (ms)
+TICK_MS = 50
+# Lines kept in a textbox fed through append(); older lines are dropped
+MAX_TEXT_LINES = 2000
+
+
+class UIEventBus:
+    """
+    Thread-safe queue between worker threads and the Tk thread.
+
+    Workers never touch widgets or call `after` themselves. They post work here,
+    and the Tk thread drains everything every TICK_MS:
+
+    - `call(fn)` runs fn once, in posting order.
+    - `post(key, fn)` keeps only the latest fn per key, for progress labels that
+      are overwritten many times between two ticks.
+    - `append(textbox, text)` joins all the text for a textbox into a single
+      insert per tick, scrolls once, and trims it to `max_lines`.
+    """
+
+    def __init__(self, widget, interval_ms: int = TICK_MS, max_lines: int = MAX_TEXT_LINES):
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self.max_lines = max_lines
+        self._lock = threading.Lock()
+        # ('call', fn) or ('append', textbox, [chunks]) in posting order
+        self._ops: List[Tuple] = []
+        self._latest: Dict[str, Callable[[], None]] = {}
+        self._job = None
+
+    def start(self):
+        if self._job is None:
+            self._job = self.widget.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+
+    def call(self, fn: Callable[[], None]):
+        with self._lock:
+            self._ops.append(('call', fn))
+
+    def post(self, key: str, fn: Callable[[], None]):
+        with self._lock:
+            self._latest[key] = fn
+
+    def append(self, textbox, text: str):
+        with self._lock:
+            last = self._ops[-1] if self._ops else None
+            if last is not None and last[0] == 'append' and last[1] is textbox:
+                last[2].append(text)
+            else:
+                self._ops.append(('append', textbox, [text]))
+
+    def flush(self):
+        """Apply everything queued so far; must run on the Tk thread."""
+        with self._lock:
+            ops, self._ops = self._ops, []
+            latest, self._latest = self._latest, {}
+        if not ops and not latest:
+            return
+        trace.count('ui.updates', len(ops) + len(latest))
+        with trace.span('ui.flush'):
+            self._apply(ops, latest)
+
+    def _apply(self, ops, latest):
+        """Each op runs on its own: one failing callback must not drop the rest of the tick"""
+        touched = {}
+        for op in ops:
+            if op[0] == 'call':
+                self._run(op[1])
+            elif self._run(lambda op=op: op[1].insert('end', ''.join(op[2]))):
+                touched[id(op[1])] = op[1]
+        for fn in latest.values():
+            self._run(fn)
+        for textbox in touched.values():
+            self._run(lambda t=textbox: (self._trim(t), t.see('end')))
+
+    @staticmethod
+    def _run(fn) -> bool:
+        try:
+            fn()
+        except Exception:
+            from app_installer.core.logger import get_logger
+
+            get_logger().event('error en una actualización de la interfaz', phase='ui',
+                               stderr=traceback.format_exc())
+            return False
+        return True
+
+    def _trim(self, textbox):
+        lines = int(textbox.index('end-1c').split('.')[0])
+        if lines > self.max_lines:
+            textbox.delete('1.0', f'{lines - self.max_lines + 1}.0')
+
+    def _tick(self):
+        try:
+            self.flush()
+        finally:
+            self._job = self.widget.after(self.interval_ms, self._tick)
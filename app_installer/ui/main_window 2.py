@@ -1,6 +1,8 @@
+# Imported first so the startup clock covers the GUI imports below
+from app_installer.core import startup
+
 import threading
 import tkinter as tk
-from tkinter import filedialog, messagebox
 import sys
 import os
 
@@ -8,10 +10,14 @@ import customtkinter as ctk
 from pathlib import Path
 from typing import Dict, List
 
-
-
-from app_installer.core import installer, file_manager, scanner
-from .settings_window import SettingsWindow
+# Only what the first paint needs is imported here. installer, scanner, planner,
+# the scheduler, the settings window and the tkinter dialogs are imported where
+# they are used; the catalog loader thread warms the core modules up.
+from app_installer.core import file_manager, trace
+from app_installer.core.catalog import Catalog
+from app_installer.core.search import SearchIndex
+from app_installer.core.selection import SelectionModel
+from .event_bus import UIEventBus
 
 def get_resource_path(relative_path):
     """Get absolute path to resource, works for dev and for PyInstaller"""
@@ -23,6 +29,10 @@ def get_resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 CATALOG_PATH = Path(get_resource_path('app_installer/data/apps_catalog.json'))
+# Delay after the last keystroke before running the search (ms)
+SEARCH_DEBOUNCE_MS = 150
+# Catalog rows created per event-loop turn while the list is being populated
+ROWS_PER_TICK = 25
 
 
 class AppInstallerUI(ctk.CTk):
@@ -32,11 +42,43 @@ class AppInstallerUI(ctk.CTk):
         ctk.set_default_color_theme("dark-blue")
         self.title("Winget App Installer")
         self.geometry("800x600")
-        self.catalog = file_manager.load_catalog(CATALOG_PATH)
+        self.search_index = SearchIndex()
+        self.catalog = Catalog()
         self.selected_apps: List[Dict[str, str]] = []
         self.check_vars = {}
         self.category_frames = {}
+        self.row_widgets = {}
+        self.visible_rows = set()
+        self.selection = SelectionModel()
+        self.selection.subscribe(self._on_selection_changed)
+        self.row_positions = {}
+        self._search_job = None
+        # Latest `winget upgrade` snapshot and the catalog apps it can upgrade, by id
+        self.upgrade_snapshot = None
+        self.upgrade_items = {}
+        self.history_store = None
+        self.package_cache = None
+        # True while an install or upgrade batch runs; only one may run at a time
+        self._busy = False
+        # `winget show` data and expected (download, install) seconds, by id;
+        # filled in by a background thread, never on the Tk thread
+        self.metadata = {}
+        self.expected = {}
+        self.detail_labels = {}
+        self._metadata_pending = {}
+        self._metadata_lock = threading.Lock()
+        self._metadata_gen = 0
+        self._prefetcher = None
+        self._build_job = None
+        self._populating = True
+        # Worker threads reach the widgets only through this bus
+        self.events = UIEventBus(self)
+        self.events.start()
         self.create_widgets()
+        startup.mark('window')
+        # Paint the empty window first, then load the catalog off the Tk thread
+        self.after_idle(self._first_paint)
+        threading.Thread(target=self._load_catalog_thread, daemon=True).start()
 
     def create_widgets(self):
         self.search_var = tk.StringVar()
@@ -50,11 +92,19 @@ class AppInstallerUI(ctk.CTk):
         ctk.CTkLabel(top_frame, text="Buscar:").grid(row=0, column=0, padx=(0, 5))
         search_entry = ctk.CTkEntry(top_frame, textvariable=self.search_var, placeholder_text="Buscar aplicaciones...")
         search_entry.grid(row=0, column=1, sticky="ew", padx=(0, 10))
-        search_entry.bind("<KeyRelease>", lambda e: self.refresh_app_list())
+        search_entry.bind("<KeyRelease>", lambda e: self.schedule_search())
         
         # Clear search button
         clear_btn = ctk.CTkButton(top_frame, text="Limpiar", width=60, command=self.clear_search)
         clear_btn.grid(row=0, column=2, padx=(0, 5))
+
+        # Named selection profiles, stored next to the catalog
+        ctk.CTkLabel(top_frame, text="Perfil:").grid(row=0, column=3, padx=(10, 5))
+        self.profile_var = tk.StringVar()
+        self.profile_box = ctk.CTkComboBox(top_frame, variable=self.profile_var, values=[], width=160)
+        self.profile_box.grid(row=0, column=4, padx=(0, 5))
+        ctk.CTkButton(top_frame, text="Cargar", width=60, command=self.load_profile).grid(row=0, column=5, padx=(0, 5))
+        ctk.CTkButton(top_frame, text="Guardar", width=60, command=self.save_profile).grid(row=0, column=6)
         
         # Selection controls frame
         selection_frame = ctk.CTkFrame(self)
@@ -65,6 +115,13 @@ class AppInstallerUI(ctk.CTk):
         self.selection_label = ctk.CTkLabel(selection_frame, text="0 aplicaciones seleccionadas", 
                                           font=ctk.CTkFont(size=14, weight="bold"))
         self.selection_label.grid(row=0, column=0, padx=10, pady=5, sticky="w")
+
+        # Parallel downloads
+        ctk.CTkLabel(selection_frame, text="Descargas paralelas:").grid(row=0, column=1, padx=(10, 5), pady=5, sticky="e")
+        # Set to installer.DEFAULT_MAX_WORKERS once the core modules are loaded
+        self.workers_var = tk.StringVar()
+        ctk.CTkOptionMenu(selection_frame, variable=self.workers_var, width=60,
+                          values=[str(n) for n in range(1, 9)]).grid(row=0, column=2, padx=(0, 5), pady=5, sticky="w")
         
         # Selection buttons
         select_all_btn = ctk.CTkButton(selection_frame, text="Seleccionar Todo", 
@@ -88,7 +145,7 @@ class AppInstallerUI(ctk.CTk):
 
         button_frame = ctk.CTkFrame(bottom_frame)
         button_frame.grid(row=0, column=0, sticky="ew")
-        for i in range(4):
+        for i in range(8):
             button_frame.grid_columnconfigure(i, weight=1)
 
         # Install button with counter
@@ -102,6 +159,17 @@ class AppInstallerUI(ctk.CTk):
         ctk.CTkButton(button_frame, text="Configuraci\u00f3n", command=self.open_settings).grid(row=0, column=1, padx=5, pady=5, sticky="ew")
         ctk.CTkButton(button_frame, text="Exportar", command=self.export_selected).grid(row=0, column=2, padx=5, pady=5, sticky="ew")
         ctk.CTkButton(button_frame, text="Importar", command=self.import_list).grid(row=0, column=3, padx=5, pady=5, sticky="ew")
+        self.check_upgrades_btn = ctk.CTkButton(button_frame, text="Buscar actualizaciones",
+                                                command=self.check_upgrades)
+        self.check_upgrades_btn.grid(row=0, column=4, padx=5, pady=5, sticky="ew")
+        self.upgrade_btn = ctk.CTkButton(button_frame, text="Actualizar (0)", state="disabled",
+                                         command=self.upgrade_selected)
+        self.upgrade_btn.grid(row=0, column=5, padx=5, pady=5, sticky="ew")
+        self.backup_btn = ctk.CTkButton(button_frame, text="Respaldo", command=self.scan_system)
+        self.backup_btn.grid(row=0, column=6, padx=5, pady=5, sticky="ew")
+        if trace.enabled():
+            ctk.CTkButton(button_frame, text="Rendimiento", command=self.open_trace).grid(
+                row=0, column=7, padx=5, pady=5, sticky="ew")
 
         self.status = ctk.CTkTextbox(bottom_frame, height=120)
         self.status.grid(row=1, column=0, sticky="nsew")
@@ -112,71 +180,232 @@ class AppInstallerUI(ctk.CTk):
         self.result_msg = ctk.CTkLabel(bottom_frame, text="")
         self.result_msg.grid(row=3, column=0, sticky="ew", pady=5)
 
-        self.refresh_app_list()
+        self.loading_label = ctk.CTkLabel(self.app_scroll, text="Cargando catálogo...")
+        self.loading_label.grid(row=0, column=0, pady=20)
 
-    def refresh_app_list(self):
+    def _first_paint(self):
+        startup.mark('first_paint')
+        _close_splash()
+
+    def _load_catalog_thread(self):
+        """Load the catalog and the install modules in the background, then populate the list"""
+        try:
+            catalog = file_manager.load_catalog(CATALOG_PATH, index=self.search_index)
+        except Exception as e:
+            msg = f"Error al cargar el catálogo: {e}"
+            self.events.call(lambda: self.loading_label.configure(text=msg))
+            return
+        startup.mark('catalog_loaded')
+        from app_installer.core import installer, planner, scanner  # noqa: F401 - warm-up
+        from app_installer.core import scheduler  # noqa: F401
+        startup.mark('modules_loaded')
+        self.events.call(lambda: self._catalog_loaded(catalog, installer.DEFAULT_MAX_WORKERS))
+
+    def _catalog_loaded(self, catalog, max_workers):
+        if not self.workers_var.get():
+            self.workers_var.set(str(max_workers))
+        self.catalog = catalog
+        self._report_catalog_problems()
+        self._refresh_profiles()
+        self.build_app_list(on_done=self._startup_done)
+
+    def _report_catalog_problems(self):
+        """Entries skipped by the catalog validation (missing fields, duplicated ids)"""
+        problems = self.catalog.problems + self.catalog.warnings
+        if problems:
+            more = f" (y {len(problems) - 3} más)" if len(problems) > 3 else ""
+            self.result_msg.configure(text=f"Catálogo: {'; '.join(problems[:3])}{more}",
+                                      text_color="orange")
+
+    def _startup_done(self):
+        startup.mark('list_ready')
+        self.after_idle(lambda: (startup.mark('interactive'), startup.report()))
+
+    def build_app_list(self, on_done=None):
+        """
+        Create the widgets for every catalog entry once; filtering only shows or hides them.
+
+        Rows are created ROWS_PER_TICK at a time from the event loop, so the window
+        stays responsive and the list fills in progressively.
+        """
+        if self._build_job is not None:
+            self.after_cancel(self._build_job)
+            self._build_job = None
         for widget in self.app_scroll.winfo_children():
             widget.destroy()
-        search = self.search_var.get().lower()
         self.check_vars = {}
         self.category_frames = {}
-        
-        for category, apps in self.catalog.items():
-            # Filter apps by search
-            filtered_apps = []
-            for app in apps:
-                if not search or search in app['name'].lower():
-                    filtered_apps.append(app)
-            
+        self.row_widgets = {}
+        self.detail_labels = {}
+        self.row_positions = {}
+        self.visible_rows = set()
+        self._populating = True
+        # Before any row exists, so clicks during the progressive fill reach the model;
+        # also drops selections for apps that are no longer in the catalog
+        self.selection.set_catalog(self.catalog)
+
+        rows = ((cat_row, category, apps, row, app)
+                for cat_row, (category, apps) in enumerate(self.catalog.items())
+                for row, app in enumerate(apps, start=1))
+        self._build_rows(rows, on_done)
+
+    @trace.traced('ui.build_rows')
+    def _build_rows(self, rows, on_done):
+        self._build_job = None
+        for _ in range(ROWS_PER_TICK):
+            item = next(rows, None)
+            if item is None:
+                self._finish_app_list(on_done)
+                return
+            cat_row, category, apps, row, app = item
+            if category not in self.category_frames:
+                self._add_category(cat_row, category, apps)
+            cat_frame = self.category_frames[category]['frame']
+
+            # Apps in category; grid_remove() keeps each row's slot so hidden rows
+            # come back without re-packing their siblings
+            var = tk.BooleanVar(value=self.selection.is_selected(app['id']))
+            chk = ctk.CTkCheckBox(cat_frame, text=self._row_text(app), variable=var,
+                                command=lambda i=app['id']: self._on_check(i),
+                                font=ctk.CTkFont(size=12))
+            chk.grid(row=row, column=0, sticky="w", padx=20, pady=2)
+            # Version, installer size and expected install time
+            detail = ctk.CTkLabel(cat_frame, text=self._detail_text(app['id']), text_color="gray",
+                                  font=ctk.CTkFont(family="Consolas", size=11))
+            detail.grid(row=row, column=1, sticky="e", padx=(5, 15))
+            self.check_vars[app['id']] = (var, app, category)
+            self.row_widgets[(category, app['id'])] = chk
+            self.detail_labels[(category, app['id'])] = detail
+            self.row_positions[(category, app['id'])] = row
+            self.visible_rows.add((category, app['id']))
+        self._build_job = self.after(1, lambda: self._build_rows(rows, on_done))
+
+    def _add_category(self, cat_row, category, apps):
+        # Category frame
+        cat_frame = ctk.CTkFrame(self.app_scroll)
+        cat_frame.grid(row=cat_row, column=0, sticky="ew", padx=5, pady=5)
+        cat_frame.grid_columnconfigure(0, weight=1)
+
+        # Category header with selection button
+        header_frame = ctk.CTkFrame(cat_frame, fg_color="transparent")
+        header_frame.grid(row=0, column=0, sticky="ew", padx=5, pady=(5, 2))
+        header_frame.grid_columnconfigure(1, weight=1)
+
+        # Category title
+        cat_label = ctk.CTkLabel(header_frame, text=f"{category} ({len(apps)})",
+                               font=ctk.CTkFont(size=16, weight="bold"))
+        cat_label.grid(row=0, column=0, sticky="w")
+
+        # Category select/deselect button
+        cat_btn = ctk.CTkButton(header_frame, text=f"Seleccionar {category}",
+                              command=lambda c=category: self.toggle_category_selection(c),
+                              width=140, height=25,
+                              font=ctk.CTkFont(size=11))
+        cat_btn.grid(row=0, column=2, sticky="e", padx=(5, 0))
+        self.category_frames[category] = {'frame': cat_frame, 'label': cat_label,
+                                          'count': len(apps), 'visible': True}
+
+    def _finish_app_list(self, on_done):
+        self._populating = False
+        for category in self.category_frames:
+            self._update_category_label(category)
+        self.refresh_app_list()
+        self._start_metadata()
+        if on_done is not None:
+            on_done()
+
+    def schedule_search(self):
+        """Debounce the search box so a burst of keystrokes runs a single query"""
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DEBOUNCE_MS, self.refresh_app_list)
+
+    @trace.traced('ui.refresh_app_list')
+    def refresh_app_list(self):
+        """Apply the search filter by toggling only the rows whose visibility or rank changed"""
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+            self._search_job = None
+        if self._populating:
+            # The filter is applied once every row exists
+            return
+        query = self.search_var.get()
+        if query.strip():
+            ranked = self.search_index.rank(query)
+        else:
+            ranked = [(category, app['id']) for category, apps in self.catalog.items() for app in apps]
+        order = {}
+        for key in ranked:
+            order.setdefault(key[0], []).append(key)
+        visible = set()
+
+        for category, info in self.category_frames.items():
+            keys = order.get(category, [])
+            # Ranked matches first, in score order
+            for row, key in enumerate(keys, start=1):
+                visible.add(key)
+                if key not in self.visible_rows or self.row_positions[key] != row:
+                    self.row_widgets[key].grid(row=row)
+                    self.detail_labels[key].grid(row=row)
+                    self.row_positions[key] = row
+
+            count = len(keys)
+            if count != info['count']:
+                info['count'] = count
+                self._update_category_label(category)
             # Skip empty categories
-            if not filtered_apps:
-                continue
-                
-            # Category frame
-            cat_frame = ctk.CTkFrame(self.app_scroll)
-            cat_frame.pack(fill="x", padx=5, pady=5)
-            self.category_frames[category] = cat_frame
-            
-            # Category header with selection button
-            header_frame = ctk.CTkFrame(cat_frame, fg_color="transparent")
-            header_frame.pack(fill="x", padx=5, pady=(5, 2))
-            header_frame.grid_columnconfigure(1, weight=1)
-            
-            # Category title
-            cat_label = ctk.CTkLabel(header_frame, text=f"{category} ({len(filtered_apps)})", 
-                                   font=ctk.CTkFont(size=16, weight="bold"))
-            cat_label.grid(row=0, column=0, sticky="w")
-            
-            # Category select/deselect button
-            cat_btn = ctk.CTkButton(header_frame, text=f"Seleccionar {category}", 
-                                  command=lambda c=category: self.toggle_category_selection(c),
-                                  width=140, height=25, 
-                                  font=ctk.CTkFont(size=11))
-            cat_btn.grid(row=0, column=2, sticky="e", padx=(5, 0))
-            
-            # Apps in category
-            for app in filtered_apps:
-                var = tk.BooleanVar()
-                var.trace('w', lambda *args: self.update_selection_counter())
-                chk = ctk.CTkCheckBox(cat_frame, text=app['name'], variable=var,
-                                    font=ctk.CTkFont(size=12))
-                chk.pack(anchor="w", padx=20, pady=2)
-                self.check_vars[app['id']] = (var, app, category)
-                
+            if bool(count) != info['visible']:
+                if count:
+                    info['frame'].grid()
+                else:
+                    info['frame'].grid_remove()
+                info['visible'] = bool(count)
+
+        for key in self.visible_rows - visible:
+            self.row_widgets[key].grid_remove()
+            self.detail_labels[key].grid_remove()
+        self.visible_rows = visible
         self.update_selection_counter()
 
+    def _on_check(self, app_id):
+        self.selection.set(app_id, self.check_vars[app_id][0].get())
+
+    @trace.traced('ui.selection_changed')
+    def _on_selection_changed(self, changed_ids):
+        """Sync the checkboxes touched by a selection batch and refresh the counters once"""
+        for app_id in changed_ids:
+            data = self.check_vars.get(app_id)
+            if data is not None and data[0].get() != self.selection.is_selected(app_id):
+                data[0].set(self.selection.is_selected(app_id))
+        for category in {self.check_vars[i][2] for i in changed_ids if i in self.check_vars}:
+            self._update_category_label(category)
+        self.update_selection_counter()
+
+    def _update_category_label(self, category):
+        info = self.category_frames[category]
+        text = f"{category} ({info['count']})"
+        selected = self.selection.category_count(category)
+        if selected:
+            text += f" - {selected} seleccionadas"
+        info['label'].configure(text=text)
+
+    def _visible_ids(self, category=None):
+        """Visible ids in the order they are shown: category by category, top to bottom"""
+        rank = {cat: pos for pos, cat in enumerate(self.category_frames)}
+        keys = [key for key in self.visible_rows if category is None or key[0] == category]
+        keys.sort(key=lambda key: (rank.get(key[0], len(rank)), self.row_positions[key]))
+        return [app_id for _, app_id in keys]
+
     def gather_selection(self) -> List[Dict[str, str]]:
-        selected = []
-        for data in self.check_vars.values():
-            var, app = data[0], data[1]
-            if var.get():
-                selected.append(app)
-        return selected
+        return self.selection.selected_apps()
     
     def update_selection_counter(self):
         """Update the selection counter and install button text"""
-        count = sum(1 for data in self.check_vars.values() if data[0].get())
-        self.selection_label.configure(text=f"{count} aplicaciones seleccionadas")
+        count = self.selection.count
+        self.selection_label.configure(text=f"{count} aplicaciones seleccionadas{self._selection_totals()}")
+        if self._busy:
+            # Both buttons stay disabled until the running batch finishes
+            return
         self.install_btn.configure(text=f"Instalar ({count})")
         
         # Update button state
@@ -184,6 +413,10 @@ class AppInstallerUI(ctk.CTk):
             self.install_btn.configure(state="normal")
         else:
             self.install_btn.configure(state="disabled")
+
+        upgradable = len(self._selected_upgrades())
+        self.upgrade_btn.configure(text=f"Actualizar ({upgradable})",
+                                   state="normal" if upgradable else "disabled")
     
     def clear_search(self):
         """Clear the search field"""
@@ -192,31 +425,182 @@ class AppInstallerUI(ctk.CTk):
     
     def select_all(self):
         """Select all visible applications"""
-        for data in self.check_vars.values():
-            data[0].set(True)
-        self.update_selection_counter()
+        self.selection.select(self._visible_ids())
     
     def deselect_all(self):
         """Deselect all applications"""
-        for data in self.check_vars.values():
-            data[0].set(False)
-        self.update_selection_counter()
+        self.selection.clear()
     
     def toggle_category_selection(self, category):
         """Toggle selection of all apps in a category"""
-        category_apps = [data for data in self.check_vars.values() if len(data) > 2 and data[2] == category]
-        
-        # Check if all apps in category are selected
-        all_selected = all(data[0].get() for data in category_apps)
-        
-        # Toggle: if all selected, deselect all; otherwise select all
-        new_state = not all_selected
-        for data in category_apps:
-            data[0].set(new_state)
-        
+        self.selection.toggle(self._visible_ids(category))
+
+    def _row_text(self, app):
+        """Checkbox label, with the version delta when an upgrade is available"""
+        item = self.upgrade_items.get(app['id'])
+        if item is None:
+            return app['name']
+        return f"{app['name']}  ({item.installed_version} \u2192 {item.available_version})"
+
+    def _refresh_row_labels(self):
+        for (category, app_id), chk in self.row_widgets.items():
+            chk.configure(text=self._row_text(self.check_vars[app_id][1]))
+
+    def _detail_text(self, app_id):
+        """Version, size and expected time columns for a row; blank until the data arrives"""
+        info = self.metadata.get(app_id)
+        version = info.version if info is not None and info.version else ''
+        size = self._format_size(info.size_mb) if info is not None and info.size_mb is not None else ''
+        expected = self.expected.get(app_id)
+        duration = self._format_duration(sum(expected)) if expected is not None else ''
+        return f"{version[:16]:>16} {size:>9} {duration:>8}"
+
+    @staticmethod
+    def _format_size(size_mb):
+        if size_mb >= 1024:
+            return f"{size_mb / 1024:.1f} GB"
+        return f"{size_mb:.0f} MB"
+
+    @staticmethod
+    def _format_duration(seconds):
+        if seconds >= 60:
+            return f"~{seconds / 60:.0f} min"
+        return f"~{seconds:.0f}s"
+
+    def _selection_totals(self):
+        """Download size and expected duration of the whole selection, for the counter"""
+        apps = self.selection.selected_apps() if self.selection.count else []
+        if not apps or not (self.metadata or self.expected):
+            return ""
+        from app_installer.core.history import batch_duration
+
+        sizes = [self.metadata[a['id']].size_mb for a in apps
+                 if a['id'] in self.metadata and self.metadata[a['id']].size_mb is not None]
+        parts = []
+        if sizes:
+            prefix = "" if len(sizes) == len(apps) else "≥ "
+            parts.append(prefix + self._format_size(sum(sizes)))
+        expected = [self.expected[a['id']] for a in apps if a['id'] in self.expected]
+        if expected:
+            workers = int(self.workers_var.get() or 1)
+            prefix = "" if len(expected) == len(apps) else "≥ "
+            parts.append(prefix + self._format_duration(batch_duration(expected, workers)))
+        return f" ({', '.join(parts)})" if parts else ""
+
+    def _start_metadata(self):
+        """Show the cached `winget show` data, then refresh what is stale in the background"""
+        self._metadata_gen += 1
+        if self._prefetcher is not None:
+            self._prefetcher.stop()
+        apps = [app for _, app, _ in self.check_vars.values()]
+        threading.Thread(target=self._metadata_thread, args=(apps, self._metadata_gen), daemon=True).start()
+
+    def _metadata_thread(self, apps, generation):
+        from app_installer.core import installer
+        from app_installer.core.history import HistoryStore
+        from app_installer.core.metadata import MetadataCache, MetadataPrefetcher
+
+        cache = MetadataCache()
+        history = HistoryStore()
+        try:
+            # Only ids with history get a time; the global fallback would repeat on every row
+            expected = history.expected_durations([app['id'] for app in apps], fallback=False)
+        finally:
+            history.close()
+        cached = {app['id']: cache.get(app['id']) for app in apps}
+        self._queue_metadata({app_id: info for app_id, info in cached.items() if info is not None and info.ok},
+                             expected)
+        # Also leaves the winget check answered for the Tk thread
+        if not installer.is_winget_available():
+            return
+
+        def on_update(info):
+            if info.ok:
+                self._queue_metadata({info.id: info})
+
+        prefetcher = MetadataPrefetcher(cache, apps, on_update=on_update)
+        self._prefetcher = prefetcher
+        if generation == self._metadata_gen:
+            prefetcher.run()
+
+    def _queue_metadata(self, infos, expected=None):
+        """Called from worker threads; the Tk thread applies the batch on its next tick"""
+        with self._metadata_lock:
+            self._metadata_pending.update(infos)
+            if expected is not None:
+                self._metadata_pending[None] = expected
+        self.events.post('metadata', self._apply_metadata)
+
+    def _apply_metadata(self):
+        with self._metadata_lock:
+            pending, self._metadata_pending = self._metadata_pending, {}
+        expected = pending.pop(None, None)
+        if expected is not None:
+            self.expected = expected
+            changed = self.check_vars
+        else:
+            changed = pending
+        self.metadata.update(pending)
+        for app_id in changed:
+            data = self.check_vars.get(app_id)
+            if data is not None:
+                self.detail_labels[(data[2], app_id)].configure(text=self._detail_text(app_id))
         self.update_selection_counter()
 
+    def _selected_upgrades(self) -> List[Dict[str, str]]:
+        return [app for app in self.selection.selected_apps() if app['id'] in self.upgrade_items]
+
+    def check_upgrades(self):
+        """Run a single `winget upgrade` scan and mark the catalog apps it can upgrade"""
+        from app_installer.core import installer, scanner
+
+        if not installer.is_winget_available():
+            self.result_msg.configure(text="Error: winget no está disponible", text_color="red")
+            return
+        self.check_upgrades_btn.configure(state="disabled", text="Buscando...")
+        self.current_pkg.configure(text="Buscando actualizaciones...")
+
+        def scan():
+            upgrades = scanner.list_upgrades()
+            self.events.call(lambda: self._show_upgrades(upgrades))
+
+        threading.Thread(target=scan, daemon=True).start()
+
+    def _show_upgrades(self, upgrades):
+        from app_installer.core import planner
+
+        self.upgrade_snapshot = upgrades
+        apps = [app for _, app, _ in self.check_vars.values()]
+        plan = planner.build_upgrade_plan(apps, upgrades)
+        self.upgrade_items = {item.app['id']: item for item in plan.to_upgrade}
+        self._refresh_row_labels()
+        self.selection.select(list(self.upgrade_items))
+        self.check_upgrades_btn.configure(state="normal", text="Buscar actualizaciones")
+        self.current_pkg.configure(text="")
+        count = len(self.upgrade_items)
+        if count:
+            self.result_msg.configure(text=f"{count} actualizaciones disponibles", text_color="green")
+        else:
+            self.result_msg.configure(text="Todas las aplicaciones del catálogo están al día", text_color="green")
+
+    def upgrade_selected(self):
+        apps = self._selected_upgrades()
+        if not apps or self._busy:
+            return
+        self.status.delete("1.0", "end")
+        self.current_pkg.configure(text="")
+        self.result_msg.configure(text="")
+        self._busy = True
+        self.install_btn.configure(state="disabled")
+        self.upgrade_btn.configure(state="disabled", text="Actualizando...")
+        workers = int(self.workers_var.get() or 1)
+        threading.Thread(target=self._install_thread, args=(apps, workers, True), daemon=True).start()
+
     def install_selected(self):
+        from app_installer.core import installer
+
+        if self._busy:
+            return
         apps = self.gather_selection()
         if not apps:
             self.result_msg.configure(text="No hay aplicaciones seleccionadas", text_color="orange")
@@ -230,59 +614,196 @@ class AppInstallerUI(ctk.CTk):
         self.current_pkg.configure(text="")
         self.result_msg.configure(text="")
         
-        # Disable install button during installation
+        # Disable both buttons during installation
+        self._busy = True
         self.install_btn.configure(state="disabled", text="Instalando...")
+        self.upgrade_btn.configure(state="disabled")
         
-        threading.Thread(target=self._install_thread, args=(apps,), daemon=True).start()
-
-    def _install_thread(self, apps):
+        workers = int(self.workers_var.get() or 1)
+        threading.Thread(target=self._install_thread, args=(apps, workers), daemon=True).start()
+
+    def _install_thread(self, apps, workers, upgrade=False):
+        """Worker thread of a batch; whatever happens, the buttons come back at the end"""
+        try:
+            self._run_batch(apps, workers, upgrade)
+        except Exception as e:
+            import traceback
+            from app_installer.core.logger import get_logger
+
+            get_logger().event('error en el lote de instalación', phase='install',
+                               stderr=traceback.format_exc())
+            msg = f'Error: {e}'
+            self.events.append(self.status, f'\n{msg}\n')
+            self._set_current('')
+            self.events.call(lambda: self.result_msg.configure(text=msg, text_color='red'))
+        finally:
+            self.events.call(self._install_done)
+
+    def _run_batch(self, apps, workers, upgrade):
+        from app_installer.core import planner, scanner
+        from app_installer.core.scheduler import InstallScheduler
+
+        if upgrade:
+            plan = planner.build_upgrade_plan(apps, self.upgrade_snapshot)
+        else:
+            self._set_current("Analizando aplicaciones instaladas...")
+            plan = planner.build_plan(apps, scanner.list_installed_apps())
+        self.events.append(self.status, f'{plan.summary()}\n\n')
+        apps = plan.pending
+        skipped = len(plan.to_skip)
         total = len(apps)
-        self.after(0, lambda: self.status.insert('end', f'Iniciando instalación de {total} aplicaciones...\n\n'))
-        error = False
-        success_count = 0
-        
-        for idx, app in enumerate(apps, start=1):
-            app_name = app.get('name', app['id'])
-            self.after(0, lambda i=idx, n=app_name, t=total: 
-                      self.current_pkg.configure(text=f"Instalando {n} ({i}/{t})"))
-            
-            result = installer.install_app(app, interactive=False)
-            if result.returncode == 0:
-                success_count += 1
+        noun, verb = ('actualización', 'Actualizando') if upgrade else ('instalación', 'Instalando')
+        self.events.append(self.status, f'Iniciando {noun} de {total} aplicaciones...\n\n')
+
+        def on_status(app, phase):
+            if phase == 'retry':
+                last = scheduler.history[app['id']][-1]
+                line = (f"[REINTENTO] {app.get('name', app['id'])}: {last.reason}. "
+                        f"Intento {last.number + 1} en {last.delay:.0f}s\n")
+                self.events.append(self.status, line)
+                return
+            if phase == 'download':
+                with progress_lock:
+                    downloads[app['id']] = (0, 0)
+                show_progress()
+                return
+            if phase != 'install':
+                return
+            with progress_lock:
+                downloads.pop(app['id'], None)
+                progress['label'] = f"{verb} {app.get('name', app['id'])} ({scheduler.installed + 1}/{total})"
+                progress['detail'] = ''
+            show_progress()
+
+        def on_progress(app, phase, event):
+            if event.kind == 'spinner':
+                return
+            if event.kind == 'bytes':
+                detail = f"{event.current / 1048576:.1f} MB / {event.total / 1048576:.1f} MB"
             else:
-                error = True
-            self.after(0, lambda r=result: self._log_result(r))
+                detail = f"{event.percent:.0f}%"
+            with progress_lock:
+                if phase == 'install':
+                    progress['detail'] = detail
+                elif event.kind == 'bytes' and event.current >= event.total:
+                    downloads.pop(app['id'], None)
+                elif event.kind == 'bytes':
+                    downloads[app['id']] = (event.current, event.total)
+            show_progress()
+
+        def show_progress():
+            """Install line plus an aggregate of the downloads in flight; coalesced by the event bus"""
+            with progress_lock:
+                text = progress['label']
+                if progress['detail']:
+                    text += f" - {progress['detail']}"
+                if downloads:
+                    done = sum(current for current, _ in downloads.values()) / 1048576
+                    size = sum(total for _, total in downloads.values()) / 1048576
+                    line = f"Descargando {len(downloads)}"
+                    if size:
+                        line += f" ({done:.1f} MB / {size:.1f} MB)"
+                    text = f"{text} | {line}" if text else line
+            self._set_current(text + self._format_eta(scheduler.eta()))
+
+        def on_result(result):
+            with progress_lock:
+                downloads.pop(result.id, None)
+            self.events.append(self.status, self._format_result(result))
+            if upgrade and result.returncode == 0:
+                self.events.call(lambda i=result.id: self._upgrade_done(i))
+
+        progress = {'label': '', 'detail': ''}
+        # id -> (bytes, total) of the downloads in flight, fed from the download threads
+        downloads = {}
+        progress_lock = threading.Lock()
+        scheduler = InstallScheduler(max_workers=workers,
+                                     on_status=on_status, on_result=on_result,
+                                     on_progress=on_progress, history_store=self._get_history_store(),
+                                     cache=self._get_package_cache(), upgrade=upgrade)
+        results = scheduler.run(apps)
+        success_count = sum(1 for r in results if r.returncode == 0)
+        error = success_count < total
         
         # Final status
         if error:
-            msg = f'Instalación completada con errores: {success_count}/{total} exitosas'
+            msg = f'{noun.capitalize()} completada con errores: {success_count}/{total} exitosas'
             color = 'orange'
         else:
-            msg = f'Instalación completada exitosamente: {success_count}/{total} aplicaciones'
+            msg = f'{noun.capitalize()} completada exitosamente: {success_count}/{total} aplicaciones'
             color = 'green'
+        if skipped:
+            msg += f' ({skipped} sin actualizaciones)' if upgrade else f' ({skipped} ya instaladas)'
             
-        self.after(0, lambda: self.status.insert('end', f'\n{msg}\n'))
-        self.after(0, lambda: self.current_pkg.configure(text=''))
-        self.after(0, lambda: self.result_msg.configure(text=msg, text_color=color))
+        self.events.append(self.status, f'\n{msg}\n')
+        self._set_current('')
+        self.events.call(lambda: self.result_msg.configure(text=msg, text_color=color))
         
-        # Re-enable install button and update counter
-        self.after(0, lambda: self.update_selection_counter())
+        # The new timings change the estimates; the buttons come back in _install_thread
+        self.events.call(self._start_metadata)
         
         # Show completion popup
-        self.after(0, lambda: self.show_completion_popup(success_count, total, error))
+        self.events.call(lambda: self.show_completion_popup(success_count, total, error))
 
-    def _log_result(self, res):
+    def _install_done(self):
+        self._busy = False
+        self.update_selection_counter()
+
+    def _set_current(self, text):
+        """Update the current package label from any thread; redundant updates coalesce"""
+        self.events.post('current_pkg', lambda: self.current_pkg.configure(text=text))
+
+    def _get_history_store(self):
+        if self.history_store is None:
+            from app_installer.core.history import HistoryStore
+            self.history_store = HistoryStore()
+        return self.history_store
+
+    def _get_package_cache(self):
+        if self.package_cache is None:
+            from app_installer.core.cache import PackageCache
+            self.package_cache = PackageCache.from_env()
+        return self.package_cache
+
+    def _upgrade_done(self, app_id):
+        self.upgrade_items.pop(app_id, None)
+        data = self.check_vars.get(app_id)
+        if data is not None:
+            self.row_widgets[(data[2], app_id)].configure(text=self._row_text(data[1]))
+        self.events.post('selection_counter', self.update_selection_counter)
+
+    @staticmethod
+    def _format_eta(seconds):
+        """Remaining time suffix for the progress label, empty without history."""
+        if seconds is None:
+            return ''
+        if seconds >= 60:
+            return f" - ~{seconds / 60:.0f} min restantes"
+        return f" - ~{seconds:.0f}s restantes"
+
+    @staticmethod
+    def _format_result(res):
+        """Status textbox block for one package, appended in a single insert"""
         marker = '[OK]' if res.returncode == 0 else '[ERROR]'
-        self.status.insert('end', f"{marker} {res.name} ({res.id})\n")
-        self.status.insert('end', f"Inicio: {res.start.strftime('%Y-%m-%d %H:%M:%S')}\n")
-        self.status.insert('end', f"Duración: {res.duration:.1f}s\n")
+        lines = [
+            f"{marker} {res.name} ({res.id})",
+            f"Inicio: {res.start.strftime('%Y-%m-%d %H:%M:%S')}",
+            f"Duración: {res.duration:.1f}s "
+            f"(descarga {res.download_duration:.1f}s, instalación {res.install_duration:.1f}s)",
+        ]
+        if len(res.attempts) > 1:
+            lines.append(f"Intentos: {len(res.attempts)}")
+        if res.reboot_required:
+            lines.append("Reinicio pendiente para completar la instalación")
         if res.stderr and res.returncode != 0:
-            self.status.insert('end', res.stderr.strip() + '\n')
-        self.status.insert('end', '─────────────────────\n')
-        self.status.see('end')
+            lines.append(res.stderr.strip())
+        lines.append('─────────────────────')
+        return '\n'.join(lines) + '\n'
     
     def show_completion_popup(self, success_count, total, has_errors):
         """Show a completion notification popup"""
+        from tkinter import messagebox
+
         if has_errors:
             title = "Instalación Completada con Errores"
             message = f"Se instalaron {success_count} de {total} aplicaciones correctamente.\n\nRevisar el log para más detalles sobre los errores."
@@ -293,49 +814,166 @@ class AppInstallerUI(ctk.CTk):
             messagebox.showinfo(title, message)
 
     def export_selected(self):
+        from tkinter import filedialog, messagebox
+
         apps = self.gather_selection()
         if not apps:
             messagebox.showinfo('Info', 'No hay aplicaciones seleccionadas')
             return
-        path = filedialog.asksaveasfilename(defaultextension='.json')
+        path = filedialog.asksaveasfilename(defaultextension='.apps',
+                                            filetypes=[('Manifiesto', '*.apps'), ('JSON', '*.json')])
         if not path:
             return
         file_manager.export_selection(Path(path), apps)
         messagebox.showinfo('Info', 'Exportado correctamente')
 
     def import_list(self):
-        path = filedialog.askopenfilename(filetypes=[('JSON', '*.json')])
+        from tkinter import filedialog, messagebox
+        from app_installer.core import profiles
+
+        if self._populating:
+            messagebox.showinfo('Info', 'Espera a que termine de cargarse el catálogo')
+            return
+        path = filedialog.askopenfilename(filetypes=[('Manifiesto o JSON', '*.apps *.txt *.json'),
+                                                     ('Todos', '*.*')])
         if not path:
             return
-        apps = file_manager.import_selection(Path(path))
-        for app in apps:
-            if app['id'] in self.check_vars:
-                self.check_vars[app['id']][0].set(True)
-        messagebox.showinfo('Info', 'Lista importada')
+        try:
+            report = profiles.read_file(Path(path), self.catalog)
+        except (OSError, ValueError) as e:
+            messagebox.showerror('Error', f'No se pudo importar: {e}')
+            return
+        self._apply_manifest(report, 'Lista importada')
+
+    def _profile_store(self):
+        from app_installer.core.profiles import ProfileStore
+
+        return ProfileStore()
+
+    def _refresh_profiles(self):
+        try:
+            names = self._profile_store().names()
+        except OSError:
+            names = []
+        self.profile_box.configure(values=names)
+
+    def load_profile(self):
+        """Replace the selection with a saved profile, whatever the search filter shows"""
+        from tkinter import messagebox
+
+        name = self.profile_var.get().strip()
+        if not name:
+            return
+        if self._populating:
+            messagebox.showinfo('Info', 'Espera a que termine de cargarse el catálogo')
+            return
+        try:
+            report = self._profile_store().load(name, self.catalog)
+        except (OSError, ValueError) as e:
+            self.result_msg.configure(text=f"Error: {e}", text_color="red")
+            return
+        self._apply_manifest(report, f'Perfil "{name}"', replace=True)
+
+    def save_profile(self):
+        from tkinter import messagebox
+
+        name = self.profile_var.get().strip()
+        apps = self.gather_selection()
+        if not name or not apps:
+            messagebox.showinfo('Info', 'Escribe un nombre de perfil y selecciona aplicaciones')
+            return
+        try:
+            self._profile_store().save(name, apps)
+        except (OSError, ValueError) as e:
+            self.result_msg.configure(text=f"Error: {e}", text_color="red")
+            return
+        self._refresh_profiles()
+        self.result_msg.configure(text=f'Perfil "{name}" guardado ({len(apps)} aplicaciones)',
+                                  text_color="green")
+
+    def _apply_manifest(self, report, label, replace=False):
+        """Apply an imported manifest in one selection batch and report what was skipped"""
+        from tkinter import messagebox
+
+        self.selection.apply((entry.id for entry in report.entries), report.pins, replace=replace)
+        loaded = len(report.entries) - len(report.unknown)
+        problems = report.problems()
+        if problems:
+            more = f"\n(y {len(problems) - 20} más)" if len(problems) > 20 else ""
+            messagebox.showwarning('Importación', f"{label}: {loaded} aplicaciones.\n\n"
+                                   + '\n'.join(problems[:20]) + more)
+        color = "orange" if problems else "green"
+        self.result_msg.configure(text=f"{label}: {loaded} aplicaciones", text_color=color)
 
     def scan_system(self):
+        """Save a snapshot of the installed packages; only the changes since the last one are stored"""
+        from tkinter import messagebox
+        from app_installer.core import installer, scanner
+        from app_installer.core.snapshots import SnapshotStore
+
         if not installer.is_winget_available():
             messagebox.showerror('Error', 'winget no está disponible')
             return
-        apps = scanner.list_installed_apps()
-        path = filedialog.asksaveasfilename(defaultextension='.json')
-        if not path:
-            return
-        file_manager.save_backup(Path(path), apps)
-        messagebox.showinfo('Info', 'Respaldo guardado')
+        self.backup_btn.configure(state="disabled", text="Guardando...")
+
+        def scan():
+            try:
+                # A failed `winget list` raises ScanError instead of looking like an empty system
+                apps = scanner.resolve_truncated(scanner.list_installed_apps(refresh=True, check=True))
+                info, diff = SnapshotStore().take(apps)
+            except OSError as e:
+                message = f"Error al guardar el respaldo: {e}"
+                self.events.call(lambda: self._backup_done(message, "red"))
+                return
+            if info is None:
+                message = "Respaldo sin cambios desde el anterior"
+            else:
+                message = f"Respaldo #{info.number} guardado ({diff.summary()})"
+            self.events.call(lambda: self._backup_done(message, "green"))
+
+        threading.Thread(target=scan, daemon=True).start()
+
+    def _backup_done(self, message, color):
+        self.backup_btn.configure(state="normal", text="Respaldo")
+        self.result_msg.configure(text=message, text_color=color)
 
     def open_settings(self):
+        from .settings_window import SettingsWindow
+
         win = SettingsWindow(self)
         win.grab_set()
         win.protocol('WM_DELETE_WINDOW', lambda w=win: self._close_settings(w))
 
+    def open_trace(self):
+        from .trace_window import TraceWindow
+
+        TraceWindow(self)
+
     def _close_settings(self, win):
+        from tkinter import messagebox
+
+        try:
+            win.save_now()
+        except OSError as e:
+            # Keep the window open so the edit is not lost
+            messagebox.showerror('Error', f'No se pudo guardar el catálogo: {e}', parent=win)
+            return
         win.destroy()
         self.reload_catalog()
 
     def reload_catalog(self):
-        self.catalog = file_manager.load_catalog(CATALOG_PATH)
-        self.refresh_app_list()
+        self.catalog = file_manager.load_catalog(CATALOG_PATH, index=self.search_index)
+        self._report_catalog_problems()
+        self.build_app_list()
+
+def _close_splash():
+    """Close the PyInstaller splash screen of the frozen build, if there is one"""
+    try:
+        import pyi_splash
+    except ImportError:
+        return
+    pyi_splash.close()
+
 
 def main():
     app = AppInstallerUI()
@@ -1,9 +1,12 @@
-import json
+import threading
 import customtkinter as ctk
 from pathlib import Path
 import sys
 import os
 
+from app_installer.core import file_manager
+from .event_bus import UIEventBus
+
 def get_resource_path(relative_path):
     """Get absolute path to resource, works for dev and for PyInstaller"""
     try:
@@ -14,6 +17,8 @@ def get_resource_path(relative_path):
 
 CATALOG_PATH = Path(get_resource_path('app_installer/data/apps_catalog.json'))
 DEFAULT_PATH = Path(get_resource_path('app_installer/data/apps_catalog_default.json'))
+# Delay after the last keystroke before validating and saving (ms)
+VALIDATE_DEBOUNCE_MS = 400
 
 
 class SettingsWindow(ctk.CTkToplevel):
@@ -25,29 +30,112 @@ class SettingsWindow(ctk.CTkToplevel):
         self.text.pack(fill='both', expand=True, padx=10, pady=(10, 5))
         self.status = ctk.CTkLabel(self, text='')
         self.status.pack(fill='x', padx=10)
+        self.summary = ctk.CTkLabel(self, text='', wraplength=560, justify='left')
+        self.summary.pack(fill='x', padx=10)
         self.restore_btn = ctk.CTkButton(self, text='Restaurar por defecto', command=self.restore_default)
         self.restore_btn.pack(pady=5)
+        self._saved_content = None
+        self._generation = 0
+        self._validate_job = None
+        self._closed = False
+        self._write_lock = threading.Lock()
+        # The validation worker reaches the widgets only through this bus
+        self.events = UIEventBus(self)
+        self.events.start()
         self.load_content()
-        self.text.bind('<KeyRelease>', self.validate_and_save)
+        self.text.bind('<KeyRelease>', self.schedule_validation)
 
     def load_content(self):
         try:
             content = CATALOG_PATH.read_text(encoding='utf-8')
         except FileNotFoundError:
             content = '{}'
+        self._saved_content = content.strip()
         self.text.delete('1.0', 'end')
         self.text.insert('1.0', content)
         self.validate_and_save()
 
+    def schedule_validation(self, event=None):
+        """Debounce typing so validation runs once the user pauses"""
+        if self._validate_job is not None:
+            self.after_cancel(self._validate_job)
+        self._validate_job = self.after(VALIDATE_DEBOUNCE_MS, self.validate_and_save)
+
     def validate_and_save(self, event=None):
+        """Validate the text on a worker thread and save it atomically if it changed"""
+        self._validate_job = None
+        self._generation += 1
+        content = self.text.get('1.0', 'end').strip()
+        threading.Thread(target=self._validate_thread, args=(self._generation, content),
+                         daemon=True).start()
+
+    def _validate_thread(self, generation, content):
+        try:
+            catalog, problems = file_manager.validate_catalog(content)
+        except ValueError as e:
+            self.events.call(lambda m=str(e): self._show_status(generation, f'JSON inv\u00e1lido: {m}', 'red'))
+            return
+        if problems:
+            more = f' (y {len(problems) - 3} m\u00e1s)' if len(problems) > 3 else ''
+            msg = f"Cat\u00e1logo inv\u00e1lido: {'; '.join(problems[:3])}{more}"
+            self.events.call(lambda: self._show_status(generation, msg, 'red'))
+            return
+
+        total = sum(len(apps) for apps in catalog.values())
+        msg = f'JSON v\u00e1lido: {len(catalog)} categor\u00edas, {total} aplicaciones'
+        color = 'green'
+        if catalog.warnings:
+            # Duplicated ids only keep their first entry; the catalog is still saved
+            warnings = catalog.warnings
+            more = f' (y {len(warnings) - 3} m\u00e1s)' if len(warnings) > 3 else ''
+            msg += f"; avisos: {'; '.join(warnings[:3])}{more}"
+            color = 'orange'
+        with self._write_lock:
+            # A newer edit supersedes this one; only the latest content is written
+            if generation != self._generation:
+                return
+            if content != self._saved_content:
+                try:
+                    file_manager.write_atomic(CATALOG_PATH, content)
+                    self._saved_content = content
+                except OSError as e:
+                    msg = f'No se pudo guardar: {e}'
+                    self.events.call(lambda: self._show_status(generation, msg, 'red'))
+                    return
+        summary = file_manager.summarize_catalog(catalog)
+        self.events.call(lambda: self._show_status(generation, msg, color, summary))
+
+    def save_now(self):
+        """Flush a pending edit synchronously; called before the window closes"""
+        if self._validate_job is not None:
+            self.after_cancel(self._validate_job)
+            self._validate_job = None
+        self._generation += 1
         content = self.text.get('1.0', 'end').strip()
         try:
-            json.loads(content)
-            self.status.configure(text='JSON v\u00e1lido', text_color='green')
-            with CATALOG_PATH.open('w', encoding='utf-8') as f:
-                f.write(content)
-        except Exception as e:
-            self.status.configure(text=f'JSON inv\u00e1lido: {e}', text_color='red')
+            _, problems = file_manager.validate_catalog(content)
+        except ValueError:
+            return
+        if problems:
+            return
+        with self._write_lock:
+            if content != self._saved_content:
+                file_manager.write_atomic(CATALOG_PATH, content)
+                self._saved_content = content
+
+    def _show_status(self, generation, text, color, summary=''):
+        if self._closed or generation != self._generation:
+            return
+        self.status.configure(text=text, text_color=color)
+        self.summary.configure(text=summary)
+
+    def destroy(self):
+        self._closed = True
+        self.events.stop()
+        if self._validate_job is not None:
+            self.after_cancel(self._validate_job)
+            self._validate_job = None
+        super().destroy()
 
     def restore_default(self):
         if not DEFAULT_PATH.exists():
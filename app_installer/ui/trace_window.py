@@ -0,0 +1,48 @@
+import customtkinter as ctk
+
+from app_installer.core import trace
+
+# Interval between two refreshes of the summary while the window is open (ms)
+REFRESH_MS = 1000
+
+
+class TraceWindow(ctk.CTkToplevel):
+    """Live summary of the spans and counters collected with APP_INSTALLER_TRACE"""
+
+    def __init__(self, master=None):
+        super().__init__(master)
+        self.title('Rendimiento')
+        self.geometry('720x480')
+        self.text = ctk.CTkTextbox(self, font=ctk.CTkFont(family='Consolas', size=12), wrap='none')
+        self.text.pack(fill='both', expand=True, padx=10, pady=(10, 5))
+        buttons = ctk.CTkFrame(self, fg_color='transparent')
+        buttons.pack(fill='x', padx=10, pady=(0, 10))
+        ctk.CTkButton(buttons, text='Exportar traza', command=self.export).pack(side='left')
+        self.status = ctk.CTkLabel(buttons, text='')
+        self.status.pack(side='left', padx=10)
+        self._job = None
+        self.refresh()
+        self.protocol('WM_DELETE_WINDOW', self.close)
+
+    def refresh(self):
+        data = trace.summary()
+        text = trace.format_summary(data) if data is not None else f'Traza desactivada ({trace.TRACE_ENV})'
+        self.text.configure(state='normal')
+        self.text.delete('1.0', 'end')
+        self.text.insert('1.0', text)
+        self.text.configure(state='disabled')
+        self._job = self.after(REFRESH_MS, self.refresh)
+
+    def export(self):
+        tracer = trace.get_tracer()
+        path = tracer.export() if tracer is not None else None
+        if path is None:
+            self.status.configure(text='No se pudo exportar la traza', text_color='red')
+        else:
+            self.status.configure(text=f'Guardada en {path}', text_color='green')
+
+    def close(self):
+        if self._job is not None:
+            self.after_cancel(self._job)
+            self._job = None
+        self.destroy()